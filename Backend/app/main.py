@@ -10,6 +10,7 @@ from app.db import engine
 from app.routes import source, query, tags, chat, settings as settings_routes
 from app import logging_config
 from app.services.file_watcher import start_watcher
+from app.services import ollama_client, ollama_gate, ollama_status, reranker, settings_service, source_meta, warmup
 
 logger = logging_config.logger
 
@@ -18,6 +19,19 @@ STUCK_STATUSES = {"queued", "transcribing", "chunking", "indexing"}
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Settings are served from an in-memory snapshot; watch the file so hand edits
+    # to data/settings.json are picked up without a restart.
+    settings_observer = settings_service.start_watching()
+    # Recency scoring reads source dates from memory; the repository keeps it current.
+    source_meta.load()
+    # Per-class caps on the OLLAMA_NUM_PARALLEL generation slots (re-applied on settings changes).
+    ollama_gate.apply_settings()
+    # Keep the Ollama health / installed-model snapshot warm so requests never probe.
+    ollama_status.start_background_refresh()
+    # Load Chroma, spaCy, the reranker and both Ollama models now instead of on the
+    # first chat; progress is reported by /ready.
+    warmup.start()
+
     # Re-queue any sources that were in-flight when the server last stopped
     from database.models import Source
     from app.services.sourceService import _process_source_background
@@ -45,6 +59,12 @@ async def lifespan(app: FastAPI):
     yield
     observer.stop()
     observer.join()
+    await warmup.stop()
+    await ollama_status.stop_background_refresh()
+    await ollama_client.aclose()
+    reranker.stop_worker()
+    if settings_observer is not None:
+        settings_service.stop_watching()
 
 
 app = FastAPI(title="Source Reflection API", lifespan=lifespan)
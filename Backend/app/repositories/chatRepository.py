@@ -121,10 +121,14 @@ def append_message(
 
 def delete_chunks_for_source(session: Session, source_id: int) -> int:
     from database.models import Chunk
+    from app.repositories.sourceRepository import fts_delete_chunks
+    from app.services import reranker
 
     chunks = session.exec(select(Chunk).where(Chunk.source_id == source_id)).all()
-    count = len(chunks)
+    chunk_ids = [chunk.id for chunk in chunks]
+    fts_delete_chunks(session, chunks)
     for chunk in chunks:
         session.delete(chunk)
     session.commit()
-    return count
+    reranker.evict_nodes(chunk_ids)
+    return len(chunk_ids)
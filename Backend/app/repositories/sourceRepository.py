@@ -1,8 +1,12 @@
+import hashlib
+import re
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Any, Optional
+from sqlalchemy import DateTime, bindparam, text as sql_text
 from sqlmodel import Session, select
 from database.models import Chat, Chunk, Source, SourceTag
-from app.services.ranking import SourceMeta
+from app.services import reranker, source_meta
 
 def get_all_sources(session: Session):
     return session.exec(
@@ -10,29 +14,6 @@ def get_all_sources(session: Session):
     ).all()
 
 
-def get_source_ids_in_range(session: Session, start: datetime, end: datetime) -> list[int]:
-    """Ids of processed (indexed, hence searchable) sources whose created_at
-    falls in ``[start, end)``. Returns ints."""
-    return list(
-        session.exec(
-            select(Source.id).where(
-                Source.created_at >= start,
-                Source.created_at < end,
-                Source.status == "processed",
-            )
-        ).all()
-    )
-
-
-def get_sources_meta(session: Session, source_ids: list[int]) -> dict[int, SourceMeta]:
-    """Fetch created_at for the given sources, keyed by int id, to recency-weight a candidate set."""
-    if not source_ids:
-        return {}
-    rows = session.exec(
-        select(Source.id, Source.created_at).where(Source.id.in_(source_ids))
-    ).all()
-    return {sid: SourceMeta(created_at=created_at) for sid, created_at in rows}
-
 def get_sources_since(session: Session, since_id: int):
     return session.exec(
         select(Source)
@@ -77,9 +58,110 @@ def create_source(
     session.add(new_source)
     session.commit()
     session.refresh(new_source)
+    source_meta.upsert(new_source)
     return new_source
 
 
+# --- chunk_fts: BM25 index over chunk text (see migration d6a4e5f7b8c9) ---------------
+# External-content FTS5 table; every path that adds or removes Chunk rows must keep it
+# in sync through these helpers. They are no-ops on a database that predates it.
+
+_FTS_MAX_TERMS = 32
+
+
+def _fts_ready(session: Session) -> bool:
+    return session.execute(
+        sql_text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chunk_fts'")
+    ).first() is not None
+
+
+def fts_index_chunks(session: Session, chunks: list[Chunk]) -> None:
+    """Add flushed (id-bearing) chunks to the FTS index, in the caller's transaction."""
+    if chunks and _fts_ready(session):
+        session.execute(
+            sql_text("INSERT INTO chunk_fts(rowid, chunk_text) VALUES (:id, :text)"),
+            [{"id": c.id, "text": c.chunk_text} for c in chunks],
+        )
+
+
+def fts_delete_chunks(session: Session, chunks: list[Chunk]) -> None:
+    """Remove chunks from the FTS index; call before deleting the rows themselves."""
+    if chunks and _fts_ready(session):
+        session.execute(
+            sql_text("INSERT INTO chunk_fts(chunk_fts, rowid, chunk_text) VALUES ('delete', :id, :text)"),
+            [{"id": c.id, "text": c.chunk_text} for c in chunks],
+        )
+
+
+def fts_match_query(text: str) -> Optional[str]:
+    """Turn free text into an FTS5 OR-query of quoted terms (no user syntax gets through)."""
+    terms = list(dict.fromkeys(t for t in re.findall(r"\w+", text.lower()) if len(t) > 1))
+    if not terms:
+        return None
+    return " OR ".join(f'"{t}"' for t in terms[:_FTS_MAX_TERMS])
+
+
+def search_chunks_fts(
+    session: Session,
+    query: str,
+    limit: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    modality: Optional[str] = None,
+) -> list[int]:
+    """Ids of processed sources' chunks matching `query`, best BM25 first.
+
+    `start`/`end` bound the source's created_at to ``[start, end)``."""
+    match = fts_match_query(query)
+    if match is None or not _fts_ready(session):
+        return []
+    where = ["chunk_fts MATCH :match", "source.status = 'processed'"]
+    params: dict[str, Any] = {"match": match, "limit": limit}
+    if modality:
+        where.append("source.file_type = :modality")
+        params["modality"] = modality
+    if start is not None:
+        where.append("source.created_at >= :start")
+        params["start"] = start
+    if end is not None:
+        where.append("source.created_at < :end")
+        params["end"] = end
+    stmt = sql_text(
+        "SELECT chunk.id FROM chunk_fts"
+        " JOIN chunk ON chunk.id = chunk_fts.rowid"
+        " JOIN source ON source.id = chunk.source_id"
+        f" WHERE {' AND '.join(where)}"
+        " ORDER BY bm25(chunk_fts) LIMIT :limit"
+    )
+    # Bind datetimes the way the ORM stores them so the string comparison is exact.
+    stmt = stmt.bindparams(*(bindparam(k, type_=DateTime()) for k in ("start", "end") if k in params))
+    rows = session.execute(stmt, params).all()
+    return [row[0] for row in rows]
+
+
+def chunk_content_hash(text: str) -> str:
+    """sha256 of a chunk's (stripped) text; what `sync_chunks` diffs on."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _chunk_entries(chunks: list[dict[str, Any]]) -> list[tuple[str, int]]:
+    """(text, chunk_index) for each non-empty chunk."""
+    entries = []
+    for idx, chunk_data in enumerate(chunks):
+        chunk_text = str(chunk_data.get("text", "")).strip()
+        if not chunk_text:
+            continue
+
+        # Keep caller-provided order when available, otherwise use list order.
+        raw_chunk_index = chunk_data.get("chunk_index", idx)
+        try:
+            chunk_index = int(raw_chunk_index)
+        except (TypeError, ValueError):
+            chunk_index = idx
+        entries.append((chunk_text, chunk_index))
+    return entries
+
+
 def create_chunks(session: Session, source_id: int, chunks: list[dict[str, Any]]) -> list[Chunk]:
     try:
         source = session.exec(select(Source).where(Source.id == source_id)).first()
@@ -87,22 +169,12 @@ def create_chunks(session: Session, source_id: int, chunks: list[dict[str, Any]]
             raise ValueError(f"Source {source_id} not found")
 
         db_chunks: list[Chunk] = []
-        for idx, chunk_data in enumerate(chunks):
-            chunk_text = str(chunk_data.get("text", "")).strip()
-            if not chunk_text:
-                continue
-
-            # Keep caller-provided order when available, otherwise use list order.
-            raw_chunk_index = chunk_data.get("chunk_index", idx)
-            try:
-                chunk_index = int(raw_chunk_index)
-            except (TypeError, ValueError):
-                chunk_index = idx
-
+        for chunk_text, chunk_index in _chunk_entries(chunks):
             chunk = Chunk(
                 source_id=source_id,
                 chunk_text=chunk_text,
                 chunk_index=chunk_index,
+                content_hash=chunk_content_hash(chunk_text),
             )
             session.add(chunk)
             db_chunks.append(chunk)
@@ -110,6 +182,8 @@ def create_chunks(session: Session, source_id: int, chunks: list[dict[str, Any]]
         if not db_chunks:
             raise ValueError(f"No chunks generated for source {source_id}.")
 
+        session.flush()
+        fts_index_chunks(session, db_chunks)
         session.commit()
 
         for chunk in db_chunks:
@@ -122,12 +196,85 @@ def create_chunks(session: Session, source_id: int, chunks: list[dict[str, Any]]
         raise exc
 
 
+@dataclass
+class ChunkDiff:
+    chunks: list[Chunk] = field(default_factory=list)   # the source's chunks now, in order
+    added: list[Chunk] = field(default_factory=list)    # new rows; their vectors need embedding
+    removed_ids: list[int] = field(default_factory=list)
+
+    @property
+    def kept(self) -> int:
+        return len(self.chunks) - len(self.added)
+
+
+def sync_chunks(session: Session, source_id: int, chunks: list[dict[str, Any]]) -> ChunkDiff:
+    """Make a source's chunk rows match `chunks`, touching only what changed.
+
+    Stored rows whose content hash matches a new chunk are kept (and keep their id, so
+    their vectors stay valid); only their chunk_index is updated. Unmatched new chunks
+    become rows, unmatched stored rows are deleted. All in one transaction, FTS
+    included.
+    """
+    try:
+        source = session.exec(select(Source).where(Source.id == source_id)).first()
+        if not source:
+            raise ValueError(f"Source {source_id} not found")
+        entries = _chunk_entries(chunks)
+        if not entries:
+            raise ValueError(f"No chunks generated for source {source_id}.")
+
+        stored: dict[str, list[Chunk]] = {}
+        for row in session.exec(
+            select(Chunk).where(Chunk.source_id == source_id).order_by(Chunk.chunk_index, Chunk.id)
+        ).all():
+            stored.setdefault(row.content_hash or chunk_content_hash(row.chunk_text), []).append(row)
+
+        diff = ChunkDiff()
+        for chunk_text, chunk_index in entries:
+            content_hash = chunk_content_hash(chunk_text)
+            matches = stored.get(content_hash)
+            if matches:
+                chunk = matches.pop(0)
+                chunk.chunk_index = chunk_index
+                chunk.content_hash = content_hash
+            else:
+                chunk = Chunk(
+                    source_id=source_id,
+                    chunk_text=chunk_text,
+                    chunk_index=chunk_index,
+                    content_hash=content_hash,
+                )
+                diff.added.append(chunk)
+            session.add(chunk)
+            diff.chunks.append(chunk)
+
+        removed = [row for rows in stored.values() for row in rows]
+        diff.removed_ids = [row.id for row in removed]
+        fts_delete_chunks(session, removed)
+        for row in removed:
+            session.delete(row)
+        session.flush()
+        fts_index_chunks(session, diff.added)
+        session.commit()
+
+        for chunk in diff.chunks:
+            session.refresh(chunk)
+        reranker.evict_nodes(diff.removed_ids)
+
+        return diff
+    except Exception as exc:
+        session.rollback()
+        print(f"Error syncing chunks for source {source_id}: {exc}")
+        raise exc
+
+
 def update_source_status(session: Session, source: Source, status: str) -> Source:
     source.status = status
     source.edited_at = datetime.utcnow()
     session.add(source)
     session.commit()
     session.refresh(source)
+    source_meta.upsert(source)
     return source
 
 
@@ -166,6 +313,7 @@ def update_source_fields(
     session.add(source)
     session.commit()
     session.refresh(source)
+    source_meta.upsert(source)
     return source
 
 
@@ -174,6 +322,8 @@ def delete_source(session: Session, source_id: int) -> bool:
     if not source:
         return False
     chunks = session.exec(select(Chunk).where(Chunk.source_id == source_id)).all()
+    chunk_ids = [chunk.id for chunk in chunks]
+    fts_delete_chunks(session, chunks)
     for chunk in chunks:
         session.delete(chunk)
     source_tags = session.exec(select(SourceTag).where(SourceTag.source_id == source_id)).all()
@@ -185,6 +335,8 @@ def delete_source(session: Session, source_id: int) -> bool:
         session.add(chat)
     session.delete(source)
     session.commit()
+    source_meta.remove(source_id)
+    reranker.evict_nodes(chunk_ids)
     return True
 
 
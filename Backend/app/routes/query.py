@@ -8,9 +8,6 @@ from app.services.rag import (
     MAX_HISTORY_MESSAGES,
     SYSTEM_PROMPT,
     build_context_str,
-    check_model_installed,
-    check_ollama_state,
-    classify_ollama_error,
     condense_question,
     model_supports_thinking,
     query_sources,
@@ -21,11 +18,12 @@ from app.services.rag import (
 from app.services.settings_service import get_setting
 from app.services import chatService
 from app.services import generation_registry
-from app.services.ollama_gate import generation_lock, is_busy
+from app.services import embedding_cache, ollama_client, ollama_status, reranker, retrieval, source_meta
+from app.services import ollama_gate
+from app.services import warmup
 
-import httpx
-from ollama import AsyncClient
-from fastapi import APIRouter, HTTPException, Response
+from ollama import ResponseError
+from fastapi import APIRouter, HTTPException
 from fastapi.responses import JSONResponse, StreamingResponse
 from sqlmodel import Session
 
@@ -78,13 +76,13 @@ async def query(request: QueryRequest):
     if not request.question.strip():
         raise HTTPException(status_code=400, detail="Question cannot be empty.")
 
-    ollama_state = check_ollama_state()
-    if ollama_state == "not_installed":
+    current = await ollama_status.astatus()
+    if current.state == "not_installed":
         raise HTTPException(
             status_code=503,
             detail="Ollama isn't installed on your machine. Install it from https://ollama.com, then try again.",
         )
-    if ollama_state == "not_running":
+    if current.state == "not_running":
         raise HTTPException(
             status_code=503,
             detail="Ollama isn't running on your machine. Start it and send the message again.",
@@ -92,7 +90,7 @@ async def query(request: QueryRequest):
 
     embed_model = _embed_model()
     chat_model = _chat_model()
-    missing = [m for m in (embed_model, chat_model) if not check_model_installed(m)]
+    missing = [m for m in (embed_model, chat_model) if not current.has_model(m)]
     if missing:
         commands = " && ".join(f"ollama pull {m}" for m in missing)
         label = "model isn't" if len(missing) == 1 else "models aren't"
@@ -103,14 +101,14 @@ async def query(request: QueryRequest):
 
     try:
         # query_sources (LlamaIndex Settings.llm.complete) is synchronous, so run it
-        # in a worker thread to keep the event loop free, and hold the generation gate
-        # so it can't run a second generation alongside a streaming chat answer.
-        async with generation_lock:
+        # in a worker thread to keep the event loop free, and hold a chat-priority
+        # generation slot so it can't run alongside a streaming chat answer.
+        async with ollama_gate.scheduler.slot(ollama_gate.CHAT):
             result = await asyncio.to_thread(
                 query_sources, request.question, top_k=request.top_k, modality=request.modality
             )
     except Exception as exc:
-        kind = classify_ollama_error(exc)
+        kind = ollama_status.note_error(exc)
         if kind == "not_running":
             raise HTTPException(
                 status_code=503,
@@ -158,11 +156,13 @@ async def query_stream(request: QueryStreamRequest):
 
     Emits SSE events of shape `{type: <event>, ...}`:
       - stage    {name: "searching" | "retrieved" | "thinking" | "writing" | "queued"}
+                 (queued carries `position`, re-emitted as the wait queue moves)
       - thinking {delta: str}
       - token    {delta: str}
       - sources  {sources: [...]}
       - done     {model: str, message_id: int}
       - error    {detail: str}
+      - cancelled {message_id: int | null}  (see `DELETE /chats/{chat_id}/generation`)
     """
     if not request.question.strip():
         raise HTTPException(status_code=400, detail="Question cannot be empty.")
@@ -190,12 +190,31 @@ async def generation_stream(chat_id: int):
     )
 
 
+@router.delete("/chats/{chat_id}/generation", tags=["Query"])
+async def cancel_generation(chat_id: int, persist_partial: bool = False):
+    """Stop the chat's in-flight generation and free the model for queued requests.
+
+    With `persist_partial`, whatever answer was streamed so far is saved as the chat's
+    reply; its id comes back as `message_id`.
+    """
+    job = await generation_registry.cancel(chat_id, persist_partial=persist_partial)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No generation in progress for this chat")
+    return {"chat_id": chat_id, "status": job.status, "message_id": job.message_id}
+
+
 @router.get("/generations", tags=["Query"])
 async def list_generations():
     """Chats with a generation currently in progress (sidebar spinner + reconnect)."""
     return generation_registry.active()
 
 
+@router.get("/generations/queue", tags=["Query"])
+async def generation_queue():
+    """Generation scheduler state: running/queued per priority class and wait times."""
+    return ollama_gate.scheduler.snapshot()
+
+
 @router.post("/extract-tags", tags=["Query"])
 async def extract_tags(source_id: int) -> ExtractedTagsResponse:
     with Session(engine) as session:
@@ -209,25 +228,21 @@ async def extract_tags(source_id: int) -> ExtractedTagsResponse:
     prompt = tag_extraction_prompt.build_prompt(source_text)
 
     try:
-        async with generation_lock, httpx.AsyncClient(
-            timeout=httpx.Timeout(connect=10.0, read=300.0, write=10.0, pool=10.0)
-        ) as client:
-            response = await client.post(
-                f"{_ollama_host()}/api/generate",
-                json={
-                    "model": _chat_model(),
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {"num_predict": 1024},
-                    "think": False,
-                },
-            )
-            if response.status_code != 200:
-                logger.error(f"Ollama returned non-200 status: {response.status_code}")
-                raise HTTPException(status_code=500, detail="Ollama error")
+        async with ollama_gate.scheduler.slot(ollama_gate.TAGGING):
+            try:
+                result = await ollama_client.async_client(_ollama_host()).generate(
+                    model=_chat_model(),
+                    prompt=prompt,
+                    stream=False,
+                    options={"num_predict": 1024},
+                    think=False,
+                    keep_alive=get_setting("chat_keep_alive"),
+                )
+            except ResponseError as exc:
+                logger.error(f"Ollama returned non-200 status: {exc.status_code}")
+                raise HTTPException(status_code=500, detail="Ollama error") from exc
 
-            result = response.json()
-            response_text = result.get("response", "").strip()
+            response_text = (result.get("response") or "").strip()
 
             json_start = response_text.find("[")
             json_end = response_text.rfind("]") + 1
@@ -295,10 +310,14 @@ async def generate_question(req: GenerateRequest):
 
     async def stream_ollama():
         try:
-            async with generation_lock:
-                client = AsyncClient(host=_ollama_host())
+            async with ollama_gate.scheduler.slot(ollama_gate.REFLECTION):
+                client = ollama_client.async_client(_ollama_host())
                 async for chunk in await client.chat(
-                    model=_chat_model(), messages=messages, stream=True, think=False
+                    model=_chat_model(),
+                    messages=messages,
+                    stream=True,
+                    think=False,
+                    keep_alive=get_setting("chat_keep_alive"),
                 ):
                     token = chunk.get("message", {}).get("content", "")
                     if token:
@@ -336,19 +355,52 @@ async def save_answer(req: SaveAnswerRequest):
         return {"ok": True, "question_id": question.id, "answer_id": answer.id}
 
 
+@router.get("/ollama-pool", tags=["Query"])
+async def ollama_pool():
+    """Connection-pool statistics for the shared Ollama clients (in-use, idle, wait time)."""
+    return ollama_client.pool_stats()
+
+
+@router.get("/reranker-worker", tags=["Query"])
+async def reranker_worker():
+    """Reranker worker: queue depth, micro-batch sizes, queue wait and forward-pass time."""
+    return reranker.worker_stats()
+
+
+@router.get("/embedding-cache", tags=["Query"])
+async def embedding_cache_stats():
+    """Persistent embedding cache: entries, hit rate and evictions since startup."""
+    return embedding_cache.stats()
+
+
+@router.get("/retrieval-cache", tags=["Query"])
+async def retrieval_cache_stats():
+    """Ranked-result, query-embedding and reranker-score caches, plus the source metadata table."""
+    return {
+        "results": retrieval.result_cache_stats(),
+        "query_embeddings": retrieval.query_cache_stats(),
+        "reranker_scores": reranker.score_cache_stats(),
+        "source_meta": source_meta.stats(),
+    }
+
+
 @router.get("/ollama-health", tags=["Query"])
 async def health():
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            r = await client.get(_ollama_host())
-            return Response(
-                content=r.content,
-                status_code=r.status_code,
-                media_type=r.headers.get("content-type", "text/plain"),
-            )
-    except Exception as e:
-        logger.warning(f"Ollama unreachable: {e}")
-        return JSONResponse(
-            status_code=503,
-            content={"status": "degraded", "ollama": "unreachable", "error": str(e)},
-        )
+    # Served from the cached status; the background refresher does the probing.
+    status = await ollama_status.astatus()
+    if status.state == "ok":
+        return {"status": "ok", "ollama": "ok", "host": status.host, "models": len(status.models)}
+    logger.warning(f"Ollama unreachable: {status.error}")
+    return JSONResponse(
+        status_code=503,
+        content={"status": "degraded", "ollama": status.state, "error": status.error},
+    )
+
+
+@router.get("/ready", tags=["Query"])
+async def ready():
+    """Per-component warm-up status and load time; 503 until everything has loaded."""
+    readiness = warmup.readiness()
+    if readiness["ready"]:
+        return readiness
+    return JSONResponse(status_code=503, content=readiness)
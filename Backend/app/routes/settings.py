@@ -1,10 +1,9 @@
 from typing import Any
 
-import httpx
 from fastapi import APIRouter, HTTPException
 
 from app import logging_config
-from app.services import settings_service
+from app.services import ollama_status, settings_service
 
 router = APIRouter(prefix="/settings", tags=["Settings"])
 
@@ -91,21 +90,11 @@ async def list_devices() -> list[dict[str, Any]]:
 
 @router.get("/ollama-models")
 async def list_ollama_models() -> dict[str, Any]:
-    host = settings_service.get_setting("ollama_host").rstrip("/")
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(f"{host}/api/tags")
-            response.raise_for_status()
-            data = response.json()
-        models = [
-            {"name": m.get("name", ""), "size": m.get("size")}
-            for m in data.get("models", [])
-            if m.get("name")
-        ]
-        return {"available": True, "host": host, "models": models}
-    except Exception as exc:
-        logger.info(f"Ollama unreachable at {host}: {exc}")
-        return {"available": False, "host": host, "models": [], "error": str(exc)}
+    status = await ollama_status.astatus()
+    if status.state == "ok":
+        return {"available": True, "host": status.host, "models": [dict(m) for m in status.models]}
+    logger.info(f"Ollama unreachable at {status.host}: {status.error}")
+    return {"available": False, "host": status.host, "models": [], "error": status.error or status.state}
 
 
 @router.get("/spacy-models")
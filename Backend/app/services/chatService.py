@@ -7,7 +7,6 @@ from sqlmodel import Session
 from app import logging_config
 from app.db import engine
 from app.repositories import chatRepository, sourceRepository
-from app.services.chroma import get_chroma_collection
 from database.models import Chat
 
 logger = logging_config.logger
@@ -178,15 +177,8 @@ def reindex_chat(session: Session, chat_id: int):
     if not markdown.strip():
         raise HTTPException(status_code=400, detail="Chat has no content to index.")
 
-    # Wipe old chunks and vector entries before re-running the pipeline
-    deleted = chatRepository.delete_chunks_for_source(session, source.id)
-    if deleted:
-        try:
-            collection = get_chroma_collection()
-            collection.delete(where={"source_id": str(source.id)})
-        except Exception as exc:
-            logger.warning(f"Chroma delete for source {source.id} failed: {exc}")
-
+    # Chunks and vectors are left in place: processing diffs the new chunks against
+    # them, so only the turns added since the last index get embedded.
     sourceRepository.update_source_text(session, source, markdown)
     updated_source = sourceRepository.update_source_status(session, source, "queued")
 
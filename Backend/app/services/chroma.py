@@ -1,3 +1,5 @@
+import json
+from datetime import datetime
 from pathlib import Path
 
 import chromadb
@@ -20,6 +22,34 @@ def get_chroma_collection():
     return _collection
 
 
+def to_created_at_ts(created_at: datetime) -> int:
+    """Epoch seconds for `created_at_ts` metadata. Stamps and range filters must both use this."""
+    return int(created_at.timestamp())
+
+
+def restamp_created_at(source_id: int, created_at: datetime) -> int:
+    """Rewrite `created_at_ts` on every chunk of a source after its date was edited.
+
+    LlamaIndex keeps a second copy of the metadata inside `_node_content` (that is what
+    retrieved nodes are rebuilt from), so both are updated. Returns the chunk count."""
+    collection = get_chroma_collection()
+    records = collection.get(where={"source_id": str(source_id)}, include=["metadatas"])
+    if not records["ids"]:
+        return 0
+    ts = to_created_at_ts(created_at)
+    metadatas = []
+    for metadata in records["metadatas"]:
+        metadata = dict(metadata)
+        metadata["created_at_ts"] = ts
+        if "_node_content" in metadata:
+            node = json.loads(metadata["_node_content"])
+            node.setdefault("metadata", {})["created_at_ts"] = ts
+            metadata["_node_content"] = json.dumps(node)
+        metadatas.append(metadata)
+    collection.update(ids=records["ids"], metadatas=metadatas)
+    return len(records["ids"])
+
+
 def _chunk_metadata(chunk: dict) -> dict:
     """Node metadata for a chunk; created_at_ts/modality stamped when present (Chroma rejects None)."""
     metadata = {"source_id": chunk["source_id"], "chunk_id": chunk["id"]}
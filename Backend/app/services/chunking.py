@@ -1,29 +1,58 @@
-import ollama
+import bisect
 import json
+import math
 import re
 import spacy
 
-from typing import List
+from dataclasses import dataclass
 
-from app.services.settings_service import get_setting
+import numpy as np
+
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.services import ollama_client, ollama_gate
+from app.services.settings_service import ALLOWED_CHUNK_STRATEGIES, ALLOWED_SENTENCE_SEGMENTERS, get_setting
 
 _SPACY_MODELS = {"en": "en_core_web_sm", "nl": "nl_core_news_sm"}
 _nlp_cache: dict[str, "spacy.language.Language"] = {}
 
+# `sentence_segmenter` setting: how `sentence_chunk` finds sentence boundaries.
+#   "full"        — the whole pipeline; boundaries come from the dependency parser.
+#   "senter"      — the same model with only its statistical sentence recognizer loaded.
+#   "sentencizer" — spaCy's rule-based punctuation splitter; needs no model at all.
+SEGMENTERS = tuple(sorted(ALLOWED_SENTENCE_SEGMENTERS))  # "full" first: the benchmark baseline
+_NON_SENTENCE_PIPES = ["tok2vec", "tagger", "morphologizer", "parser", "attribute_ruler", "lemmatizer", "ner"]
+
+
+def _load_nlp(model_name: str, mode: str):
+    if mode == "sentencizer":
+        nlp = spacy.blank(model_name.split("_", 1)[0])
+        nlp.add_pipe("sentencizer")
+        return nlp
+    if mode == "senter":
+        nlp = spacy.load(model_name, exclude=_NON_SENTENCE_PIPES)
+        if "senter" in nlp.disabled:
+            nlp.enable_pipe("senter")
+        elif "senter" not in nlp.pipe_names:
+            nlp.add_pipe("sentencizer")
+        return nlp
+    return spacy.load(model_name)
+
 
 def _get_nlp():
     language = get_setting("language") or "en"
+    mode = get_setting("sentence_segmenter") or "full"
     model_name = _SPACY_MODELS.get(language, _SPACY_MODELS["en"])
-    cached = _nlp_cache.get(model_name)
+    cached = _nlp_cache.get(f"{model_name}:{mode}")
     if cached is not None:
         return cached
     try:
-        nlp = spacy.load(model_name)
+        nlp = _load_nlp(model_name, mode)
     except OSError:
         # Fall back to English if the requested model isn't installed.
-        nlp = spacy.load(_SPACY_MODELS["en"])
+        nlp = _load_nlp(_SPACY_MODELS["en"], mode)
         model_name = _SPACY_MODELS["en"]
-    _nlp_cache[model_name] = nlp
+    _nlp_cache[f"{model_name}:{mode}"] = nlp
     return nlp
 
 
@@ -41,11 +70,13 @@ Return ONLY a raw JSON array of strings. Example format:
 Source:
 {text}
 """
-    response = ollama.chat(
-        model=get_setting("chat_model"),
-        messages=[{"role": "user", "content": prompt}],
-        format="json",
-    )
+    with ollama_gate.scheduler.slot_sync(ollama_gate.INGESTION):
+        response = ollama_client.sync_client().chat(
+            model=get_setting("chat_model"),
+            messages=[{"role": "user", "content": prompt}],
+            format="json",
+            keep_alive=get_setting("chat_keep_alive"),
+        )
 
     content = response.get("message", {}).get("content", "")
     if not content:
@@ -67,6 +98,105 @@ Source:
     return cleaned
 
 
+# Sources that still come out as one chunk longer than this get split further, per
+# the `long_source_split` setting: "semantic" (default), "llm" or "none".
+LONG_SOURCE_CHARS = 1000
+SEMANTIC_MIN_CHARS = 200
+SEMANTIC_MAX_CHARS = 1000
+UNIT_MAX_WORDS = 40   # longer (or unpunctuated) sentences are cut into pseudo-sentences
+SIMILARITY_BLOCK = 2  # units averaged on each side of a gap
+
+
+def _similarity_units(text: str) -> List[str]:
+    units = []
+    for sent in _get_nlp()(text).sents:
+        words = sent.text.split()
+        if not words:
+            continue
+        parts = math.ceil(len(words) / UNIT_MAX_WORDS)
+        size = math.ceil(len(words) / parts)
+        units.extend(" ".join(words[i:i + size]) for i in range(0, len(words), size))
+    return units
+
+
+def _gap_depths(embeddings: np.ndarray, block: int = SIMILARITY_BLOCK) -> np.ndarray:
+    """TextTiling depth score of each gap between consecutive units.
+
+    A gap's similarity is the cosine between the mean vectors of the `block` units on
+    each side. Its depth is how far that similarity dips below the nearest peak on the
+    left plus the nearest peak on the right, so deep valleys mark topic shifts.
+    """
+    vectors = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    sims = []
+    for gap in range(1, len(vectors)):
+        left = vectors[max(0, gap - block):gap].mean(axis=0)
+        right = vectors[gap:gap + block].mean(axis=0)
+        sims.append(float(left @ right / max(np.linalg.norm(left) * np.linalg.norm(right), 1e-12)))
+
+    def peak(i: int, step: int) -> float:
+        while 0 <= i + step < len(sims) and sims[i + step] >= sims[i]:
+            i += step
+        return sims[i]
+
+    return np.array([peak(i, -1) + peak(i, 1) - 2 * sims[i] for i in range(len(sims))])
+
+
+def segment_by_similarity(
+    units: Sequence[str],
+    embeddings: Sequence[Sequence[float]],
+    min_chars: int = SEMANTIC_MIN_CHARS,
+    max_chars: int = SEMANTIC_MAX_CHARS,
+) -> List[str]:
+    """Join `units` into segments, cutting at the deepest similarity valleys.
+
+    Valleys deeper than TextTiling's cutoff (mean - std / 2) are taken deepest first, as
+    long as both sides stay at least `min_chars`. Segments still over `max_chars` are
+    then cut at their deepest remaining gap until they fit (or are a single unit).
+    """
+    n = len(units)
+    if n < 2:
+        return [" ".join(units)] if units else []
+    depths = _gap_depths(np.asarray(embeddings, dtype=np.float64))
+    offsets = np.concatenate([[0], np.cumsum([len(u) + 1 for u in units])])
+
+    def size(lo: int, hi: int) -> int:
+        return int(offsets[hi] - offsets[lo])
+
+    bounds = [0, n]  # a boundary g starts a segment at units[g]; gap g has depth depths[g - 1]
+    cutoff = depths.mean() - depths.std() / 2
+    for gap in sorted(range(1, n), key=lambda g: depths[g - 1], reverse=True):
+        if depths[gap - 1] <= max(cutoff, 0.0):
+            break  # the rest are shallower than the cutoff, or no valley at all
+        i = bisect.bisect(bounds, gap)
+        if size(bounds[i - 1], gap) >= min_chars and size(gap, bounds[i]) >= min_chars:
+            bounds.insert(i, gap)
+
+    i = 0
+    while i < len(bounds) - 1:
+        lo, hi = bounds[i], bounds[i + 1]
+        if size(lo, hi) <= max_chars or hi - lo < 2:
+            i += 1
+            continue
+        gaps = range(lo + 1, hi)
+        balanced = [g for g in gaps if size(lo, g) >= min_chars and size(g, hi) >= min_chars]
+        bounds.insert(i + 1, max(balanced or gaps, key=lambda g: depths[g - 1]))
+    return [" ".join(units[a:b]) for a, b in zip(bounds, bounds[1:])]
+
+
+def semantic_split_source(text: str) -> List[str]:
+    """Split `text` at topic shifts, embedding its sentences in one uncached request to the embed model."""
+    from llama_index.core import Settings
+
+    from app.services.llm_runtime import configure_llamaindex
+
+    units = _similarity_units(text)
+    if len(units) < 2:
+        return units
+    configure_llamaindex()
+    embeddings = Settings.embed_model.get_uncached_text_embeddings(units)
+    return segment_by_similarity(units, embeddings)
+
+
 def split_on_days(text: str):
     #^ → start of line only , (?im) → multiline + case insensitive , \b → whole word match , [:\-\n\s] → expects structure after it
     pattern = r"(?im)^(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b[:\-\n\s]"
@@ -84,18 +214,189 @@ def split_on_days(text: str):
     return segments
 
 
-def sentence_chunk(text: str):
-    doc = _get_nlp()(text)
+# `chunk_strategy` setting: how `sentence_chunk` packs sentences into chunks.
+#   "chars"           — the original packing: under 500 characters, no overlap.
+#   "embed-tokens"    — `chunk_target_tokens` per chunk, counted with the embed model's
+#                       tokenizer and never more than the tokens it embeds.
+#   "reranker-tokens" — the same, counted with the reranker's tokenizer, capped so the
+#                       (question, passage) pair fits `reranker_max_length`.
+# Token strategies repeat the last `chunk_overlap_sentences` sentences of a chunk at
+# the start of the next one.
+CHUNK_STRATEGIES = tuple(sorted(ALLOWED_CHUNK_STRATEGIES))
+CHAR_LIMIT = 500
+
+# Ollama embed model -> (Hugging Face tokenizer, tokens Ollama embeds before truncating).
+# Unlisted models are counted with `context_packer.estimate_tokens` against a 512 window.
+_EMBED_TOKENIZERS = {
+    "nomic-embed-text": ("nomic-ai/nomic-embed-text-v1.5", 2048),
+    "mxbai-embed-large": ("mixedbread-ai/mxbai-embed-large-v1", 512),
+    "bge-m3": ("BAAI/bge-m3", 8192),
+    "snowflake-arctic-embed": ("Snowflake/snowflake-arctic-embed-m", 512),
+    "all-minilm": ("sentence-transformers/all-MiniLM-L6-v2", 256),
+}
+DEFAULT_WINDOW = 512
+SPECIAL_TOKENS = 2         # [CLS]/<s> and [SEP]/</s> count toward the window
+RERANK_QUESTION_TOKENS = 64  # room left in `reranker_max_length` for the question
+_tokenizer_cache: dict[str, object] = {}
+
+
+@dataclass(frozen=True)
+class ChunkStrategy:
+    """One way of packing sentences into chunks; see `CHUNK_STRATEGIES`.
+
+    `target_tokens` and `overlap_sentences` are ignored by "chars". `max_tokens` of None
+    means the tokenizer's window.
+    """
+    kind: str = "chars"
+    target_tokens: int = 256
+    overlap_sentences: int = 1
+    max_tokens: Optional[int] = None
+
+    @property
+    def label(self) -> str:
+        if self.kind == "chars":
+            return "chars"
+        return f"{self.kind}:{self.target_tokens}:{self.overlap_sentences}"
+
+    @classmethod
+    def from_label(cls, label: str) -> "ChunkStrategy":
+        """Parse `label` back: "chars", or "<kind>[:<target_tokens>[:<overlap_sentences>]]"."""
+        kind, *params = label.split(":")
+        if kind not in CHUNK_STRATEGIES or len(params) > 2 or (kind == "chars" and params):
+            raise ValueError(f"chunk strategy must be 'chars' or '<kind>[:<target>[:<overlap>]]', got {label!r}")
+        return cls(kind, *(int(p) for p in params))
+
+
+def strategy_from_settings() -> ChunkStrategy:
+    kind = get_setting("chunk_strategy") or "chars"
+    if kind == "chars":
+        return ChunkStrategy()
+    return ChunkStrategy(
+        kind=kind,
+        target_tokens=get_setting("chunk_target_tokens") or ChunkStrategy.target_tokens,
+        overlap_sentences=get_setting("chunk_overlap_sentences") or 0,
+    )
+
+
+def _load_tokenizer(name: str):
+    """A Hugging Face tokenizer, or None if it can't be loaded (offline, not installed)."""
+    if name in _tokenizer_cache:
+        return _tokenizer_cache[name]
+    try:
+        from tokenizers import Tokenizer
+
+        tokenizer = Tokenizer.from_pretrained(name)
+    except Exception:
+        tokenizer = None
+    _tokenizer_cache[name] = tokenizer
+    return tokenizer
+
+
+def _estimate_counts(texts: List[str]) -> List[int]:
+    from app.services.context_packer import estimate_tokens
+
+    return [estimate_tokens(t) for t in texts]
+
+
+def token_counter(kind: str) -> Tuple[Callable[[List[str]], List[int]], int]:
+    """`(count, window)` for a token strategy: a batch token counter and the most tokens one chunk may hold.
+
+    Falls back to `estimate_tokens` when the tokenizer isn't available.
+    """
+    if kind == "reranker-tokens":
+        from app.services.reranker import MODEL_NAME
+
+        name = MODEL_NAME
+        window = (get_setting("reranker_max_length") or DEFAULT_WINDOW) - RERANK_QUESTION_TOKENS
+    else:
+        name, window = _EMBED_TOKENIZERS.get((get_setting("embed_model") or "").split(":")[0], (None, DEFAULT_WINDOW))
+    window -= SPECIAL_TOKENS
+    tokenizer = _load_tokenizer(name) if name else None
+    if tokenizer is None:
+        return _estimate_counts, window
+
+    def count(texts: List[str]) -> List[int]:
+        return [len(e.ids) for e in tokenizer.encode_batch(texts, add_special_tokens=False)] if texts else []
+
+    return count, window
+
+
+def _split_long_sentence(sentence: str, count: Callable[[List[str]], List[int]], max_tokens: int) -> List[str]:
+    """Cut a sentence over `max_tokens` into word runs that each fit."""
+    words = sentence.split()
+    pieces, current, used = [], [], 0
+    for word, cost in zip(words, count(words)):
+        if current and used + cost > max_tokens:
+            pieces.append(" ".join(current))
+            current, used = [], 0
+        current.append(word)
+        used += cost
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def pack_sentences(
+    sentences: List[str],
+    count: Callable[[List[str]], List[int]],
+    target_tokens: int,
+    max_tokens: int,
+    overlap_sentences: int = 0,
+) -> List[str]:
+    """Pack sentences into chunks of about `target_tokens`, never over `max_tokens`.
+
+    A chunk closes before the sentence that would take it past the target. The next
+    chunk starts with the last `overlap_sentences` sentences of the previous one, as
+    long as they leave room under `max_tokens`.
+    """
+    target_tokens = min(target_tokens, max_tokens)
+    units: List[Tuple[str, int]] = []
+    for sentence, cost in zip(sentences, count(sentences)):
+        if cost > max_tokens:
+            pieces = _split_long_sentence(sentence, count, max_tokens)
+            units.extend(zip(pieces, count(pieces)))
+        else:
+            units.append((sentence, cost))
+
+    chunks: List[str] = []
+    current: List[Tuple[str, int]] = []
+    fresh = 0  # sentences in `current` not already in the previous chunk
+    for unit in units:
+        used = sum(c for _, c in current)
+        if fresh and used + unit[1] > target_tokens:
+            chunks.append(" ".join(s for s, _ in current))
+            current = current[-overlap_sentences:] if overlap_sentences else []
+            fresh = 0
+        while current and sum(c for _, c in current) + unit[1] > max_tokens:
+            current.pop(0)
+        current.append(unit)
+        fresh += 1
+    if fresh:
+        chunks.append(" ".join(s for s, _ in current))
+    return chunks
+
+
+def sentence_chunk(text: str, strategy: Optional[ChunkStrategy] = None):
+    return _doc_chunks(_get_nlp()(text), strategy)
+
+
+def _doc_chunks(doc, strategy: Optional[ChunkStrategy] = None) -> List[str]:
+    """Pack a parsed doc's sentences into chunks per `strategy` (default: the original ~500-character packing)."""
     sentences = [s.text.strip() for s in doc.sents if s.text.strip()]
+    if strategy is not None and strategy.kind != "chars":
+        count, window = token_counter(strategy.kind)
+        max_tokens = min(strategy.max_tokens or window, window)
+        return pack_sentences(sentences, count, strategy.target_tokens, max_tokens, strategy.overlap_sentences)
 
     chunks = []
     current = ""
 
     for s in sentences:
-        if len(current) + len(s) < 500:
+        if len(current) + len(s) < CHAR_LIMIT:
             current += " " + s
         else:
-            chunks.append(current.strip())
+            if current.strip():  # an oversized first sentence has nothing before it
+                chunks.append(current.strip())
             current = s
 
     if current:
@@ -104,7 +405,8 @@ def sentence_chunk(text: str):
     return chunks
 
 
-def chunk_text(text: str, source_id: int):
+def chunk_text(text: str, source_id: int, long_split: Optional[str] = None,
+               strategy: Optional[ChunkStrategy] = None):
     if not text or not text.strip():
         return []
 
@@ -114,19 +416,62 @@ def chunk_text(text: str, source_id: int):
     # 2. If no structure → sentence chunking
     if not segments:
         print("no segments from regex")
-        segments = sentence_chunk(text)
+        segments = sentence_chunk(text, strategy or strategy_from_settings())
 
     print("check")
     print(segments)
 
-    # 3. If there is still only 1 chunk and it's very long → try LLM split (expensive)
-    if len(segments) == 1 and len(segments[0]) > 1000:
+    return _finish_chunks(text, source_id, segments, long_split)
+
+
+def _finish_chunks(text: str, source_id: int, segments: List[str], long_split: Optional[str] = None) -> List[dict]:
+    # 3. If there is still only 1 chunk and it's very long → split by topic
+    #    (semantic: one embedding batch; llm: a full generation, opt-in)
+    if len(segments) == 1 and len(segments[0]) > LONG_SOURCE_CHARS:
+        mode = long_split or get_setting("long_source_split")
         try:
-            segments = llm_split_source(text)
+            if mode == "semantic":
+                segments = semantic_split_source(text)
+            elif mode == "llm":
+                segments = llm_split_source(text)
         except Exception:
             pass  # keep previous result
 
     return [
         {"text": segment, "source_id": source_id}
         for segment in segments if segment
-    ]
\ No newline at end of file
+    ]
+
+
+PIPE_BATCH_SIZE = 64
+
+
+def _pipe_inputs(sources: Iterable[Tuple[str, int]]) -> Iterator[Tuple[str, tuple]]:
+    for text, source_id in sources:
+        if not text or not text.strip():
+            continue
+        segments = split_on_days(text)
+        # Day-split sources skip spaCy but still pass through the pipe (as an empty
+        # doc) so chunks come out in input order.
+        yield ("" if segments else text), (text, source_id, segments)
+
+
+def chunk_texts(
+    sources: Iterable[Tuple[str, int]],
+    batch_size: int = PIPE_BATCH_SIZE,
+    n_process: int = 1,
+    long_split: Optional[str] = None,
+    strategy: Optional[ChunkStrategy] = None,
+) -> Iterator[dict]:
+    """`chunk_text` over many `(text, source_id)` pairs, streamed through `nlp.pipe`.
+
+    Chunks are yielded lazily, in input order. `sources` is consumed a batch at a time,
+    so memory stays flat for large imports. `n_process > 1` parses in worker
+    processes. `strategy` (default: from settings) applies to the whole run.
+    """
+    nlp = _get_nlp()
+    strategy = strategy or strategy_from_settings()
+    docs = nlp.pipe(_pipe_inputs(sources), as_tuples=True, batch_size=batch_size, n_process=n_process)
+    for doc, (text, source_id, segments) in docs:
+        segments = segments or _doc_chunks(doc, strategy)
+        yield from _finish_chunks(text, source_id, segments, long_split)
\ No newline at end of file
@@ -0,0 +1,172 @@
+"""Token-budgeted packing of retrieved chunks and chat history into the QA prompt.
+
+Prompt size sets prefill time on local CPU models. Joining every retrieved chunk and
+every replayed message made it grow with chunk length. `pack_context` fills the
+`context_token_budget` setting with chunks in score order:
+  - a chunk whose word shingles mostly match an already packed chunk is dropped as a
+    near-duplicate (overlapping chunks, re-imported notes);
+  - a chunk longer than half the budget, or than what is left of it, is trimmed to
+    the window of sentences around the one that best matches the question;
+  - a chunk that cannot get at least `MIN_TRIM_TOKENS` is skipped.
+`pack_history` keeps the newest messages that fit in `history_token_budget`.
+
+Tokens are estimated without a tokenizer (Ollama does not expose the chat model's
+tokenizer), by default as the larger of the word/punctuation count and chars / 4. Pass
+`count_tokens` to use an exact one.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from app.services.settings_service import get_setting
+
+NEAR_DUPLICATE = 0.8    # Jaccard similarity of word 3-shingles
+MAX_CHUNK_SHARE = 0.5   # no single chunk takes more than this share of the budget
+MIN_TRIM_TOKENS = 48    # below this, a trimmed chunk says too little to be worth it
+SEPARATOR = "\n\n"
+ELLIPSIS = "…"
+
+_WORD_RE = re.compile(r"\w+")
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+|\s*\n+\s*")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate BPE token count: ~4 chars per token, at least one per word or symbol."""
+    if not text:
+        return 0
+    return max(len(_PIECE_RE.findall(text)), (len(text) + 3) // 4)
+
+
+@dataclass
+class PackedContext:
+    text: str                                        # the `{context_str}` block
+    nodes: list[Any] = field(default_factory=list)   # nodes that made it in, in prompt order
+    tokens: int = 0
+    duplicates: int = 0
+    trimmed: int = 0
+    dropped: int = 0                                 # no room left in the budget
+
+    def summary(self) -> str:
+        return (f"{self.tokens} tok from {len(self.nodes)} chunk(s), {self.duplicates} duplicate, "
+                f"{self.trimmed} trimmed, {self.dropped} over budget")
+
+
+def _shingles(text: str) -> set[tuple[str, ...]]:
+    words = [w.lower() for w in _WORD_RE.findall(text)]
+    n = 3 if len(words) >= 3 else 1
+    return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _truncate_words(text: str, max_tokens: int, count_tokens: Callable[[str], int]) -> str:
+    kept, used = [], 0
+    for word in text.split():
+        cost = count_tokens(word) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(word)
+        used += cost
+    return " ".join(kept)
+
+
+def trim_to_query(text: str, question: str, max_tokens: int,
+                  count_tokens: Callable[[str], int] = estimate_tokens) -> str:
+    """The contiguous run of sentences around the best match for `question` that fits `max_tokens`.
+
+    Elided text before or after the window is marked with an ellipsis.
+    """
+    sentences = [s for s in _SENTENCE_RE.split(text) if s.strip()]
+    if not sentences:
+        return ""
+    terms = {w.lower() for w in _WORD_RE.findall(question) if len(w) > 2}
+    overlap = [len(terms & {w.lower() for w in _WORD_RE.findall(s)}) for s in sentences]
+    costs = [count_tokens(s) + 1 for s in sentences]
+    budget = max_tokens - 2  # room for the ellipses
+    anchor = max(range(len(sentences)), key=lambda i: overlap[i])  # earliest on ties
+    lo, hi = anchor, anchor + 1
+    if costs[anchor] > budget:
+        window = [_truncate_words(sentences[anchor], budget, count_tokens)]
+        cut = True
+    else:
+        used, cut = costs[anchor], False
+        while True:
+            # Grow toward the more relevant neighbor; on ties, keep what follows.
+            candidates = [i for i in (hi, lo - 1) if 0 <= i < len(sentences) and used + costs[i] <= budget]
+            if not candidates:
+                break
+            pick = max(candidates, key=lambda i: overlap[i])
+            used += costs[pick]
+            lo, hi = (pick, hi) if pick < lo else (lo, pick + 1)
+        window = sentences[lo:hi]
+    out = " ".join(window)
+    if lo > 0:
+        out = f"{ELLIPSIS} {out}"
+    if cut or hi < len(sentences):
+        out = f"{out} {ELLIPSIS}"
+    return out
+
+
+def pack_context(
+    nodes: list[Any],
+    question: str,
+    budget: Optional[int] = None,
+    count_tokens: Callable[[str], int] = estimate_tokens,
+) -> PackedContext:
+    """Fill `budget` tokens (default: `context_token_budget`) with node texts, best score first."""
+    budget = budget if budget is not None else get_setting("context_token_budget")
+    max_chunk = max(MIN_TRIM_TOKENS, int(budget * MAX_CHUNK_SHARE))
+    separator = count_tokens(SEPARATOR) or 1
+    # Stable sort: ties (and unscored nodes, which sink) keep retrieval order.
+    ordered = sorted(nodes or [], key=lambda n: n.score if n.score is not None else float("-inf"), reverse=True)
+
+    packed = PackedContext(text="")
+    parts: list[str] = []
+    seen: list[set] = []
+    for node in ordered:
+        text = (node.node.get_content() or "").strip()
+        if not text:
+            continue
+        shingles = _shingles(text)
+        if any(_jaccard(shingles, other) >= NEAR_DUPLICATE for other in seen):
+            packed.duplicates += 1
+            continue
+        cap = min(max_chunk, budget - packed.tokens - (separator if parts else 0))
+        cost = count_tokens(text)
+        if cost > cap:
+            if cap < MIN_TRIM_TOKENS:
+                packed.dropped += 1
+                continue
+            text = trim_to_query(text, question, cap, count_tokens)
+            cost = count_tokens(text)
+            packed.trimmed += 1
+        packed.tokens += cost + (separator if parts else 0)
+        parts.append(text)
+        packed.nodes.append(node)
+        seen.append(shingles)
+    packed.text = SEPARATOR.join(parts)
+    return packed
+
+
+def pack_history(
+    history: list[dict[str, str]],
+    budget: Optional[int] = None,
+    count_tokens: Callable[[str], int] = estimate_tokens,
+) -> tuple[list[dict[str, str]], int]:
+    """The newest messages that fit in `budget` tokens (default: `history_token_budget`), and their total."""
+    budget = budget if budget is not None else get_setting("history_token_budget")
+    kept: list[dict[str, str]] = []
+    used = 0
+    for message in reversed(history):
+        cost = count_tokens(message["content"]) + 4  # role + message framing
+        if used + cost > budget:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    return kept, used
@@ -0,0 +1,239 @@
+"""Persistent embedding cache, keyed by (embed model, normalized text hash).
+
+Embedding is the dominant ingestion cost on CPU. Retries, `reindex_chat`, the
+reprocess after every edit and the eval `ingest.py` runs all used to send identical
+chunk text back through Ollama. `CachedOllamaEmbedding` (what `configure_llamaindex`
+installs as `Settings.embed_model`) now checks this cache first. It only sends the
+misses to Ollama, so reprocessing an unchanged source makes zero embedding calls.
+Query embeddings go through the same path.
+
+Vectors live as float32 blobs in a small SQLite file next to the Chroma store. The
+cache is bounded by `MAX_ENTRIES`. When it overflows, the least recently used rows are
+evicted down to `_EVICT_TO` of the limit, so eviction runs in batches instead of on
+every insert. Hits don't write: their `last_used` touches are kept in memory and
+flushed with the next insert (before any eviction), or once `TOUCH_FLUSH_SIZE` pile up
+or `TOUCH_FLUSH_SECONDS` pass. `stats()` reports hit rate and size.
+
+Keys hash the text exactly as it is sent to Ollama, including any query/text
+instruction prefix, after NFC normalization, newline unification and stripping.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+import numpy as np
+from llama_index.embeddings.ollama import OllamaEmbedding
+
+from app import logging_config
+from app.services.chroma import CHROMA_PATH
+
+logger = logging_config.logger
+
+CACHE_PATH = CHROMA_PATH.parent / "embedding_cache.db"
+# nomic-embed-text vectors are 768 float32s (3 KB), so this is roughly 150 MB on disk.
+MAX_ENTRIES = 50_000
+_EVICT_TO = 0.9
+TOUCH_FLUSH_SIZE = 1024
+TOUCH_FLUSH_SECONDS = 300.0
+
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize("NFC", text).replace("\r\n", "\n").strip()
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(_normalize(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: Path, max_entries: int = MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, key TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, key)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._touched: dict[tuple[str, str], float] = {}  # (model, key) -> last use, not yet written
+        self._touched_since = time.monotonic()
+
+    def get_many(self, model: str, texts: Sequence[str]) -> list[Optional[list[float]]]:
+        """Cached vectors in input order, None for misses. Hits are touched for LRU."""
+        keys = [text_key(t) for t in texts]
+        found: dict[str, list[float]] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # Chunked to stay under SQLite's bound-parameter limit.
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({marks})",
+                    (model, *batch),
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                now = time.time()
+                self._touched.update({(model, key): now for key in found})
+                if (len(self._touched) >= TOUCH_FLUSH_SIZE
+                        or time.monotonic() - self._touched_since >= TOUCH_FLUSH_SECONDS):
+                    self._flush_touches_locked()
+                    self._conn.commit()
+            result = [found.get(key) for key in keys]
+            hits = sum(1 for v in result if v is not None)
+            self.hits += hits
+            self.misses += len(result) - hits
+        return result
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        now = time.time()
+        rows = [
+            (model, text_key(t), np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._flush_touches_locked()  # in the same commit, and before eviction reads them
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT INTO embeddings (model, key, vector, last_used) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (model, key) DO UPDATE SET vector = excluded.vector, last_used = excluded.last_used",
+                rows,
+            )
+            self._conn.commit()
+            if self._conn.total_changes - before:
+                self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if self._entries > self.max_entries:
+                self._evict_locked()
+
+    def _flush_touches_locked(self) -> None:
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND key = ?",
+                [(used, model, key) for (model, key), used in self._touched.items()],
+            )
+            self._touched.clear()
+        self._touched_since = time.monotonic()
+
+    def _evict_locked(self) -> None:
+        excess = self._entries - int(self.max_entries * _EVICT_TO)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE (model, key) IN"
+            " (SELECT model, key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._conn.commit()
+        self.evictions += excess
+        self._entries -= excess
+        logger.info(f"Embedding cache: evicted {excess} least recently used entries")
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": self._entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "size_bytes": self.path.stat().st_size if self.path.exists() else 0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._entries = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_touches_locked()
+            self._conn.commit()
+            self._conn.close()
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> EmbeddingCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+                _cache = EmbeddingCache(CACHE_PATH)
+    return _cache
+
+
+def stats() -> dict[str, Any]:
+    return get_cache().stats()
+
+
+class CachedOllamaEmbedding(OllamaEmbedding):
+    """OllamaEmbedding that only sends cache misses to Ollama.
+
+    Overrides the `get_general_*` layer, which receives the final formatted text, so
+    every LlamaIndex entry point (single, batch, query, async) is covered.
+    """
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedOllamaEmbedding"
+
+    def _split(self, texts: list[str]) -> tuple[list[Optional[list[float]]], list[int]]:
+        cached = get_cache().get_many(self.model_name, texts)
+        return cached, [i for i, v in enumerate(cached) if v is None]
+
+    def _fill(self, texts: list[str], cached: list, missing: list[int], fresh: list[list[float]]) -> list[list[float]]:
+        get_cache().put_many(self.model_name, [texts[i] for i in missing], fresh)
+        for i, vector in zip(missing, fresh):
+            cached[i] = vector
+        return cached
+
+    def get_general_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        cached, missing = self._split(texts)
+        if not missing:
+            return cached
+        fresh = super().get_general_text_embeddings([texts[i] for i in missing])
+        return self._fill(texts, cached, missing, fresh)
+
+    async def aget_general_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        cached, missing = self._split(texts)
+        if not missing:
+            return cached
+        fresh = await super().aget_general_text_embeddings([texts[i] for i in missing])
+        return self._fill(texts, cached, missing, fresh)
+
+    def get_general_text_embedding(self, texts: str) -> list[float]:
+        return self.get_general_text_embeddings([texts])[0]
+
+    def get_uncached_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        """Embed `texts` in a single Ollama request without reading or filling the cache.
+
+        For throwaway vectors (semantic split's per-sentence embeddings) that would only
+        evict real chunk vectors; LlamaIndex's batch API would also split them by
+        `embed_batch_size` into sequential requests.
+        """
+        return super().get_general_text_embeddings([self._format_text(text) for text in texts])
+
+    async def aget_general_text_embedding(self, prompt: str) -> list[float]:
+        return (await self.aget_general_text_embeddings([prompt]))[0]
@@ -6,17 +6,18 @@ so app callers pass nothing; experiments inject alternatives without monkeypatch
 """
 from typing import Any, Callable
 
-import ollama
 from llama_index.core import Settings
 from llama_index.core.prompts import PromptTemplate
 
 from app.services.prompt import TEXT_QA_TEMPLATE, CONDENSE_TEMPLATE
 from app.services.retrieval import (
     ranked_retrieve,
-    build_context_str,
     serialize_retrieved_nodes,
 )
+from app.services import ollama_client, ollama_gate
+from app.services.context_packer import estimate_tokens, pack_context
 from app.services.llm_runtime import configure_llamaindex, _llm_model
+from app.services.settings_service import get_setting
 from app import logging_config
 
 logger = logging_config.logger
@@ -67,13 +68,16 @@ def condense_question(history: list[dict[str, str]], question: str) -> str:
         question=question,
     )
     try:
-        response = ollama.chat(
-            model=_llm_model(),
-            messages=[{"role": "user", "content": prompt}],
-            stream=False,
-            think=False,
-            options={"temperature": 0.0},
-        )
+        # Part of answering a chat turn, so it queues at chat priority.
+        with ollama_gate.scheduler.slot_sync(ollama_gate.CHAT):
+            response = ollama_client.sync_client().chat(
+                model=_llm_model(),
+                messages=[{"role": "user", "content": prompt}],
+                stream=False,
+                think=False,
+                options={"temperature": 0.0},
+                keep_alive=get_setting("chat_keep_alive"),
+            )
         rewritten = ((response.get("message") or {}).get("content") or "").strip()
         if rewritten:
             logger.info("condense %r -> %r", question[:80], rewritten[:80])
@@ -97,7 +101,9 @@ def query_sources(
     Shares the retrieval + ranking path with the streaming route via the injected
     `retrieve_fn` (default `ranked_retrieve`), so both routes rank identically.
     `prompt` (default TEXT_QA_TEMPLATE) and `llm` (default Settings.llm) are swappable
-    for experimentation.
+    for experimentation. The context is packed into the `context_token_budget` setting;
+    `sources` lists only the packed nodes; `prompt_tokens` is the estimated size of the
+    whole prompt.
     """
     configure_llamaindex()
     retrieve_fn = retrieve_fn if retrieve_fn is not None else ranked_retrieve
@@ -105,11 +111,14 @@ def query_sources(
     llm = llm if llm is not None else Settings.llm
 
     nodes = retrieve_fn(question, top_k=top_k, modality=modality)
-    context_str = build_context_str(nodes)
-    prompt_str = prompt.format(context_str=context_str, query_str=question)
+    context = pack_context(nodes, question)
+    prompt_str = prompt.format(context_str=context.text, query_str=question)
+    prompt_tokens = estimate_tokens(prompt_str)
+    logger.info("prompt ~%d tok | context %s", prompt_tokens, context.summary())
     answer_text = llm.complete(prompt_str).text
 
     return {
         "answer": answer_text,
-        "sources": serialize_retrieved_nodes(nodes),
+        "sources": serialize_retrieved_nodes(context.nodes),
+        "prompt_tokens": prompt_tokens,
     }
@@ -4,22 +4,17 @@ import asyncio
 import json
 from typing import AsyncIterator, Optional
 
-from ollama import AsyncClient
 from sqlmodel import Session
 
 from app import logging_config
 from app.db import engine
 from app.repositories import chatRepository
-from app.services import chatService
-from app.services.ollama_gate import generation_lock, is_busy
+from app.services import chatService, ollama_client, ollama_gate, ollama_status
+from app.services.context_packer import estimate_tokens, pack_context, pack_history
 from app.services.rag import (
     CONTEXT_QA_TEMPLATE,
     MAX_HISTORY_MESSAGES,
     SYSTEM_PROMPT,
-    build_context_str,
-    check_model_installed,
-    check_ollama_state,
-    classify_ollama_error,
     condense_question,
     model_supports_thinking,
     retrieve_nodes,
@@ -35,7 +30,7 @@ logger = logging_config.logger
 # seamless live-resume.
 _RETENTION_SECONDS = 30
 
-_TERMINAL_TYPES = {"done", "error", "idle"}
+_TERMINAL_TYPES = {"done", "error", "cancelled", "idle"}
 
 
 def _ollama_host() -> str:
@@ -54,16 +49,21 @@ class GenerationJob:
 
     def __init__(self, chat_id: int):
         self.chat_id = chat_id
-        self.status: str = "queued"  # queued | thinking | writing | done | error
+        self.status: str = "queued"  # queued | thinking | writing | done | error | cancelled
         self.events: list[dict] = []  # replay buffer, in emit order
         self.subscribers: set[asyncio.Queue] = set()
         self.message_id: Optional[int] = None
         self.error_detail: Optional[str] = None
         self.task: Optional[asyncio.Task] = None
+        # Set by `cancel()`; read by `_run` when it unwinds, to decide whether the
+        # partial answer gets saved.
+        self.persist_partial = False
+        self.answer_parts: list[str] = []
+        self.thinking_parts: list[str] = []
 
     @property
     def finished(self) -> bool:
-        return self.status in ("done", "error")
+        return self.status in ("done", "error", "cancelled")
 
     def emit(self, event_type: str, **payload) -> None:
         """Record an event and fan it out to every live subscriber."""
@@ -102,6 +102,24 @@ def start(chat_id: int, question: str, top_k: int = 5, modality: Optional[str] =
     return job
 
 
+async def cancel(chat_id: int, persist_partial: bool = False) -> Optional[GenerationJob]:
+    """Stop an in-flight generation and wait for it to unwind.
+
+    Cancelling the task aborts the Ollama stream (closing the connection is what makes
+    the server stop generating) and frees the scheduler slot, so queued requests start
+    right away instead of waiting out an abandoned answer. Subscribers get a terminal
+    `cancelled` event. Returns the job, or None if nothing was generating.
+    """
+    job = _jobs.get(chat_id)
+    if job is None or job.finished or job.task is None:
+        return None
+    job.persist_partial = persist_partial
+    job.task.cancel()
+    # The task swallows its own cancellation, so this returns once it has cleaned up.
+    await asyncio.wait({job.task})
+    return job
+
+
 async def subscribe(chat_id: int) -> AsyncIterator[dict]:
     """Yield a job's events: replay what's buffered, then stream live until terminal.    """
     job = _jobs.get(chat_id)
@@ -133,15 +151,36 @@ async def _evict_later(chat_id: int) -> None:
         _jobs.pop(chat_id, None)
 
 
+def _finish_cancelled(job: GenerationJob) -> None:
+    """Terminal bookkeeping for a cancelled job, saving the partial answer if asked to."""
+    answer_text = "".join(job.answer_parts).strip()
+    if job.persist_partial and answer_text:
+        try:
+            with Session(engine) as session:
+                snapshot = chatService.append_message(
+                    session,
+                    job.chat_id,
+                    role="question",
+                    text=answer_text,
+                    model=_chat_model(),
+                    thinking="".join(job.thinking_parts).strip() or None,
+                )
+            job.message_id = snapshot["id"]
+        except Exception as exc:
+            logger.exception(f"Saving partial answer for chat {job.chat_id} failed: {exc}")
+    job.status = "cancelled"
+    job.emit("cancelled", message_id=job.message_id)
+
+
 async def _run(job: GenerationJob, question: str, top_k: int, modality: Optional[str]) -> None:
     try:
-        ollama_state = check_ollama_state()
-        if ollama_state == "not_installed":
+        current = await ollama_status.astatus()
+        if current.state == "not_installed":
             job.error_detail = "Ollama isn't installed on your machine. Install it from https://ollama.com, then try again."
             job.status = "error"
             job.emit("error", detail=job.error_detail)
             return
-        if ollama_state == "not_running":
+        if current.state == "not_running":
             job.error_detail = "Ollama isn't running on your machine. Start it and send the message again."
             job.status = "error"
             job.emit("error", detail=job.error_detail)
@@ -149,7 +188,7 @@ async def _run(job: GenerationJob, question: str, top_k: int, modality: Optional
 
         embed_model = _embed_model()
         chat_model = _chat_model()
-        missing = [m for m in (embed_model, chat_model) if not check_model_installed(m)]
+        missing = [m for m in (embed_model, chat_model) if not current.has_model(m)]
         if missing:
             commands = " && ".join(f"ollama pull {m}" for m in missing)
             label = "model isn't" if len(missing) == 1 else "models aren't"
@@ -171,23 +210,31 @@ async def _run(job: GenerationJob, question: str, top_k: int, modality: Optional
         # Conversation-aware retrieval: rewrite follow-ups into a standalone query so embeddings match the real topic. 
         search_query = await asyncio.to_thread(condense_question, history, question)
         nodes = await asyncio.to_thread(retrieve_nodes, search_query, top_k=top_k, modality=modality)
-        sources_payload = serialize_retrieved_nodes(nodes)
         logger.info(
             "retrieved %d chunk(s) | original=%r | search_query=%r:\n%s",
-            len(sources_payload),
+            len(nodes),
             question,
             search_query,
-            json.dumps(sources_payload, indent=2, ensure_ascii=False, default=str),
+            json.dumps(serialize_retrieved_nodes(nodes), indent=2, ensure_ascii=False, default=str),
         )
         job.emit("stage", name="retrieved", count=len(nodes))
 
-        context_str = build_context_str(nodes)
-        user_turn = CONTEXT_QA_TEMPLATE.format(context_str=context_str, query_str=question)
+        # Trim around the condensed query: it names the topic a bare follow-up only refers to.
+        context = pack_context(nodes, search_query)
+        # Cite only what the model is shown: duplicates and over-budget chunks are left out.
+        sources_payload = serialize_retrieved_nodes(context.nodes)
+        user_turn = CONTEXT_QA_TEMPLATE.format(context_str=context.text, query_str=question)
+        history, history_tokens = pack_history(history)
         messages = [
             {"role": "system", "content": SYSTEM_PROMPT},
             *history,
             {"role": "user", "content": user_turn},
         ]
+        prompt_tokens = history_tokens + sum(estimate_tokens(m["content"]) + 4 for m in (messages[0], messages[-1]))
+        logger.info(
+            "prompt ~%d tok | context %s | history %d tok in %d message(s)",
+            prompt_tokens, context.summary(), history_tokens, len(history),
+        )
         logger.info(
             "ollama.chat messages (model=%s, think=%s):\n%s",
             chat_model,
@@ -195,41 +242,53 @@ async def _run(job: GenerationJob, question: str, top_k: int, modality: Optional
             json.dumps(messages, indent=2, ensure_ascii=False),
         )
 
-        answer_parts: list[str] = []
-        thinking_parts: list[str] = []
+        answer_parts = job.answer_parts
+        thinking_parts = job.thinking_parts
         wrote_writing_stage = False
         wrote_thinking_stage = False
+        prompt_eval_tokens = None
 
-        # Only one generation hits the model at a time.
-        if is_busy():
-            job.emit("stage", name="queued")
-        async with generation_lock:
+        # Interactive chat outranks background generations queued for the model; while
+        # we wait, each change in our queue position is surfaced as a "queued" stage.
+        def on_position(position: int) -> None:
+            job.emit("stage", name="queued", position=position)
+
+        async with ollama_gate.scheduler.slot(ollama_gate.CHAT, on_position=on_position):
             job.status = "thinking"
-            client = AsyncClient(host=_ollama_host())
-            async for chunk in await client.chat(
+            client = ollama_client.async_client(_ollama_host())
+            stream = await client.chat(
                 model=chat_model,
                 messages=messages,
                 stream=True,
                 think=supports_thinking,
-            ):
-                msg = chunk.get("message", {}) or {}
-                thinking_delta = msg.get("thinking") or ""
-                content_delta = msg.get("content") or ""
-
-                if thinking_delta:
-                    if not wrote_thinking_stage:
-                        wrote_thinking_stage = True
-                        job.emit("stage", name="thinking")
-                    thinking_parts.append(thinking_delta)
-                    job.emit("thinking", delta=thinking_delta)
-
-                if content_delta:
-                    if not wrote_writing_stage:
-                        wrote_writing_stage = True
-                        job.status = "writing"
-                        job.emit("stage", name="writing")
-                    answer_parts.append(content_delta)
-                    job.emit("token", delta=content_delta)
+                keep_alive=get_setting("chat_keep_alive"),
+            )
+            try:
+                async for chunk in stream:
+                    msg = chunk.get("message", {}) or {}
+                    if chunk.get("prompt_eval_count"):
+                        # The chat model's own count (final chunk); excludes KV-cached prefix tokens.
+                        prompt_eval_tokens = chunk.get("prompt_eval_count")
+                    thinking_delta = msg.get("thinking") or ""
+                    content_delta = msg.get("content") or ""
+
+                    if thinking_delta:
+                        if not wrote_thinking_stage:
+                            wrote_thinking_stage = True
+                            job.emit("stage", name="thinking")
+                        thinking_parts.append(thinking_delta)
+                        job.emit("thinking", delta=thinking_delta)
+
+                    if content_delta:
+                        if not wrote_writing_stage:
+                            wrote_writing_stage = True
+                            job.status = "writing"
+                            job.emit("stage", name="writing")
+                        answer_parts.append(content_delta)
+                        job.emit("token", delta=content_delta)
+            finally:
+                # Closes the HTTP response on cancel too, so Ollama stops generating.
+                await stream.aclose()
 
         job.emit("sources", sources=sources_payload)
 
@@ -248,9 +307,16 @@ async def _run(job: GenerationJob, question: str, top_k: int, modality: Optional
 
         job.message_id = snapshot["id"]
         job.status = "done"
-        job.emit("done", model=chat_model, message_id=snapshot["id"])
+        if prompt_eval_tokens is not None:
+            logger.info("prompt evaluated %d tok (estimated %d)", prompt_eval_tokens, prompt_tokens)
+        job.emit(
+            "done", model=chat_model, message_id=snapshot["id"],
+            prompt_tokens=prompt_tokens, prompt_eval_tokens=prompt_eval_tokens,
+        )
+    except asyncio.CancelledError:
+        _finish_cancelled(job)
     except Exception as exc:
-        kind = classify_ollama_error(exc)
+        kind = ollama_status.note_error(exc)
         if kind == "not_running":
             detail = "Ollama stopped while answering. Start it and send the message again."
         elif kind == "model_missing":
@@ -5,17 +5,17 @@ Lives in its own module so `retrieval` and `generation` can both depend on it
 without importing each other (avoids a retrieval↔generation cycle). Holds:
 - settings accessors (`_ollama_base_url` / `_embed_model` / `_llm_model`),
 - the dynamic module attributes shim (`OLLAMA_BASE_URL` / `EMBED_MODEL` / `LLM_MODEL`),
-- Ollama health + capability checks,
+- Ollama health + capability checks (health/installed models are served from the
+  cached `ollama_status` registry),
 - `configure_llamaindex()` which wires `Settings.embed_model` / `Settings.llm`.
 """
-import shutil
 from typing import Any
 
-import httpx
 from llama_index.core import Settings
-from llama_index.embeddings.ollama import OllamaEmbedding
 from llama_index.llms.ollama import Ollama
 
+from app.services import ollama_client, ollama_status
+from app.services.embedding_cache import CachedOllamaEmbedding
 from app.services.settings_service import get_setting
 
 
@@ -45,25 +45,13 @@ def __getattr__(name: str) -> Any:
 
 
 def check_ollama_state() -> str:
-    try:
-        with httpx.Client(timeout=3.0) as client:
-            client.get(_ollama_base_url())
-        return "ok"
-    except httpx.ConnectError:
-        return "not_running" if shutil.which("ollama") else "not_installed"
-    except Exception:
-        return "not_running"
+    """'ok' / 'not_running' / 'not_installed' from the cached status (no round-trip)."""
+    return ollama_status.state()
 
 
 def check_model_installed(model: str) -> bool:
-    try:
-        with httpx.Client(timeout=5.0) as client:
-            response = client.get(f"{_ollama_base_url()}/api/tags")
-            response.raise_for_status()
-            installed = {m.get("name", "") for m in response.json().get("models", [])}
-        return any(name == model or name.startswith(f"{model}:") for name in installed)
-    except Exception:
-        return True
+    """Whether `model` is pulled, from the cached `/api/tags` listing."""
+    return ollama_status.model_installed(model)
 
 
 _thinking_capability_cache: dict[tuple[str, str], bool] = {}
@@ -76,10 +64,9 @@ def model_supports_thinking(model: str) -> bool:
     if key in _thinking_capability_cache:
         return _thinking_capability_cache[key]
     try:
-        with httpx.Client(timeout=5.0) as client:
-            r = client.post(f"{host}/api/show", json={"model": model})
-            r.raise_for_status()
-            supports = "thinking" in (r.json().get("capabilities") or [])
+        r = ollama_client.sync_http(host).post("/api/show", json={"model": model}, timeout=5.0)
+        r.raise_for_status()
+        supports = "thinking" in (r.json().get("capabilities") or [])
     except Exception:
         supports = False
     _thinking_capability_cache[key] = supports
@@ -111,7 +98,7 @@ def _thinking_enabled() -> bool:
     return bool(get_setting("thinking_enabled"))
 
 
-_llamaindex_signature: tuple[str, str, str, bool] | None = None
+_llamaindex_signature: tuple | None = None
 
 
 def configure_llamaindex() -> None:
@@ -121,19 +108,27 @@ def configure_llamaindex() -> None:
     host = _ollama_base_url()
     # Only think when the toggle is on AND the model actually supports it.
     thinking = _thinking_enabled() and model_supports_thinking(llm)
-    signature = (embed, llm, host, thinking)
+    embed_keep_alive = get_setting("embed_keep_alive")
+    chat_keep_alive = get_setting("chat_keep_alive")
+    signature = (embed, llm, host, thinking, embed_keep_alive, chat_keep_alive)
     if _llamaindex_signature == signature:
         return
-    Settings.embed_model = OllamaEmbedding(
+    embed_model = CachedOllamaEmbedding(
         model_name=embed,
         base_url=host,
+        keep_alive=embed_keep_alive,
+        client_kwargs=ollama_client.client_kwargs(),
     )
+    Settings.embed_model = embed_model
     Settings.llm = Ollama(
         model=llm,
         base_url=host,
         request_timeout=6700.0,
         temperature=0.0,
         thinking=thinking,
+        keep_alive=chat_keep_alive,
+        client=ollama_client.sync_client(host),
+        async_client=ollama_client.async_client(host),
     )
     _llamaindex_signature = signature
 
@@ -0,0 +1,299 @@
+"""Process-wide pooled HTTP clients for all Ollama traffic.
+
+Every LLM, embedding and status call used to build its own client (`ollama.AsyncClient`
+per generation, `httpx.AsyncClient` per `/extract-tags`, blocking `httpx.post` in
+tagService, the module-level `ollama.chat` in condense), paying connection setup and
+client construction each time. Now all of them ride on one of two long-lived transports:
+
+- the async pool, used from the event loop (streaming chat, reflection questions, tags),
+- the sync pool, the facade for thread-pool paths (condense, LlamaIndex embeddings and
+  completions, ingestion, health probes).
+
+A transport *is* the connection pool, so the ollama clients and raw httpx clients handed
+out here share keep-alive connections per pool. httpx speaks HTTP/1.1 without pipelining:
+each connection carries one request at a time, so `MAX_CONNECTIONS` is the cap on
+concurrent in-flight requests to Ollama and `MAX_KEEPALIVE` how many stay warm between
+bursts. Clients are cached per host; a host change in settings just yields new clients
+over the same transports.
+
+`pool_stats()` reports in-use / idle connections and how long requests waited for a
+connection, for tuning the limits. The lifespan hook calls `aclose()` on shutdown.
+"""
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import httpx
+import ollama
+
+from app.services.settings_service import get_setting
+
+MAX_CONNECTIONS = 8
+MAX_KEEPALIVE = 4
+KEEPALIVE_EXPIRY_SECONDS = 30.0
+
+# Generations on local CPU models can run for a very long time (matches the LlamaIndex
+# request_timeout we used before). Short calls like health probes pass their own timeout.
+DEFAULT_TIMEOUT = httpx.Timeout(6700.0, connect=10.0, write=30.0, pool=None)
+
+_LIMITS = httpx.Limits(
+    max_connections=MAX_CONNECTIONS,
+    max_keepalive_connections=MAX_KEEPALIVE,
+    keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+)
+
+
+class _PoolStats:
+    """Counters for one pool. Wait = time from sending until a connection was assigned."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.requests = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def begin(self) -> None:
+        with self._lock:
+            self.in_use += 1
+            self.requests += 1
+
+    def end(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def acquired(self, wait: float) -> None:
+        with self._lock:
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self, connections: list) -> dict[str, Any]:
+        with self._lock:
+            requests, wait_total, wait_max, in_use = self.requests, self.wait_total, self.wait_max, self.in_use
+        return {
+            "in_use": in_use,
+            "idle": sum(1 for c in connections if c.is_idle()),
+            "connections": len(connections),
+            "max_connections": MAX_CONNECTIONS,
+            "max_keepalive": MAX_KEEPALIVE,
+            "requests": requests,
+            "wait_ms_avg": round(1000 * wait_total / requests, 3) if requests else 0.0,
+            "wait_ms_max": round(1000 * wait_max, 3),
+        }
+
+
+class _TrackedStream(httpx.SyncByteStream):
+    """Holds the in-use count until the response body is closed (streams outlive the call)."""
+
+    def __init__(self, stream: httpx.SyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close: Optional[Callable[[], None]] = on_close
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            on_close, self._on_close = self._on_close, None
+            if on_close is not None:
+                on_close()
+
+
+class _AsyncTrackedStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close: Optional[Callable[[], None]] = on_close
+
+    async def __aiter__(self):
+        async for part in self._stream:
+            yield part
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            on_close, self._on_close = self._on_close, None
+            if on_close is not None:
+                on_close()
+
+
+class _InstrumentedTransport(httpx.HTTPTransport):
+    def __init__(self, stats: _PoolStats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    def connections(self) -> list:
+        return list(self._pool.connections)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        acquired = False
+        outer_trace = request.extensions.get("trace")
+
+        # httpcore only emits trace events once a connection is assigned, so the first
+        # one marks the end of the pool wait.
+        def trace(event_name, info):
+            nonlocal acquired
+            if not acquired:
+                acquired = True
+                self.stats.acquired(time.perf_counter() - started)
+            if outer_trace is not None:
+                outer_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        self.stats.begin()
+        try:
+            response = super().handle_request(request)
+        except BaseException:
+            self.stats.end()
+            raise
+        response.stream = _TrackedStream(response.stream, self.stats.end)
+        return response
+
+
+class _AsyncInstrumentedTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, stats: _PoolStats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    def connections(self) -> list:
+        return list(self._pool.connections)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        acquired = False
+        outer_trace = request.extensions.get("trace")
+
+        async def trace(event_name, info):
+            nonlocal acquired
+            if not acquired:
+                acquired = True
+                self.stats.acquired(time.perf_counter() - started)
+            if outer_trace is not None:
+                await outer_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        self.stats.begin()
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            self.stats.end()
+            raise
+        response.stream = _AsyncTrackedStream(response.stream, self.stats.end)
+        return response
+
+
+_lock = threading.Lock()
+_sync_stats = _PoolStats()
+_async_stats = _PoolStats()
+_sync_transport: Optional[_InstrumentedTransport] = None
+_async_transport: Optional[_AsyncInstrumentedTransport] = None
+# host -> client, one of each kind per host, all sharing the two transports above.
+_sync_clients: dict[str, ollama.Client] = {}
+_async_clients: dict[str, ollama.AsyncClient] = {}
+_sync_http: dict[str, httpx.Client] = {}
+_async_http: dict[str, httpx.AsyncClient] = {}
+
+
+def _ollama_host() -> str:
+    return get_setting("ollama_host").rstrip("/")
+
+
+def _transports() -> tuple[_InstrumentedTransport, _AsyncInstrumentedTransport]:
+    global _sync_transport, _async_transport
+    if _sync_transport is None or _async_transport is None:
+        with _lock:
+            if _sync_transport is None:
+                _sync_transport = _InstrumentedTransport(_sync_stats, limits=_LIMITS, http2=False)
+            if _async_transport is None:
+                _async_transport = _AsyncInstrumentedTransport(_async_stats, limits=_LIMITS, http2=False)
+    return _sync_transport, _async_transport
+
+
+def _cached(cache: dict, host: str, build: Callable[[], Any]) -> Any:
+    client = cache.get(host)
+    if client is None:
+        with _lock:
+            client = cache.get(host)
+            if client is None:
+                client = cache[host] = build()
+    return client
+
+
+def sync_client(host: Optional[str] = None) -> ollama.Client:
+    """Pooled `ollama.Client` for code running off the event loop."""
+    host = host or _ollama_host()
+    transport, _ = _transports()
+    return _cached(_sync_clients, host, lambda: ollama.Client(host=host, timeout=DEFAULT_TIMEOUT, transport=transport))
+
+
+def async_client(host: Optional[str] = None) -> ollama.AsyncClient:
+    """Pooled `ollama.AsyncClient` for coroutines on the event loop."""
+    host = host or _ollama_host()
+    _, transport = _transports()
+    return _cached(_async_clients, host, lambda: ollama.AsyncClient(host=host, timeout=DEFAULT_TIMEOUT, transport=transport))
+
+
+def sync_http(host: Optional[str] = None) -> httpx.Client:
+    """Raw httpx client (base_url = host) on the sync pool; pass per-request `timeout=`."""
+    host = host or _ollama_host()
+    transport, _ = _transports()
+    return _cached(_sync_http, host, lambda: httpx.Client(base_url=host, timeout=DEFAULT_TIMEOUT, transport=transport))
+
+
+def async_http(host: Optional[str] = None) -> httpx.AsyncClient:
+    """Raw httpx client (base_url = host) on the async pool; pass per-request `timeout=`."""
+    host = host or _ollama_host()
+    _, transport = _transports()
+    return _cached(_async_http, host, lambda: httpx.AsyncClient(base_url=host, timeout=DEFAULT_TIMEOUT, transport=transport))
+
+
+class _PooledTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """Sends a client's sync requests to the sync pool and async ones to the async pool.
+
+    For libraries that build both kinds of client from one set of kwargs. Closing such a
+    client leaves the shared pools open; `aclose()` owns them.
+    """
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return _transports()[0].handle_request(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await _transports()[1].handle_async_request(request)
+
+    def close(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+
+def client_kwargs() -> dict[str, Any]:
+    """Constructor kwargs that put library-built ollama clients (e.g. `OllamaEmbedding(client_kwargs=...)`) on the pools."""
+    return {"timeout": DEFAULT_TIMEOUT, "transport": _PooledTransport()}
+
+
+def pool_stats() -> dict[str, Any]:
+    sync_transport, async_transport = _transports()
+    return {
+        "async": _async_stats.snapshot(async_transport.connections()),
+        "sync": _sync_stats.snapshot(sync_transport.connections()),
+    }
+
+
+async def aclose() -> None:
+    """Close both pools (lifespan shutdown). Clients handed out afterwards start fresh ones."""
+    global _sync_transport, _async_transport
+    with _lock:
+        sync_transport, async_transport = _sync_transport, _async_transport
+        _sync_transport = _async_transport = None
+        _sync_clients.clear()
+        _async_clients.clear()
+        _sync_http.clear()
+        _async_http.clear()
+    if async_transport is not None:
+        await async_transport.aclose()
+    if sync_transport is not None:
+        sync_transport.close()
@@ -1,32 +1,274 @@
-"""Serialize Ollama generation across the whole backend.
+"""Priority-aware scheduling of Ollama generation across the whole backend.
 
-Even though the chat/route handlers are now non-blocking (they offload the
-synchronous Ollama work so the event loop stays free), we still only want *one*
-generation hitting the model at a time — running two heavy generations in
-parallel would compete for the same model/VRAM and degrade both.
+Heavy generations compete for the same model/VRAM, so we only let a few (by default
+one) run at a time. This used to be a single FIFO semaphore, which meant a background
+`/extract-tags` call or a reflection-question stream could sit ahead of the answer the
+user is actively waiting for — and the sync paths (condense, LLM chunk split) bypassed
+it entirely.
 
-`generation_lock` is a process-wide semaphore. Acquire it with `async with` around
-any call that makes Ollama generate. Extra requests queue on the semaphore (FIFO)
-and run as soon as the model is free; they are never rejected. Retrieval and
-embedding calls deliberately stay *outside* the gate so search remains responsive
-while an answer is being written.
+Every call that makes Ollama generate now takes a slot from `scheduler` with a
+priority class:
 
-To allow N concurrent generations later (paired with `OLLAMA_NUM_PARALLEL` on the
-Ollama server), raise the semaphore size below — it is the single knob.
+    CHAT        interactive chat answers (+ their condense step)
+    REFLECTION  interactive reflection questions
+    TAGGING     background tag extraction / suggestions
+    INGESTION   LLM work inside the ingestion pipeline (chunk splitting)
+
+When a slot frees up, the waiter with the best *effective* priority runs next. A
+waiter's effective priority improves by one class every `AGING_SECONDS` it has waited,
+so a flood of chat traffic can delay background work but never starve it. Ties go to
+whoever queued first.
+
+    async with scheduler.slot(CHAT, on_position=...):   # coroutines
+    with scheduler.slot_sync(INGESTION):                # worker threads
+
+`max_concurrent` is meant to pair with `OLLAMA_NUM_PARALLEL` on the Ollama server (read
+from the same env var, default 1). `class_limits` caps how many of those slots one class
+may hold, so background work can be kept off the last slot on multi-slot setups; the
+shared `scheduler` takes them from the `ollama_class_limits` setting (`apply_settings()`
+at startup, and again whenever the setting changes).
+Retrieval and embedding calls deliberately stay *outside* the scheduler so search remains
+responsive while an answer is being written.
 """
 
 import asyncio
+import itertools
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Optional
+
+from app.services import settings_service
+from app.services.settings_service import get_setting
+
+CHAT = 0
+REFLECTION = 1
+TAGGING = 2
+INGESTION = 3
+
+CLASS_NAMES = {CHAT: "chat", REFLECTION: "reflection", TAGGING: "tagging", INGESTION: "ingestion"}
+CLASS_IDS = {name: priority for priority, name in CLASS_NAMES.items()}
+
+AGING_SECONDS = 20.0
+
+
+def _env_parallel() -> int:
+    try:
+        return max(1, int(os.environ.get("OLLAMA_NUM_PARALLEL", "1")))
+    except ValueError:
+        return 1
+
+
+class _Ticket:
+    __slots__ = ("priority", "enqueued_at", "seq", "wake", "on_position", "position", "granted")
+
+    def __init__(self, priority: int, seq: int, wake: Callable[[], None],
+                 on_position: Optional[Callable[[int], None]]):
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.seq = seq
+        self.wake = wake
+        self.on_position = on_position
+        self.position = 0
+        self.granted = False
+
+
+class _ClassStats:
+    __slots__ = ("granted", "wait_total", "wait_max")
+
+    def __init__(self) -> None:
+        self.granted = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class GenerationScheduler:
+    def __init__(self, max_concurrent: int = 1, class_limits: Optional[dict[int, int]] = None,
+                 aging_seconds: float = AGING_SECONDS):
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._waiting: list[_Ticket] = []
+        self._running: dict[int, int] = {p: 0 for p in CLASS_NAMES}
+        self._stats: dict[int, _ClassStats] = {p: _ClassStats() for p in CLASS_NAMES}
+        self.class_limits: dict[int, int] = {}
+        self.configure(max_concurrent, class_limits, aging_seconds)
+
+    def configure(self, max_concurrent: Optional[int] = None, class_limits: Optional[dict[int, int]] = None,
+                  aging_seconds: Optional[float] = None) -> None:
+        """Change the limits at runtime; waiters are re-dispatched under the new limits."""
+        with self._lock:
+            if max_concurrent is not None:
+                self.max_concurrent = max(1, int(max_concurrent))
+            if class_limits is not None:
+                self.class_limits = {p: max(1, int(n)) for p, n in class_limits.items()}
+            if aging_seconds is not None:
+                self.aging_seconds = float(aging_seconds)
+            notify = self._dispatch_locked()
+        self._notify(notify)
+
+    # ------------------------------------------------------------------ core
+
+    def _limit(self, priority: int) -> int:
+        return min(self.class_limits.get(priority, self.max_concurrent), self.max_concurrent)
+
+    def _effective(self, ticket: _Ticket, now: float) -> float:
+        return ticket.priority - (now - ticket.enqueued_at) / self.aging_seconds
+
+    def _order_locked(self, now: float) -> list[_Ticket]:
+        return sorted(self._waiting, key=lambda t: (self._effective(t, now), t.seq))
+
+    def _dispatch_locked(self) -> list[Callable[[], None]]:
+        """Grant free slots to the best eligible waiters. Returns callbacks to run unlocked."""
+        now = time.monotonic()
+        callbacks: list[Callable[[], None]] = []
+        while self._waiting and sum(self._running.values()) < self.max_concurrent:
+            chosen = next(
+                (t for t in self._order_locked(now)
+                 if self._running[t.priority] < self._limit(t.priority)),
+                None,
+            )
+            if chosen is None:
+                break
+            self._waiting.remove(chosen)
+            chosen.granted = True
+            self._running[chosen.priority] += 1
+            stats = self._stats[chosen.priority]
+            wait = now - chosen.enqueued_at
+            stats.granted += 1
+            stats.wait_total += wait
+            stats.wait_max = max(stats.wait_max, wait)
+            callbacks.append(chosen.wake)
+        for position, ticket in enumerate(self._order_locked(now), start=1):
+            if ticket.position != position:
+                ticket.position = position
+                if ticket.on_position is not None:
+                    callbacks.append(lambda cb=ticket.on_position, p=position: cb(p))
+        return callbacks
+
+    @staticmethod
+    def _notify(callbacks: list[Callable[[], None]]) -> None:
+        for callback in callbacks:
+            callback()
+
+    def _enqueue(self, ticket: _Ticket) -> None:
+        with self._lock:
+            self._waiting.append(ticket)
+            notify = self._dispatch_locked()
+        self._notify(notify)
+
+    def _release(self, priority: int) -> None:
+        with self._lock:
+            self._running[priority] -= 1
+            notify = self._dispatch_locked()
+        self._notify(notify)
+
+    def _abandon(self, ticket: _Ticket) -> None:
+        """A waiter gave up (cancelled / interrupted). Frees its slot if it was just granted."""
+        with self._lock:
+            if ticket.granted:
+                self._running[ticket.priority] -= 1
+            elif ticket in self._waiting:
+                self._waiting.remove(ticket)
+            notify = self._dispatch_locked()
+        self._notify(notify)
+
+    # ------------------------------------------------------------------ public API
+
+    @asynccontextmanager
+    async def slot(self, priority: int, on_position: Optional[Callable[[int], None]] = None):
+        """Hold a generation slot for the body of the block (event-loop callers).
+
+        `on_position(n)` is called on the event loop whenever this waiter's place in the
+        queue changes (1 = next up); it is never called if the slot is free immediately.
+        """
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        position_cb = None
+        if on_position is not None:
+            def position_cb(n: int) -> None:
+                loop.call_soon_threadsafe(on_position, n)
+
+        ticket = _Ticket(priority, next(self._seq), wake, position_cb)
+        self._enqueue(ticket)
+        try:
+            await granted
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    @contextmanager
+    def slot_sync(self, priority: int):
+        """Blocking variant for worker threads (never call it on the event loop)."""
+        event = threading.Event()
+        ticket = _Ticket(priority, next(self._seq), event.set, None)
+        self._enqueue(ticket)
+        try:
+            event.wait()
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    def is_busy(self) -> bool:
+        """True if a new request would have to wait for a slot."""
+        with self._lock:
+            return bool(self._waiting) or sum(self._running.values()) >= self.max_concurrent
+
+    def snapshot(self) -> dict[str, Any]:
+        """Queue depth, running counts and wait times per class, for the UI and tuning."""
+        with self._lock:
+            now = time.monotonic()
+            waiting = self._order_locked(now)
+            classes = {}
+            for priority, name in CLASS_NAMES.items():
+                stats = self._stats[priority]
+                queued = [t for t in waiting if t.priority == priority]
+                classes[name] = {
+                    "running": self._running[priority],
+                    "limit": self._limit(priority),
+                    "queued": len(queued),
+                    "oldest_wait_s": round(max((now - t.enqueued_at for t in queued), default=0.0), 3),
+                    "granted": stats.granted,
+                    "wait_s_avg": round(stats.wait_total / stats.granted, 3) if stats.granted else 0.0,
+                    "wait_s_max": round(stats.wait_max, 3),
+                }
+            return {
+                "max_concurrent": self.max_concurrent,
+                "running": sum(self._running.values()),
+                "queue_depth": len(waiting),
+                "queue": [CLASS_NAMES[t.priority] for t in waiting],
+                "classes": classes,
+            }
+
+
+scheduler = GenerationScheduler(max_concurrent=_env_parallel())
+
+
+def _settings_class_limits() -> dict[int, int]:
+    limits = get_setting("ollama_class_limits") or {}
+    return {CLASS_IDS[name]: n for name, n in limits.items() if name in CLASS_IDS}
+
 
-# Size 1 = one generation at a time.
-_MAX_CONCURRENT_GENERATIONS = 1
+def apply_settings() -> None:
+    """Load the `ollama_class_limits` setting into `scheduler`."""
+    scheduler.configure(class_limits=_settings_class_limits())
 
-generation_lock = asyncio.Semaphore(_MAX_CONCURRENT_GENERATIONS)
 
+def _on_settings_change(changed: dict) -> None:
+    if "ollama_class_limits" in changed:
+        apply_settings()
 
-def is_busy() -> bool:
-    """True if a generation is currently holding the gate.
 
-    Used to tell an incoming request it will have to wait, so the UI can show a
-    "queued" state instead of an unexplained pause.
-    """
-    return generation_lock.locked()
+settings_service.on_change(_on_settings_change)
@@ -0,0 +1,201 @@
+"""Cached Ollama reachability + installed-model registry shared by every route.
+
+Before this, `/query`, every generation job and every ingested source made their own
+blocking round-trips (a root GET for health, then a full `/api/tags` fetch per model
+check). Now one `/api/tags` probe answers both questions and its result is held for
+`_TTL_SECONDS`. In the server a background task keeps it fresh, so request handlers
+and the ingestion pipeline only ever read memory; scripts without the refresher fall
+back to refreshing synchronously when the snapshot goes stale. Async handlers use
+`astatus()`, which runs such a probe in a worker thread instead of on the event loop.
+
+Callers that hit an Ollama error pass it to `note_error()`; connection failures (as
+classified by `llm_runtime.classify_ollama_error`) flip the cached state to down
+immediately and missing-model errors drop the model list, so the next check re-probes
+instead of trusting a stale "ok".
+"""
+import asyncio
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import httpx
+
+from app import logging_config
+from app.services import ollama_client, settings_service
+from app.services.settings_service import get_setting
+
+logger = logging_config.logger
+
+_TTL_SECONDS = 10.0
+# While Ollama is down, poll faster so recovery shows up quickly in the UI.
+_DOWN_TTL_SECONDS = 3.0
+_PROBE_TIMEOUT = httpx.Timeout(3.0, read=5.0)
+
+
+@dataclass(frozen=True)
+class OllamaStatus:
+    state: str  # ok | not_running | not_installed
+    host: str
+    models: tuple[dict[str, Any], ...] = ()
+    checked_at: float = 0.0  # time.monotonic() of the probe
+    error: Optional[str] = None
+
+    @property
+    def model_names(self) -> frozenset[str]:
+        return frozenset(m.get("name", "") for m in self.models)
+
+    def has_model(self, model: str) -> bool:
+        if self.state != "ok":
+            # Can't tell; let the real call surface the error (matches the old probe's fallback).
+            return True
+        return any(name == model or name.startswith(f"{model}:") for name in self.model_names)
+
+
+_status: Optional[OllamaStatus] = None
+_refresh_lock = threading.Lock()
+_refresher: Optional[asyncio.Task] = None
+
+
+def _ollama_base_url() -> str:
+    return get_setting("ollama_host").rstrip("/")
+
+
+def _down_state() -> str:
+    return "not_running" if shutil.which("ollama") else "not_installed"
+
+
+def _probe(host: str) -> OllamaStatus:
+    now = time.monotonic()
+    try:
+        response = ollama_client.sync_http(host).get("/api/tags", timeout=_PROBE_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+    except httpx.ConnectError as exc:
+        return OllamaStatus(state=_down_state(), host=host, checked_at=now, error=str(exc))
+    except Exception as exc:
+        return OllamaStatus(state="not_running", host=host, checked_at=now, error=str(exc))
+    models = tuple(
+        {"name": m.get("name", ""), "size": m.get("size")}
+        for m in data.get("models", [])
+        if m.get("name")
+    )
+    return OllamaStatus(state="ok", host=host, models=models, checked_at=now)
+
+
+def _is_fresh(status: Optional[OllamaStatus], host: str) -> bool:
+    if status is None or status.host != host:
+        return False
+    ttl = _TTL_SECONDS if status.state == "ok" else _DOWN_TTL_SECONDS
+    return time.monotonic() - status.checked_at < ttl
+
+
+def refresh(force: bool = False) -> OllamaStatus:
+    """Probe Ollama and publish the result. Concurrent callers share one probe."""
+    global _status
+    host = _ollama_base_url()
+    with _refresh_lock:
+        # Someone else may have refreshed while we waited for the lock.
+        if not force and _is_fresh(_status, host):
+            current = _status
+        else:
+            current = _probe(host)
+            if _status is None or _status.state != current.state:
+                logger.info(f"Ollama at {host}: {current.state}")
+            _status = current
+    return current
+
+
+def _usable(current: Optional[OllamaStatus], host: str) -> bool:
+    if current is None or current.host != host:
+        return False
+    # A stale snapshot is still served while the background refresher is catching up.
+    return _is_fresh(current, host) or (_refresher is not None and not _refresher.done())
+
+
+def status() -> OllamaStatus:
+    """The cached status. Only blocks when there is no usable snapshot yet."""
+    current = _status
+    if _usable(current, _ollama_base_url()):
+        return current
+    return refresh()
+
+
+async def astatus() -> OllamaStatus:
+    """`status()` for async handlers: when a probe is needed it runs off the event loop."""
+    current = _status
+    if _usable(current, _ollama_base_url()):
+        return current
+    return await asyncio.to_thread(refresh)
+
+
+def state() -> str:
+    """'ok', 'not_running' or 'not_installed' — same contract as the old direct probe."""
+    return status().state
+
+
+def model_installed(model: str) -> bool:
+    return status().has_model(model)
+
+
+def missing_models(*models: str) -> list[str]:
+    return [m for m in models if not model_installed(m)]
+
+
+def invalidate() -> None:
+    """Forget the snapshot so the next read re-probes."""
+    global _status
+    _status = None
+
+
+def note_error(exc: Exception) -> str:
+    """Feed an Ollama failure back into the cache; returns its classification."""
+    global _status
+    from app.services.llm_runtime import classify_ollama_error
+
+    kind = classify_ollama_error(exc)
+    current = _status
+    if kind == "not_running":
+        host = current.host if current else _ollama_base_url()
+        _status = OllamaStatus(state=_down_state(), host=host, checked_at=time.monotonic(), error=str(exc))
+    elif kind == "model_missing":
+        invalidate()
+    return kind
+
+
+async def _refresh_loop() -> None:
+    while True:
+        try:
+            current = await asyncio.to_thread(refresh, True)
+            ttl = _TTL_SECONDS if current.state == "ok" else _DOWN_TTL_SECONDS
+        except Exception:
+            logger.exception("Ollama status refresh failed")
+            ttl = _DOWN_TTL_SECONDS
+        await asyncio.sleep(ttl)
+
+
+def start_background_refresh() -> asyncio.Task:
+    """Keep the snapshot warm from the lifespan hook; cancel the task on shutdown."""
+    global _refresher
+    _refresher = asyncio.create_task(_refresh_loop())
+    return _refresher
+
+
+async def stop_background_refresh() -> None:
+    global _refresher
+    task, _refresher = _refresher, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+def _on_settings_change(changed: dict) -> None:
+    if "ollama_host" in changed:
+        invalidate()
+
+
+settings_service.on_change(_on_settings_change)
@@ -2,10 +2,14 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Any, Optional
 
+import numpy as np
+
 HALF_LIFE_DAYS = 90.0  # a chunk this old contributes half the recency weight
 OVERSAMPLE = 4         # candidate pool = top_k * OVERSAMPLE ...
 MIN_POOL = 20          # ... but at least this many, to give re-ranking headroom
 HARD_FILTER_STRICT = False  # False => empty hard range falls back to global search
+FUSED_OVERSAMPLE = 3   # hybrid: rerank only top_k * FUSED_OVERSAMPLE fused candidates ...
+MIN_FUSED_POOL = 12    # ... but at least this many
 
 
 @dataclass(frozen=True)
@@ -17,6 +21,47 @@ class RankWeights:
 DEFAULT_WEIGHTS = RankWeights()
 
 
+@dataclass(frozen=True)
+class FusionWeights:
+    """Reciprocal rank fusion of the dense (Chroma) and lexical (FTS5/BM25) candidates.
+
+    A candidate scores ``sum(weight / (k + rank))`` over the lists it appears in.
+    ``lexical=0`` turns hybrid retrieval off: dense-only, full pool, no fusion.
+    """
+    dense: float = 1.0
+    lexical: float = 1.0
+    k: int = 60
+
+
+DEFAULT_FUSION = FusionWeights()
+
+
+@dataclass(frozen=True)
+class AdaptivePool:
+    """How many fused candidates go to the cross-encoder, chosen per query.
+
+    With a budget, the pool is capped at the pairs the budget affords (at the observed
+    cost per pair). Dense hits far below the best dense score are dropped. The rest is
+    reranked in stages: the top ``top_k * first_stage`` first, doubling only while the
+    reranked top_k reaches into the back half of what was scored, i.e. while the
+    cross-encoder disagrees with the dense order. A collection of at most
+    ``max(top_k, tiny_collection)`` chunks is not reranked at all.
+    ``budget_ms <= 0`` is the static pool: every fused candidate is reranked.
+    """
+    budget_ms: float = 0.0       # per-query cross-encoder budget
+    ms_per_pair: float = 20.0    # cost prior until real rerank timings come in
+    first_stage: int = 2         # first slice = top_k * first_stage
+    dense_margin: float = 0.2    # drop dense hits this far below the best dense score
+    tiny_collection: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_ms > 0
+
+
+STATIC_POOL = AdaptivePool()
+
+
 @dataclass
 class SourceMeta:
     created_at: Optional[datetime] = None
@@ -46,10 +91,60 @@ class ScoreBreakdown:
     total: float
 
 
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_seconds(created_at: Optional[datetime]) -> float:
+    """Naive-UTC datetime -> seconds for `score_batch`; ``None`` -> NaN (unknown age)."""
+    return (created_at - _EPOCH).total_seconds() if created_at is not None else float("nan")
+
+
 @dataclass
+class BatchScores:
+    """Component arrays for a candidate pool, aligned with the input order."""
+    relevance: np.ndarray
+    temporal: np.ndarray
+    total: np.ndarray
+    order: np.ndarray  # indices, best first (stable among ties)
+
+    def breakdown(self, i: int) -> ScoreBreakdown:
+        return ScoreBreakdown(float(self.relevance[i]), float(self.temporal[i]), float(self.total[i]))
+
+
+def score_batch(
+    relevance: np.ndarray,
+    created_at_s: np.ndarray,
+    now_s: float,
+    weights: RankWeights = DEFAULT_WEIGHTS,
+    half_life_days: float = HALF_LIFE_DAYS,
+) -> BatchScores:
+    """`recency_decay` + `combined_score` + sort over a whole pool in one vectorized pass.
+
+    `created_at_s` holds `to_seconds` values (NaN where unknown). Sweeps can build the
+    two arrays once and call this per weight setting.
+    """
+    relevance = np.asarray(relevance, dtype=np.float64)
+    age_days = (now_s - np.asarray(created_at_s, dtype=np.float64)) / 86400.0
+    # Future dates clamp to age 0 (decay 1.0); NaN ages propagate and become neutral.
+    temporal = np.power(0.5, np.maximum(age_days, 0.0) / half_life_days)
+    temporal[np.isnan(temporal)] = 0.5
+    total = weights.relevance * relevance + weights.temporal * temporal
+    order = np.argsort(-total, kind="stable")
+    return BatchScores(relevance, temporal, total, order)
+
+
 class ScoredNode:
-    node: Any
-    breakdown: ScoreBreakdown
+    """A ranked node; its `breakdown` is only materialized when someone reads it (logging)."""
+    __slots__ = ("node", "_scores", "_index")
+
+    def __init__(self, node: Any, scores: BatchScores, index: int):
+        self.node = node
+        self._scores = scores
+        self._index = index
+
+    @property
+    def breakdown(self) -> ScoreBreakdown:
+        return self._scores.breakdown(self._index)
 
 
 def _node_source_id(node_with_score: Any) -> Optional[int]:
@@ -72,14 +167,30 @@ def score_candidates(
     `reranked` is a list of ``(node, relevance)`` pairs from the reranker. Each
     node's ``.score`` is replaced with its blended total; the breakdown lets the
     caller log per-query contributions so the weights can be tuned empirically.
+    Thin wrapper over `score_batch`.
     """
-    scored: list[ScoredNode] = []
-    for node, relevance in reranked:
-        meta = meta_by_id.get(_node_source_id(node))
-        temporal = recency_decay(meta.created_at if meta else None, now)
-        total = combined_score(relevance, temporal, weights)
+    if not reranked:
+        return []
+    nodes, relevance = zip(*reranked)
+    # One datetime conversion per source, not per chunk.
+    seconds_by_id = {sid: to_seconds(meta.created_at) for sid, meta in meta_by_id.items()}
+    nan = float("nan")
+    created_at_s = [seconds_by_id.get(_node_source_id(node), nan) for node in nodes]
+    scores = score_batch(relevance, created_at_s, to_seconds(now), weights)
+    for node, total in zip(nodes, scores.total.tolist()):
         node.score = total
-        scored.append(ScoredNode(node, ScoreBreakdown(relevance, temporal, total)))
+    return [ScoredNode(nodes[i], scores, i) for i in scores.order.tolist()]
+
 
-    scored.sort(key=lambda s: s.breakdown.total, reverse=True)
-    return scored
+def reciprocal_rank_fusion(rankings: list[tuple[list[str], float]], k: int = 60) -> list[tuple[str, float]]:
+    """Fuse ranked id lists, each with a weight, into ``(id, score)`` high-to-low.
+
+    Ties keep first-seen order, so the first list wins among equals.
+    """
+    scores: dict[str, float] = {}
+    for ids, weight in rankings:
+        if weight <= 0:
+            continue
+        for rank, item in enumerate(ids, start=1):
+            scores[item] = scores.get(item, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
@@ -0,0 +1,152 @@
+"""Single-consumer inference worker for the cross-encoder, with micro-batching.
+
+`retrieve_nodes` runs on the default executor via `asyncio.to_thread`. Its cross-encoder
+forward pass used to run there too, competing with Chroma queries, DB work and
+ingestion threads for executor slots and the GIL. Predictions now go to one dedicated
+thread that owns the model. Callers block on a future.
+
+Requests that arrive while a forward pass is running wait in the queue. The next pass
+drains them all, up to `max_pairs`, and scores them in one `predict` call, so
+concurrent chats share the model instead of taking turns. An idle worker starts on
+the next request without waiting. `window_s > 0` trades that latency for bigger
+batches. `stats()` reports queue depth and batch sizes.
+"""
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional, Sequence
+
+from app import logging_config
+
+logger = logging_config.logger
+
+MAX_BATCH_PAIRS = 128
+BATCH_WINDOW_S = 0.0
+
+_STOP = object()
+
+
+class RerankWorker:
+    def __init__(
+        self,
+        score_fn: Callable[[list[tuple[str, str]]], Sequence[float]],
+        max_pairs: int = MAX_BATCH_PAIRS,
+        window_s: float = BATCH_WINDOW_S,
+        threads: Optional[int] = None,
+    ):
+        self._score_fn = score_fn
+        self.max_pairs = max_pairs
+        self.window_s = window_s
+        self.threads = threads
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0, "batches": 0, "pairs": 0, "max_batch_requests": 0, "max_batch_pairs": 0,
+            "wait_ms_total": 0.0, "predict_ms_total": 0.0, "errors": 0,
+        }
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="reranker", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit(self, pairs: list[tuple[str, str]]) -> Future:
+        """Queue `pairs` for scoring; the future resolves to one score per pair."""
+        future: Future = Future()
+        if not pairs:
+            future.set_result([])
+            return future
+        self.start()
+        self._queue.put((pairs, future, time.perf_counter()))
+        return future
+
+    def score(self, pairs: list[tuple[str, str]]) -> list[float]:
+        return self.submit(pairs).result()
+
+    def _pin_threads(self) -> None:
+        # Only if torch is already loaded: importing it after chromadb's onnxruntime
+        # can crash the process, and the ONNX backend sizes its own thread pool.
+        torch = sys.modules.get("torch")
+        if torch is not None and self.threads:
+            torch.set_num_threads(self.threads)
+
+    def _collect(self, first) -> tuple[list, bool]:
+        """`first` plus whatever else is queued, up to `max_pairs`. Returns (batch, stop)."""
+        batch, pairs = [first], len(first[0])
+        deadline = time.perf_counter() + self.window_s
+        while pairs < self.max_pairs:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+            pairs += len(item[0])
+        return batch, False
+
+    def _run(self) -> None:
+        self._pin_threads()
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stop = self._collect(first)
+            started = time.perf_counter()
+            all_pairs = [pair for pairs, _, _ in batch for pair in pairs]
+            try:
+                scores = list(self._score_fn(all_pairs))
+            except Exception as exc:
+                logger.exception("Reranker batch of %d pairs failed", len(all_pairs))
+                for _, future, _ in batch:
+                    future.set_exception(exc)
+                with self._stats_lock:
+                    self._stats["errors"] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            offset = 0
+            for pairs, future, _ in batch:
+                future.set_result(scores[offset:offset + len(pairs)])
+                offset += len(pairs)
+            with self._stats_lock:
+                s = self._stats
+                s["requests"] += len(batch)
+                s["batches"] += 1
+                s["pairs"] += len(all_pairs)
+                s["max_batch_requests"] = max(s["max_batch_requests"], len(batch))
+                s["max_batch_pairs"] = max(s["max_batch_pairs"], len(all_pairs))
+                s["wait_ms_total"] += sum(1000 * (started - enqueued) for _, _, enqueued in batch)
+                s["predict_ms_total"] += 1000 * elapsed
+
+    def stats(self) -> dict[str, Any]:
+        with self._stats_lock:
+            s = dict(self._stats)
+        batches, requests = s["batches"], s["requests"]
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "queue_depth": self._queue.qsize(),
+            "requests": requests,
+            "batches": batches,
+            "pairs": s["pairs"],
+            "errors": s["errors"],
+            "avg_batch_requests": round(requests / batches, 2) if batches else 0.0,
+            "avg_batch_pairs": round(s["pairs"] / batches, 2) if batches else 0.0,
+            "max_batch_requests": s["max_batch_requests"],
+            "max_batch_pairs": s["max_batch_pairs"],
+            "avg_wait_ms": round(s["wait_ms_total"] / requests, 3) if requests else 0.0,
+            "avg_predict_ms": round(s["predict_ms_total"] / batches, 3) if batches else 0.0,
+        }
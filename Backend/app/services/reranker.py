@@ -1,29 +1,279 @@
-"""BGE cross-encoder reranker. Local, multilingual, Apache-2.0; weights download on first use."""
+"""BGE cross-encoder reranker. Local, multilingual, Apache-2.0; weights download on first use.
+
+Two backends, picked by the `reranker_backend` setting:
+  - "torch"     — sentence-transformers `CrossEncoder`, fp32 PyTorch.
+  - "onnx-int8" — the same model exported to ONNX with dynamically quantized int8
+                  weights, run on ONNX Runtime with one intra-op thread per physical
+                  core. The export runs once (needs torch and the `reranker-onnx` extra)
+                  and is cached in `ONNX_DIR`. It runs from warm-up or
+                  `python -m app.services.reranker export`, never on a query; until
+                  it exists, or if it can't load, the torch backend is used.
+Both return sigmoid-activated scores in [0,1]. `reranker_max_length` caps the
+tokenized (question, passage) pair and `reranker_batch_size` sets the pairs per forward
+pass.
+
+Scores are cached per (model, normalized question, node_id, content hash), so re-asks,
+the backfilled union pool and weight/top_k sweeps only send unseen pairs to the model.
+The model part names the scorer that actually loaded, not the configured backend, so
+torch scores from the fallback never pass for int8 ones. An edited chunk or a
+model/backend/max_length change produces new keys, so index changes never need to
+clear the cache. Scores of deleted or re-chunked nodes are dropped with `evict_nodes()`
+where their chunk rows are deleted, so they don't hold LRU slots until they age out.
+
+Model calls run on a dedicated `rerank_worker.RerankWorker` thread rather than the
+caller's executor thread. Misses from concurrent queries are micro-batched into one
+forward pass.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
 from functools import lru_cache
+from pathlib import Path
 from typing import Any
 
+import numpy as np
+
 from app import logging_config
+from app.services.rerank_worker import RerankWorker
+from app.services.settings_service import get_setting
 
 logger = logging_config.logger
 
 MODEL_NAME = "BAAI/bge-reranker-v2-m3"
+ONNX_DIR = Path(__file__).resolve().parent.parent.parent / "database" / "models" / "bge-reranker-v2-m3-onnx-int8"
+ONNX_FILE = "model.int8.onnx"
 
 
-@lru_cache(maxsize=1)
-def _model():
+def physical_cores() -> int:
+    """Physical core count (SMT siblings share execution units, so ORT gains nothing from them)."""
+    try:
+        import psutil
+
+        cores = psutil.cpu_count(logical=False)
+    except ImportError:
+        cores = None
+    return cores or os.cpu_count() or 1
+
+
+def export_onnx(target: Path = ONNX_DIR) -> Path:
+    """Export the cross-encoder to ONNX and quantize its weights to int8. Returns the model path."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    target.mkdir(parents=True, exist_ok=True)
+    logger.info("Exporting reranker %s to ONNX int8 in %s (one-time)", MODEL_NAME, target)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME).eval()
+    sample = tokenizer(["question"], ["passage"], return_tensors="pt")
+    # fp32 weights exceed protobuf's 2 GB limit, so they go to external data files that
+    # are dropped once the (much smaller) int8 model is written.
+    fp32_dir = target / "fp32"
+    fp32_dir.mkdir(exist_ok=True)
+    fp32_path = fp32_dir / "model.onnx"
+    dynamic = {"input_ids": {0: "batch", 1: "sequence"}, "attention_mask": {0: "batch", 1: "sequence"},
+               "logits": {0: "batch"}}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            str(fp32_path),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes=dynamic,
+            opset_version=17,
+        )
+    out = target / ONNX_FILE
+    quantize_dynamic(str(fp32_path), str(out), weight_type=QuantType.QInt8)
+    for path in fp32_dir.iterdir():
+        path.unlink()
+    fp32_dir.rmdir()
+    tokenizer.save_pretrained(target)
+    return out
+
+
+class OnnxCrossEncoder:
+    """`CrossEncoder.predict`-compatible scorer over the int8 ONNX export."""
+
+    def __init__(self, model_dir: Path = ONNX_DIR, max_length: int = 512, threads: int | None = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        if not (model_dir / ONNX_FILE).exists():
+            raise FileNotFoundError(f"No ONNX export in {model_dir}; run `python -m app.services.reranker export`")
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads or physical_cores()
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(model_dir / ONNX_FILE), options, providers=["CPUExecutionProvider"]
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_length = max_length
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def predict(self, pairs: list[tuple[str, str]], batch_size: int = 16) -> np.ndarray:
+        scores = np.empty(len(pairs), dtype=np.float32)
+        # Length-sorted batches pad far less than arrival order.
+        order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            encoded = self.tokenizer(
+                [pairs[i][0] for i in batch],
+                [pairs[i][1] for i in batch],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            feed = {k: v.astype(np.int64) for k, v in encoded.items() if k in self._input_names}
+            logits = self.session.run(["logits"], feed)[0].reshape(-1)
+            scores[batch] = 1.0 / (1.0 + np.exp(-logits))
+        return scores
+
+
+@lru_cache(maxsize=1)  # a setting change drops the old model instead of holding two
+def _load(backend: str, max_length: int):
+    if backend == "onnx-int8":
+        logger.info("Loading reranker %s via ONNX Runtime int8 (max_length=%d)", MODEL_NAME, max_length)
+        try:
+            return OnnxCrossEncoder(max_length=max_length)
+        except Exception as exc:
+            logger.error("ONNX reranker unavailable, falling back to torch: %s", exc)
     from sentence_transformers import CrossEncoder
 
     logger.info("Loading reranker %s (first call downloads weights)", MODEL_NAME)
-    return CrossEncoder(MODEL_NAME)
+    return CrossEncoder(MODEL_NAME, max_length=max_length)
+
+
+_load_lock = threading.Lock()
+
+
+def _model():
+    # Query threads resolve the model for cache keys while the worker predicts; load it once.
+    with _load_lock:
+        return _load(get_setting("reranker_backend"), get_setting("reranker_max_length"))
+
+
+def ensure_onnx_export() -> None:
+    """Run the one-time ONNX export if the `onnx-int8` backend is selected and it's missing.
+
+    Called from warm-up so the multi-minute export never lands on a chat turn. A model
+    already loaded as the torch fallback is dropped so the next call picks up the export.
+    """
+    if get_setting("reranker_backend") != "onnx-int8" or (ONNX_DIR / ONNX_FILE).exists():
+        return
+    try:
+        export_onnx()
+    except Exception as exc:
+        logger.error("ONNX reranker export failed (needs torch and the reranker-onnx extra); "
+                     "the torch backend stays in use: %s", exc)
+        return
+    _load.cache_clear()
+
+
+def _predict(pairs: list[tuple[str, str]]):
+    """Forward pass for one micro-batch; runs on the worker thread."""
+    return _model().predict(pairs, batch_size=get_setting("reranker_batch_size"))
+
+
+_worker = RerankWorker(lambda pairs: _predict(pairs), threads=physical_cores())
+
+
+def worker_stats() -> dict[str, Any]:
+    return _worker.stats()
+
+
+def stop_worker() -> None:
+    _worker.stop()
+
+
+SCORE_CACHE_SIZE = 4096
+_score_cache: OrderedDict[tuple[str, str, str, str], float] = OrderedDict()
+_score_cache_lock = threading.Lock()
+_score_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _score_keys(question: str, nodes: list[Any], texts: list[str]) -> list[tuple[str, str, str, str]]:
+    model = f"{MODEL_NAME}:{type(_model()).__name__}:{get_setting('reranker_max_length')}"
+    query = _digest(" ".join(question.lower().split()))
+    return [(model, query, str(n.node.node_id), _digest(text)) for n, text in zip(nodes, texts)]
+
+
+def invalidate_score_cache() -> None:
+    with _score_cache_lock:
+        _score_cache.clear()
+        _score_cache_stats["invalidations"] += 1
+
+
+def evict_nodes(node_ids) -> int:
+    """Drop the cached scores of these nodes (their chunks were deleted). Returns entries dropped."""
+    ids = {str(node_id) for node_id in node_ids}
+    if not ids:
+        return 0
+    with _score_cache_lock:
+        stale = [key for key in _score_cache if key[2] in ids]
+        for key in stale:
+            del _score_cache[key]
+    return len(stale)
+
+
+def score_cache_stats() -> dict[str, Any]:
+    with _score_cache_lock:
+        lookups = _score_cache_stats["hits"] + _score_cache_stats["misses"]
+        return {
+            **_score_cache_stats,
+            "hit_rate": round(_score_cache_stats["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": len(_score_cache),
+            "max_entries": SCORE_CACHE_SIZE,
+        }
 
 
 def rerank(question: str, nodes: list[Any]) -> list[tuple[Any, float]]:
     """Score each node against the question; returns (node, relevance in [0,1]) in input order.
 
-    CrossEncoder.predict already sigmoid-activates single-label models, so the scores are [0,1].
+    CrossEncoder.predict already sigmoid-activates single-label models, and the ONNX
+    backend applies the same sigmoid, so the scores are [0,1] either way. Cached pairs
+    are reused; the misses go to the model in one batch.
     """
     if not nodes:
         return []
-    pairs = [(question, n.node.get_content() or "") for n in nodes]
-    scores = _model().predict(pairs)
-    return [(node, float(score)) for node, score in zip(nodes, scores)]
+    texts = [n.node.get_content() or "" for n in nodes]
+    keys = _score_keys(question, nodes, texts)
+    with _score_cache_lock:
+        scores: list[float | None] = []
+        for key in keys:
+            score = _score_cache.get(key)
+            if score is not None:
+                _score_cache.move_to_end(key)
+            scores.append(score)
+        missing = [i for i, score in enumerate(scores) if score is None]
+        _score_cache_stats["hits"] += len(keys) - len(missing)
+        _score_cache_stats["misses"] += len(missing)
+        generation = _score_cache_stats["invalidations"]
+    if missing:
+        fresh = _worker.score([(question, texts[i]) for i in missing])
+        with _score_cache_lock:
+            # Scores computed across an invalidation are returned but not kept.
+            keep = generation == _score_cache_stats["invalidations"]
+            for i, score in zip(missing, fresh):
+                scores[i] = float(score)
+                if keep:
+                    _score_cache[keys[i]] = scores[i]
+            while len(_score_cache) > SCORE_CACHE_SIZE:
+                _score_cache.popitem(last=False)
+    return [(node, score) for node, score in zip(nodes, scores)]
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] != ["export"]:
+        sys.exit("usage: python -m app.services.reranker export")
+    print(export_onnx())
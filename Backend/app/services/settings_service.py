@@ -1,6 +1,8 @@
 import json
 import os
+import re
 import threading
+import time
 from pathlib import Path
 from typing import Any
 
@@ -21,6 +23,33 @@ DEFAULTS: dict[str, Any] = {
     "theme": "system",
     "date_format": "dmy",
     "thinking_enabled": True,
+    # Ollama keep_alive per model: a duration ("30m", "2h"), seconds, or -1 for never unload.
+    "chat_keep_alive": "30m",
+    "embed_keep_alive": "2h",
+    # Most OLLAMA_NUM_PARALLEL slots each generation class may hold at once, so
+    # background work can't take every slot ahead of chat. Unlisted classes may use all.
+    "ollama_class_limits": {"tagging": 1, "ingestion": 1},
+    # Ingestion embeds chunks in batches of this size, with up to this many in flight.
+    "embed_batch_size": 32,
+    "embed_concurrency": 2,
+    # Cross-encoder reranker: "torch" (fp32 sentence-transformers) or "onnx-int8".
+    "reranker_backend": "torch",
+    "reranker_max_length": 512,
+    "reranker_batch_size": 16,
+    # Per-query cross-encoder budget for the adaptive rerank pool; 0 reranks the full pool.
+    "rerank_budget_ms": 0,
+    # Prompt budgets (estimated tokens) for retrieved context and replayed chat history.
+    "context_token_budget": 2048,
+    "history_token_budget": 1024,
+    # Sentence boundaries for chunking: "full" spaCy pipeline, "senter" only, or the rule-based "sentencizer".
+    "sentence_segmenter": "full",
+    # How a source that is still one long chunk gets split: "semantic" (embeddings), "llm" or "none".
+    "long_source_split": "semantic",
+    # Sentence packing: "chars" (under 500 characters) or ~chunk_target_tokens counted with
+    # the "embed-tokens" / "reranker-tokens" tokenizer, with sentence overlap.
+    "chunk_strategy": "chars",
+    "chunk_target_tokens": 256,
+    "chunk_overlap_sentences": 1,
 }
 
 ALLOWED_DEVICES = {"cpu", "cuda", "mps", "rocm"}
@@ -28,11 +57,41 @@ ALLOWED_WHISPER_MODELS = {"tiny", "base", "small", "medium", "large-v3"}
 ALLOWED_LANGUAGES = {"en", "nl"}
 ALLOWED_THEMES = {"light", "dark", "system"}
 ALLOWED_DATE_FORMATS = {"dmy", "mdy"}
+ALLOWED_RERANKER_BACKENDS = {"torch", "onnx-int8"}
+ALLOWED_SENTENCE_SEGMENTERS = {"full", "senter", "sentencizer"}
+ALLOWED_LONG_SOURCE_SPLITS = {"semantic", "llm", "none"}
+ALLOWED_CHUNK_STRATEGIES = {"chars", "embed-tokens", "reranker-tokens"}
+ALLOWED_OLLAMA_CLASSES = {"chat", "reflection", "tagging", "ingestion"}
+_INT_RANGES = {
+    "embed_batch_size": (1, 512),
+    "embed_concurrency": (1, 8),
+    "reranker_max_length": (64, 8192),
+    "reranker_batch_size": (1, 128),
+    "rerank_budget_ms": (0, 60000),
+    "context_token_budget": (256, 131072),
+    "history_token_budget": (0, 131072),
+    "chunk_target_tokens": (32, 8192),
+    "chunk_overlap_sentences": (0, 8),
+}
+_KEEP_ALIVE_RE = re.compile(r"^(-?\d+(\.\d+)?(ns|us|ms|s|m|h)|0)$")
 
+# Writers (update_settings / reloads) serialize on _lock; readers never take it.
+# The merged settings live in `_snapshot`, which is replaced wholesale (never
+# mutated in place) so a plain dict read always sees one consistent version.
 _lock = threading.Lock()
 _version = 0
 _listeners: list = []
 
+_snapshot: dict[str, Any] = dict(DEFAULTS)
+_snapshot_stamp: tuple[int, int] | None = None  # (mtime_ns, size) of the file we loaded
+_loaded = False
+
+# Without the watchdog observer (scripts, the eval harness) readers re-stat the
+# file at most this often; with it, the observer invalidates immediately.
+_POLL_INTERVAL_SECONDS = 1.0
+_next_poll = 0.0
+_observer = None
+
 
 def _read_file() -> dict[str, Any]:
     if not _SETTINGS_PATH.exists():
@@ -54,15 +113,77 @@ def _write_file(data: dict[str, Any]) -> None:
     os.replace(tmp, _SETTINGS_PATH)
 
 
-def get_settings() -> dict[str, Any]:
+def _file_stamp() -> tuple[int, int] | None:
+    try:
+        st = _SETTINGS_PATH.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _merge(stored: dict[str, Any]) -> dict[str, Any]:
+    return {**DEFAULTS, **{k: v for k, v in stored.items() if k in DEFAULTS}}
+
+
+def _publish(merged: dict[str, Any], stamp: tuple[int, int] | None) -> dict[str, Any]:
+    """Swap in a new snapshot. Caller holds _lock. Returns the keys that changed."""
+    global _snapshot, _snapshot_stamp, _version, _loaded
+    changed = {k: v for k, v in merged.items() if _snapshot.get(k) != v} if _loaded else {}
+    _snapshot = merged
+    _snapshot_stamp = stamp
+    if changed or not _loaded:
+        _version += 1
+    _loaded = True
+    return changed
+
+
+def _notify(changed: dict[str, Any]) -> None:
+    for listener in list(_listeners):
+        try:
+            listener(changed)
+        except Exception:
+            logger.exception("settings listener failed")
+
+
+def reload(force: bool = False) -> bool:
+    """Re-read settings.json if it changed on disk (or unconditionally with `force`).
+
+    Called by the file observer, by the throttled poll in readers, and by tests.
+    Returns True when a new snapshot was published.
+    """
     with _lock:
-        stored = _read_file()
-        merged = {**DEFAULTS, **{k: v for k, v in stored.items() if k in DEFAULTS}}
-        return merged
+        stamp = _file_stamp()
+        if _loaded and not force and stamp == _snapshot_stamp:
+            return False
+        changed = _publish(_merge(_read_file()), stamp)
+    if changed:
+        logger.info(f"settings.json changed on disk: {sorted(changed)}")
+        _notify(changed)
+    return True
+
+
+def _maybe_reload() -> None:
+    global _next_poll
+    if not _loaded:
+        reload()
+        return
+    if _observer is not None:
+        return
+    now = time.monotonic()
+    if now < _next_poll:
+        return
+    _next_poll = now + _POLL_INTERVAL_SECONDS
+    reload()
+
+
+def get_settings() -> dict[str, Any]:
+    _maybe_reload()
+    return dict(_snapshot)
 
 
 def get_setting(key: str) -> Any:
-    return get_settings().get(key, DEFAULTS.get(key))
+    _maybe_reload()
+    return _snapshot.get(key, DEFAULTS.get(key))
 
 
 def _validate(patch: dict[str, Any]) -> dict[str, Any]:
@@ -85,9 +206,37 @@ def _validate(patch: dict[str, Any]) -> dict[str, Any]:
         elif key == "date_format":
             if value not in ALLOWED_DATE_FORMATS:
                 raise ValueError(f"date_format must be one of {sorted(ALLOWED_DATE_FORMATS)}")
+        elif key == "reranker_backend":
+            if value not in ALLOWED_RERANKER_BACKENDS:
+                raise ValueError(f"reranker_backend must be one of {sorted(ALLOWED_RERANKER_BACKENDS)}")
+        elif key == "sentence_segmenter":
+            if value not in ALLOWED_SENTENCE_SEGMENTERS:
+                raise ValueError(f"sentence_segmenter must be one of {sorted(ALLOWED_SENTENCE_SEGMENTERS)}")
+        elif key == "long_source_split":
+            if value not in ALLOWED_LONG_SOURCE_SPLITS:
+                raise ValueError(f"long_source_split must be one of {sorted(ALLOWED_LONG_SOURCE_SPLITS)}")
+        elif key == "chunk_strategy":
+            if value not in ALLOWED_CHUNK_STRATEGIES:
+                raise ValueError(f"chunk_strategy must be one of {sorted(ALLOWED_CHUNK_STRATEGIES)}")
+        elif key == "ollama_class_limits":
+            if not isinstance(value, dict) or not set(value) <= ALLOWED_OLLAMA_CLASSES:
+                raise ValueError(f"ollama_class_limits must map classes from {sorted(ALLOWED_OLLAMA_CLASSES)} to slot counts")
+            if any(isinstance(n, bool) or not isinstance(n, int) or not 1 <= n <= 64 for n in value.values()):
+                raise ValueError("ollama_class_limits slot counts must be integers between 1 and 64")
         elif key == "thinking_enabled":
             if not isinstance(value, bool):
                 raise ValueError("thinking_enabled must be a boolean")
+        elif key in _INT_RANGES:
+            low, high = _INT_RANGES[key]
+            if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+                raise ValueError(f"{key} must be an integer between {low} and {high}")
+        elif key in ("chat_keep_alive", "embed_keep_alive"):
+            if isinstance(value, str):
+                value = value.strip()
+                if not _KEEP_ALIVE_RE.match(value):
+                    raise ValueError(f"{key} must be a duration like '30m' or '2h', or a number of seconds")
+            elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"{key} must be a duration string or a number of seconds")
         elif key in ("chat_model", "embed_model", "ollama_host", "db_path"):
             if not isinstance(value, str) or not value.strip():
                 raise ValueError(f"{key} must be a non-empty string")
@@ -101,21 +250,58 @@ def update_settings(patch: dict[str, Any]) -> dict[str, Any]:
     cleaned = _validate(patch)
     with _lock:
         current = _read_file()
-        merged = {**DEFAULTS, **{k: v for k, v in current.items() if k in DEFAULTS}, **cleaned}
+        merged = {**_merge(current), **cleaned}
         _write_file(merged)
-        _version += 1
-        listeners = list(_listeners)
-    for listener in listeners:
-        try:
-            listener(cleaned)
-        except Exception:
-            logger.exception("settings listener failed")
-    return merged
+        # A PUT always counts as a new version, even when nothing actually changed.
+        if not _publish(merged, _file_stamp()):
+            _version += 1
+    _notify(cleaned)
+    return dict(merged)
 
 
 def version() -> int:
+    """Monotonic settings version; bumps on every update and on external file edits."""
+    _maybe_reload()
     return _version
 
 
 def on_change(listener) -> None:
+    """Register `listener(changed: dict)`, called after every update or external edit."""
     _listeners.append(listener)
+
+
+def start_watching():
+    """Watch data/ for external edits to settings.json so readers never have to poll.
+
+    Returns the watchdog observer (stop/join it on shutdown) or None if it couldn't start,
+    in which case readers fall back to the throttled mtime poll.
+    """
+    global _observer
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+
+    class _SettingsFileHandler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            paths = {getattr(event, "src_path", None), getattr(event, "dest_path", None)}
+            if any(p and Path(p).name == _SETTINGS_PATH.name for p in paths):
+                reload()
+
+    try:
+        _SETTINGS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        observer = Observer()
+        observer.schedule(_SettingsFileHandler(), str(_SETTINGS_PATH.parent), recursive=False)
+        observer.start()
+    except Exception:
+        logger.exception("settings watcher failed to start; falling back to polling")
+        return None
+    reload()
+    _observer = observer
+    return observer
+
+
+def stop_watching() -> None:
+    global _observer
+    observer, _observer = _observer, None
+    if observer is not None:
+        observer.stop()
+        observer.join()
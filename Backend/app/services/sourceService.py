@@ -1,9 +1,7 @@
 import asyncio
 import os
-import shutil
 import uuid
 
-import httpx
 from pathlib import Path
 from app.schemas.journalSchemas import SimpleRecording
 from fastapi import HTTPException, UploadFile
@@ -12,9 +10,11 @@ import strip_markdown
 
 from app.db import engine
 from app.repositories import sourceRepository
-from app.services.chroma import get_chroma_collection
+from app.services.chroma import get_chroma_collection, restamp_created_at, to_created_at_ts
 from app.services.chunking import chunk_text
-from app.services.rag import check_model_installed, classify_ollama_error, index_chunks
+from app.services import ollama_status
+from app.services.rag import check_model_installed, index_chunks
+from app.services.retrieval import bump_index_version
 from app.services.transcription import TranscriptionManager
 from app.services.settings_service import get_setting
 from app.utils.filename_dates import parse_datetime_from_filename
@@ -31,16 +31,8 @@ logger = logging_config.logger
 #Background processing
 
 def _check_ollama() -> str:
-    """Returns 'ok', 'not_running', or 'not_installed'."""
-    from app.services.settings_service import get_setting
-    try:
-        with httpx.Client(timeout=3.0) as client:
-            client.get(get_setting("ollama_host").rstrip("/"))
-        return "ok"
-    except httpx.ConnectError:
-        return "not_running" if shutil.which("ollama") else "not_installed"
-    except Exception:
-        return "not_running"
+    """Returns 'ok', 'not_running', or 'not_installed' from the cached Ollama status."""
+    return ollama_status.state()
 
 
 def _set_status(source_id: int, status: str) -> None:
@@ -112,16 +104,11 @@ def _process_source_sync(source_id: int) -> None:
             _set_status(source_id, "failed")
             return
 
-        # On retry, prior chunks may exist from a failed run — delete them so we
-        # don't duplicate rows when we re-create below.
-        from app.repositories.chatRepository import delete_chunks_for_source
-        with Session(engine) as session:
-            delete_chunks_for_source(session, source_id)
-
-        # Short-lived write to persist chunks
+        # Diff against the stored chunks (an edited source, a re-indexed chat, a retry):
+        # unchanged rows keep their id and vector; only changed chunks are replaced.
         with Session(engine) as session:
-            db_chunks = sourceRepository.create_chunks(session, source_id, chunks)
-            created_at_ts = int(created_at.timestamp()) if created_at else None
+            diff = sourceRepository.sync_chunks(session, source_id, chunks)
+            created_at_ts = to_created_at_ts(created_at) if created_at else None
             chunk_dicts = [
                 {
                     "id": str(c.id),
@@ -130,36 +117,59 @@ def _process_source_sync(source_id: int) -> None:
                     "created_at_ts": created_at_ts,
                     "modality": file_type,
                 }
-                for c in db_chunks
+                for c in diff.chunks
             ]
 
-        #Vector index (ChromaDB)
-        ollama_state = _check_ollama()
-        if ollama_state != "ok":
-            logger.error(f"Ollama {ollama_state} — cannot index source {source_id}")
-            _set_status(source_id, f"failed_ollama_{ollama_state}")
-            return
-        from app.services.settings_service import get_setting
+        # Reconcile against what Chroma actually holds, so vectors a failed run never
+        # wrote get embedded and ones left behind by older rows get dropped. A vector
+        # from another embed model (or from before vectors were stamped) counts as
+        # stale and its chunk is embedded again.
+        collection = get_chroma_collection()
+        records = collection.get(where={"source_id": str(source_id)}, include=["metadatas"])
         embed_model = get_setting("embed_model")
-        if not check_model_installed(embed_model):
-            logger.error(f"Embedding model {embed_model} not installed — cannot index source {source_id}")
-            _set_status(source_id, "failed_ollama_model_missing")
-            return
-        _set_status(source_id, "indexing")
-        try:
-            index_chunks(chunk_dicts)
-        except Exception as index_exc:
-            kind = classify_ollama_error(index_exc)
-            if kind == "model_missing":
-                logger.error(f"Embedding model missing while indexing source {source_id}: {index_exc}")
-                _set_status(source_id, "failed_ollama_model_missing")
+        current_ids = {c["id"] for c in chunk_dicts}
+        indexed = {
+            vector_id for vector_id, metadata in zip(records["ids"], records["metadatas"])
+            if vector_id in current_ids and (metadata or {}).get("embed_model") == embed_model
+        }
+        to_embed = [c for c in chunk_dicts if c["id"] not in indexed]
+        stale = sorted(set(records["ids"]) - indexed)
+        logger.info(
+            f"Source {source_id}: {diff.kept} chunk(s) unchanged, {len(diff.added)} new, "
+            f"{len(diff.removed_ids)} removed; {len(to_embed)} to embed, {len(stale)} stale vector(s)"
+        )
+        # Drop stale vectors now: their rows are gone (an edit that removed text must stop being
+        # retrievable even if the embedding below fails), and Chroma's add would not
+        # overwrite an outdated vector under the same id.
+        if stale:
+            collection.delete(ids=stale)
+            bump_index_version("process_source")
+
+        #Vector index (ChromaDB)
+        if to_embed:
+            ollama_state = _check_ollama()
+            if ollama_state != "ok":
+                logger.error(f"Ollama {ollama_state} — cannot index source {source_id}")
+                _set_status(source_id, f"failed_ollama_{ollama_state}")
                 return
-            if kind == "not_running":
-                logger.error(f"Ollama stopped while indexing source {source_id}: {index_exc}")
-                _set_status(source_id, "failed_ollama_not_running")
+            if not check_model_installed(embed_model):
+                logger.error(f"Embedding model {embed_model} not installed — cannot index source {source_id}")
+                _set_status(source_id, "failed_ollama_model_missing")
                 return
-            raise
-
+            _set_status(source_id, "indexing")
+            try:
+                index_chunks(to_embed)
+            except Exception as index_exc:
+                kind = ollama_status.note_error(index_exc)
+                if kind == "model_missing":
+                    logger.error(f"Embedding model missing while indexing source {source_id}: {index_exc}")
+                    _set_status(source_id, "failed_ollama_model_missing")
+                    return
+                if kind == "not_running":
+                    logger.error(f"Ollama stopped while indexing source {source_id}: {index_exc}")
+                    _set_status(source_id, "failed_ollama_not_running")
+                    return
+                raise
         _set_status(source_id, "processed")
         logger.info(f"Background processing complete for source {source_id}")
 
@@ -333,10 +343,20 @@ async def update_source(
         text = html_to_text(text_html)
     content_changed = text is not None or text_html is not None
     new_status = "not processed" if (content_changed and source.status == "processed") else None
-    return sourceRepository.update_source_fields(
+    previous_created_at = source.created_at
+    source = sourceRepository.update_source_fields(
         session, source, text=text, text_html=text_html,
         filename=filename, created_at_str=created_at_str, status=new_status
     )
+    # Date-range retrieval filters on the created_at_ts stamped into each chunk's
+    # metadata, so a moved entry must be re-stamped or it stays under its old date.
+    if source.created_at != previous_created_at:
+        try:
+            restamp_created_at(source_id, source.created_at)
+        except Exception as exc:
+            logger.warning(f"Chroma restamp for source {source_id} failed: {exc}")
+        bump_index_version("update_source")
+    return source
 
 
 async def delete_source(session: Session, source_id: int):
@@ -350,6 +370,7 @@ async def delete_source(session: Session, source_id: int):
         get_chroma_collection().delete(where={"source_id": str(source_id)})
     except Exception as exc:
         logger.warning(f"Chroma delete for source {source_id} failed: {exc}")
+    bump_index_version("delete_source")
     return {"ok": True}
 
 
@@ -0,0 +1,150 @@
+"""Process-wide source metadata for recency scoring, kept in memory.
+
+Ranking only needs ``(id, created_at, status, file_type)`` per source. That is a few
+dozen bytes each, and it changes only when a source is created, edited, reprocessed or
+deleted. The table is loaded once at startup and kept current by the write paths in
+`sourceRepository`. `get_sources_meta` is a drop-in `source_meta_provider`, so
+`ranked_retrieve` scores candidates without a SQLite round-trip.
+
+Storage is columnar: parallel lists indexed by a slot per source id. Deleted slots are
+reused. Until `load()` has run, every repository hook is a no-op, and the first lookup
+loads the table.
+"""
+import threading
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlmodel import Session, select
+
+from app import logging_config
+from app.services.ranking import SourceMeta
+
+logger = logging_config.logger
+
+
+class SourceMetaTable:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slot: dict[int, int] = {}
+        self._free: list[int] = []
+        self._created_at: list[Optional[datetime]] = []
+        self._status: list[Optional[str]] = []
+        self._file_type: list[Optional[str]] = []
+        self.loaded = False
+
+    def load(self, rows) -> None:
+        """Replace the contents with ``(id, created_at, status, file_type)`` rows."""
+        with self._lock:
+            self._slot.clear()
+            self._free.clear()
+            self._created_at, self._status, self._file_type = [], [], []
+            for source_id, created_at, status, file_type in rows:
+                self._put_locked(source_id, created_at, status, file_type)
+            self.loaded = True
+
+    def _put_locked(self, source_id: int, created_at, status, file_type) -> None:
+        slot = self._slot.get(source_id)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self._created_at)
+                self._created_at.append(None)
+                self._status.append(None)
+                self._file_type.append(None)
+            self._slot[source_id] = slot
+        self._created_at[slot] = created_at
+        self._status[slot] = status
+        self._file_type[slot] = file_type
+
+    def upsert(self, source_id: int, created_at: Optional[datetime], status: Optional[str],
+               file_type: Optional[str]) -> None:
+        with self._lock:
+            if self.loaded:
+                self._put_locked(source_id, created_at, status, file_type)
+
+    def remove(self, source_id: int) -> None:
+        with self._lock:
+            slot = self._slot.pop(source_id, None)
+            if slot is not None:
+                self._created_at[slot] = self._status[slot] = self._file_type[slot] = None
+                self._free.append(slot)
+
+    def meta(self, source_ids: list[int]) -> dict[int, SourceMeta]:
+        with self._lock:
+            slots = [(sid, self._slot.get(sid)) for sid in source_ids]
+            return {sid: SourceMeta(created_at=self._created_at[slot]) for sid, slot in slots if slot is not None}
+
+    def row(self, source_id: int) -> Optional[dict[str, Any]]:
+        with self._lock:
+            slot = self._slot.get(source_id)
+            if slot is None:
+                return None
+            return {
+                "created_at": self._created_at[slot],
+                "status": self._status[slot],
+                "file_type": self._file_type[slot],
+            }
+
+    def __len__(self) -> int:
+        return len(self._slot)
+
+
+_table = SourceMetaTable()
+_load_lock = threading.Lock()
+
+
+def load(session: Optional[Session] = None) -> int:
+    """(Re)load every source's metadata from SQLite. Returns the number of sources."""
+    from app.db import engine
+    from database.models import Source
+
+    owns_session = session is None
+    session = session or Session(engine)
+    try:
+        rows = session.exec(select(Source.id, Source.created_at, Source.status, Source.file_type)).all()
+    finally:
+        if owns_session:
+            session.close()
+    _table.load(rows)
+    logger.info(f"Source metadata table loaded: {len(rows)} sources")
+    return len(rows)
+
+
+def _ensure_loaded() -> None:
+    if not _table.loaded:
+        with _load_lock:
+            if not _table.loaded:
+                load()
+
+
+def upsert(source: Any) -> None:
+    """Record a source's current created_at/status/file_type (called after commits).
+
+    A no-op until the table is loaded (the load reads the committed row anyway), so a
+    write never has to touch attributes it didn't set.
+    """
+    if not _table.loaded:
+        return
+    _table.upsert(
+        source.id,
+        getattr(source, "created_at", None),
+        getattr(source, "status", None),
+        getattr(source, "file_type", None),
+    )
+
+
+def remove(source_id: int) -> None:
+    _table.remove(source_id)
+
+
+def get_sources_meta(session: Optional[Session], source_ids: list[int]) -> dict[int, SourceMeta]:
+    """`source_meta_provider` backed by the in-memory table; `session` is unused."""
+    if not source_ids:
+        return {}
+    _ensure_loaded()
+    return _table.meta(source_ids)
+
+
+def stats() -> dict[str, Any]:
+    return {"loaded": _table.loaded, "sources": len(_table)}
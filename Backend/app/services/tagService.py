@@ -1,6 +1,7 @@
 import json
 import re
-import httpx
+
+from app.services import ollama_client, ollama_gate
 
 
 def suggest_tags_via_llm(source_text: str) -> list[dict]:
@@ -38,22 +39,18 @@ def _build_prompt(source_text: str) -> str:
 
 def _call_llm(user_prompt: str) -> str:
     from app.services.settings_service import get_setting
-    host = get_setting("ollama_host").rstrip("/")
-
-    response = httpx.post(
-        f"{host}/api/chat",
-        json={
-            "model": get_setting("chat_model"),
-            "stream": False,
-            "messages": [
+
+    with ollama_gate.scheduler.slot_sync(ollama_gate.TAGGING):
+        response = ollama_client.sync_client().chat(
+            model=get_setting("chat_model"),
+            stream=False,
+            messages=[
                 {"role": "system", "content": _SYSTEM_PROMPT},
                 {"role": "user",   "content": user_prompt},
             ],
-        },
-        timeout=httpx.Timeout(connect=10.0, read=300.0, write=10.0, pool=10.0),
-    )
-    response.raise_for_status()
-    return response.json()["message"]["content"]
+            keep_alive=get_setting("chat_keep_alive"),
+        )
+    return response["message"]["content"]
 
 
 
@@ -0,0 +1,177 @@
+"""Startup warm-up of everything the first chat needs, and per-component readiness.
+
+Without this the first question after boot paid for every cold load in sequence: the
+Chroma `PersistentClient`, the spaCy pipeline, the BGE cross-encoder, and Ollama loading
+the embed and chat models into memory. The lifespan hook now calls `start()`, which
+loads them in the background in parallel, and `/ready` reports each component's
+status and load time.
+
+Ollama unloads idle models after its default five minutes. The `chat_keep_alive` and
+`embed_keep_alive` settings set a per-model policy instead. The warm-up requests pass
+them, and so does every regular chat and embed call, because each request resets the
+model's timer to its own keep_alive.
+
+When a setting that names a model changes, the affected components are re-warmed in
+the background, so the next request finds the new model already loaded.
+"""
+import asyncio
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Iterable, Optional
+
+from app import logging_config
+from app.services import ollama_client, ollama_status, settings_service
+from app.services.settings_service import get_setting
+
+logger = logging_config.logger
+
+COMPONENTS = ("chroma", "spacy", "reranker", "embed_model", "chat_model")
+
+# Settings whose change invalidates a warmed component.
+_RELOAD_ON = {
+    "chat_model": ("chat_model",),
+    "chat_keep_alive": ("chat_model",),
+    "embed_model": ("embed_model",),
+    "embed_keep_alive": ("embed_model",),
+    "ollama_host": ("embed_model", "chat_model"),
+    "language": ("spacy",),
+    "sentence_segmenter": ("spacy",),
+    "reranker_backend": ("reranker",),
+    "reranker_max_length": ("reranker",),
+}
+
+
+@dataclass
+class ComponentState:
+    status: str = "pending"  # pending | loading | ready | error
+    target: Optional[str] = None  # model / path that was loaded
+    load_ms: Optional[float] = None
+    error: Optional[str] = None
+
+
+_lock = threading.Lock()
+_state: dict[str, ComponentState] = {name: ComponentState() for name in COMPONENTS}
+_tasks: set[asyncio.Task] = set()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _warm_chroma() -> str:
+    from app.services.chroma import CHROMA_PATH, get_chroma_collection
+
+    get_chroma_collection()
+    return str(CHROMA_PATH)
+
+
+def _warm_spacy() -> str:
+    from app.services.chunking import _get_nlp
+
+    nlp = _get_nlp()
+    nlp("Warm-up.")
+    return f"{nlp.meta.get('lang')}_{nlp.meta.get('name')}"
+
+
+def _warm_reranker() -> str:
+    from app.services import reranker
+
+    reranker.ensure_onnx_export()
+    reranker._model()
+    return f"{reranker.MODEL_NAME} ({get_setting('reranker_backend')})"
+
+
+def _require_model(model: str) -> None:
+    if ollama_status.state() != "ok":
+        raise RuntimeError(f"Ollama is {ollama_status.state().replace('_', ' ')}")
+    if not ollama_status.model_installed(model):
+        raise RuntimeError(f"{model} is not installed (ollama pull {model})")
+
+
+def _warm_embed_model() -> str:
+    model = get_setting("embed_model")
+    _require_model(model)
+    ollama_client.sync_client().embed(model=model, input="warm-up", keep_alive=get_setting("embed_keep_alive"))
+    return model
+
+
+def _warm_chat_model() -> str:
+    model = get_setting("chat_model")
+    _require_model(model)
+    # An empty prompt makes Ollama load the model without generating anything.
+    ollama_client.sync_client().generate(model=model, prompt="", keep_alive=get_setting("chat_keep_alive"))
+    return model
+
+
+_WARMERS: dict[str, Callable[[], str]] = {
+    "chroma": _warm_chroma,
+    "spacy": _warm_spacy,
+    "reranker": _warm_reranker,
+    "embed_model": _warm_embed_model,
+    "chat_model": _warm_chat_model,
+}
+
+
+def _warm_one(name: str) -> None:
+    with _lock:
+        _state[name] = ComponentState(status="loading")
+    started = time.perf_counter()
+    try:
+        target = _WARMERS[name]()
+    except Exception as exc:
+        elapsed = round(1000 * (time.perf_counter() - started), 1)
+        logger.warning(f"Warm-up of {name} failed after {elapsed} ms: {exc}")
+        with _lock:
+            _state[name] = ComponentState(status="error", load_ms=elapsed, error=str(exc))
+        return
+    elapsed = round(1000 * (time.perf_counter() - started), 1)
+    logger.info(f"Warm-up: {name} ({target}) ready in {elapsed} ms")
+    with _lock:
+        _state[name] = ComponentState(status="ready", target=target, load_ms=elapsed)
+
+
+async def warm(components: Iterable[str] = COMPONENTS) -> None:
+    """Load the given components in parallel worker threads; failures are recorded, not raised."""
+    await asyncio.gather(*(asyncio.to_thread(_warm_one, name) for name in components))
+
+
+def start(components: Iterable[str] = COMPONENTS) -> asyncio.Task:
+    """Schedule a background warm-up from the event loop (lifespan hook / settings change)."""
+    global _loop
+    _loop = asyncio.get_running_loop()
+    components = tuple(components)
+    with _lock:
+        for name in components:
+            if _state[name].status != "loading":
+                _state[name] = ComponentState()
+    task = asyncio.create_task(warm(components))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+async def stop() -> None:
+    """Cancel pending warm-ups on shutdown (loads already running in threads finish on their own)."""
+    for task in list(_tasks):
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+
+
+def readiness() -> dict[str, Any]:
+    """`ready` is True once every component has loaded; per-component detail for `/ready`."""
+    with _lock:
+        components = {name: asdict(state) for name, state in _state.items()}
+    return {
+        "ready": all(c["status"] == "ready" for c in components.values()),
+        "components": components,
+    }
+
+
+def _on_settings_change(changed: dict) -> None:
+    stale = sorted({name for key in changed for name in _RELOAD_ON.get(key, ())})
+    loop = _loop
+    if not stale or loop is None or loop.is_closed():
+        return
+    # Settings can change from a request handler or the file watcher thread.
+    loop.call_soon_threadsafe(start, stale)
+
+
+settings_service.on_change(_on_settings_change)
@@ -0,0 +1,59 @@
+"""Micro-benchmark: per-query vector index setup, before vs after caching the index.
+
+`ranked_retrieve` used to build a `ChromaVectorStore`, `StorageContext` and
+`VectorStoreIndex.from_vector_store` on every call (and `index_chunks` on every
+ingested source). This times that setup against the cached `_get_index()` over a
+throwaway Chroma collection, with a mock embed model so Ollama isn't needed. Only
+setup is timed; the similarity search itself is unchanged.
+
+Run from Backend/:  python benchmarks/bench_index_cache.py [--queries 500]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import chromadb  # noqa: E402
+from llama_index.core import MockEmbedding, Settings  # noqa: E402
+
+from app.services import chroma, retrieval  # noqa: E402
+
+
+def _time(fn, queries: int) -> float:
+    start = time.perf_counter()
+    for _ in range(queries):
+        fn()
+    return (time.perf_counter() - start) / queries
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        chroma.COLLECTION_NAME = "bench_chunks"
+        chroma._client = chromadb.PersistentClient(path=tmp)
+        chroma._collection = chroma._client.get_or_create_collection(
+            name=chroma.COLLECTION_NAME, metadata={"hnsw:space": "cosine"}
+        )
+        Settings.embed_model = MockEmbedding(embed_dim=8)
+
+        before = _time(lambda: retrieval._build_index(chroma.get_chroma_collection()), args.queries)
+        retrieval._get_index()  # the one build the cache pays for
+        after = _time(retrieval._get_index, args.queries)
+
+    stats = retrieval.index_stats()
+    print(f"{args.queries} queries")
+    print(f"  before (build index per query) : {before * 1e6:9.1f} us/query")
+    print(f"  after  (cached index)          : {after * 1e6:9.1f} us/query")
+    print(f"  speedup                        : {before / after:9.0f}x")
+    print(f"  builds={stats['builds']} hits={stats['hits']} build_ms_avg={stats['build_ms_avg']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
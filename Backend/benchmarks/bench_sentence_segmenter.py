@@ -0,0 +1,71 @@
+"""Micro-benchmark: `sentence_chunk` per `sentence_segmenter` mode.
+
+Chunks the journals in test_journals/ and the notes of every eval dataset with each
+mode. It reports load time, chunking throughput and how many documents get chunk
+boundaries that differ from the "full" pipeline (the baseline). Modes whose spaCy
+model isn't installed are reported and skipped. The sentencizer needs no model.
+
+Run from Backend/:  python benchmarks/bench_sentence_segmenter.py [--language en] [--repeat 3]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services import chunking  # noqa: E402
+
+REPO = Path(__file__).resolve().parents[2]
+
+
+def _corpus() -> list[tuple[str, str]]:
+    docs = [(f"test_journals/{p.name}", p.read_text(encoding="utf-8"))
+            for p in sorted((REPO / "test_journals").glob("*")) if p.suffix in (".txt", ".md")]
+    for notes in sorted((REPO / "Research" / "RAG" / "eval" / "datasets").glob("*/notes.json")):
+        docs += [(f"{notes.parent.name}/{n['note_id']}", n["text"])
+                 for n in json.loads(notes.read_text(encoding="utf-8"))]
+    return docs
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--language", default="en", choices=sorted(chunking._SPACY_MODELS))
+    parser.add_argument("--modes", nargs="+", default=list(chunking.SEGMENTERS), choices=chunking.SEGMENTERS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    docs = _corpus()
+    chars = sum(len(text) for _, text in docs)
+    print(f"{len(docs)} documents, {chars / 1000:.0f}k chars, language={args.language}\n")
+    print(f"{'mode':<12} {'load s':>7} {'ms/doc':>8} {'k chars/s':>10} {'chunks':>7} {'changed docs':>13}")
+
+    model = chunking._SPACY_MODELS[args.language]
+    baseline = None
+    for mode in args.modes:
+        started = time.perf_counter()
+        try:
+            nlp = chunking._load_nlp(model, mode)
+        except OSError:
+            print(f"{mode:<12} {model} not installed (python -m spacy download {model})")
+            continue
+        load_s = time.perf_counter() - started
+
+        runs = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            chunks = [chunking._doc_chunks(nlp(text)) for _, text in docs]
+            runs.append(time.perf_counter() - started)
+        elapsed = statistics.median(runs)
+        if mode == "full":
+            baseline = chunks
+        changed = "-" if baseline is None else str(sum(a != b for a, b in zip(baseline, chunks)))
+        print(f"{mode:<12} {load_s:>7.2f} {1000 * elapsed / len(docs):>8.2f} {chars / 1000 / elapsed:>10.0f} "
+              f"{sum(len(c) for c in chunks):>7} {changed:>13}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
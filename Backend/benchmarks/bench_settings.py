@@ -0,0 +1,79 @@
+"""Micro-benchmark: settings lookup overhead per chat request, before vs after the snapshot cache.
+
+A single /query-stream turn reads settings roughly this many times: the generation job
+(host / chat / embed model / thinking), two `configure_llamaindex` passes (condense +
+retrieve), the Ollama health + model checks, and the `config._Settings` properties on
+the way. The "before" path replays the old implementation — open + json.load under a
+global lock on every call — against the same settings.json.
+
+Run from Backend/:  python benchmarks/bench_settings.py [--requests 2000]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services import settings_service  # noqa: E402
+
+LOOKUPS_PER_REQUEST = [
+    "ollama_host", "chat_model", "embed_model", "thinking_enabled",  # generation job
+    "embed_model", "chat_model", "ollama_host", "thinking_enabled", "ollama_host",  # configure_llamaindex
+    "embed_model", "chat_model", "ollama_host", "thinking_enabled", "ollama_host",  # configure_llamaindex
+    "ollama_host", "ollama_host", "ollama_host",  # health + installed-model checks
+    "chat_model",  # condense
+    "language", "date_format",  # chunking / filename dates
+]
+
+_legacy_lock = threading.Lock()
+
+
+def _legacy_get_setting(path: Path, key: str):
+    with _legacy_lock:
+        with path.open("r", encoding="utf-8") as f:
+            stored = json.load(f)
+        merged = {**settings_service.DEFAULTS, **{k: v for k, v in stored.items() if k in settings_service.DEFAULTS}}
+    return merged.get(key)
+
+
+def _time(fn, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        for key in LOOKUPS_PER_REQUEST:
+            fn(key)
+    return (time.perf_counter() - start) / requests
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "settings.json"
+        path.write_text(json.dumps(settings_service.DEFAULTS, indent=2), encoding="utf-8")
+        settings_service._SETTINGS_PATH = path
+        settings_service.reload(force=True)
+
+        before = _time(lambda k: _legacy_get_setting(path, k), args.requests)
+        after_poll = _time(settings_service.get_setting, args.requests)
+        # With the watchdog observer running readers skip even the throttled stat.
+        settings_service._observer = object()
+        after_watched = _time(settings_service.get_setting, args.requests)
+        settings_service._observer = None
+
+    n = len(LOOKUPS_PER_REQUEST)
+    print(f"{n} lookups/request, {args.requests} requests")
+    print(f"  before (read file per call) : {before * 1e6:9.1f} us/request")
+    print(f"  after  (snapshot, polling)  : {after_poll * 1e6:9.1f} us/request")
+    print(f"  after  (snapshot, watched)  : {after_watched * 1e6:9.1f} us/request")
+    print(f"  speedup                     : {before / after_watched:9.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -63,6 +63,7 @@ class Chunk(SQLModel, table=True):
     source_id: int = Field(foreign_key="source.id")
     chunk_text: str
     chunk_index: int
+    content_hash: Optional[str] = Field(default=None, max_length=64)  # sha256 of chunk_text
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
     # Relationships
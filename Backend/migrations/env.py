@@ -30,6 +30,13 @@ def render_item(type_, obj, autogen_context):
     return False
 
 
+def include_object(obj, name, type_, reflected, compare_to):
+    # The FTS5 index (and its shadow tables) is managed by raw SQL migrations.
+    if type_ == "table" and name.startswith("chunk_fts"):
+        return False
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -50,6 +57,7 @@ def run_migrations_offline() -> None:
         dialect_opts={"paramstyle": "named"},
         compare_type=True,
         render_item=render_item,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -72,6 +80,7 @@ def run_migrations_online() -> None:
             compare_type=True,
             render_as_batch=True,
             render_item=render_item,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
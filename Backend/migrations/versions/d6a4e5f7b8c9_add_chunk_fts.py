@@ -0,0 +1,34 @@
+"""add FTS5 index over chunk text
+
+Revision ID: d6a4e5f7b8c9
+Revises: c5f3e4d6a7b8
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6a4e5f7b8c9'
+down_revision: Union[str, Sequence[str], None] = 'c5f3e4d6a7b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # External-content table: the text lives in `chunk`; the index is kept in sync by
+    # sourceRepository (create_chunks / delete paths), not by triggers.
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS chunk_fts USING fts5("
+        "chunk_text, content='chunk', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    op.execute("INSERT INTO chunk_fts(chunk_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TABLE IF EXISTS chunk_fts")
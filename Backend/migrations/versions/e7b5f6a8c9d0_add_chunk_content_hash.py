@@ -0,0 +1,40 @@
+"""add content_hash column to chunk
+
+Revision ID: e7b5f6a8c9d0
+Revises: d6a4e5f7b8c9
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b5f6a8c9d0'
+down_revision: Union[str, Sequence[str], None] = 'd6a4e5f7b8c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('chunk') as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+    # Backfill with sourceRepository.chunk_content_hash, so the first reprocess of an
+    # existing source keeps its unchanged chunks.
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, chunk_text FROM chunk")).all()
+    if rows:
+        bind.execute(
+            sa.text("UPDATE chunk SET content_hash = :hash WHERE id = :id"),
+            [{"id": id_, "hash": hashlib.sha256(text.encode("utf-8")).hexdigest()} for id_, text in rows],
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('chunk') as batch_op:
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,44 @@
+import json
+from datetime import datetime
+
+import chromadb
+import pytest
+
+from app.services import chroma
+
+
+@pytest.fixture
+def collection():
+    client = chromadb.EphemeralClient()
+    coll = client.get_or_create_collection("restamp_test")
+    yield coll
+    client.delete_collection("restamp_test")
+
+
+def test_restamp_updates_filter_key_and_node_content(collection, monkeypatch):
+    monkeypatch.setattr(chroma, "_collection", collection)
+    old_ts = chroma.to_created_at_ts(datetime(2025, 1, 1))
+    node = {"id_": "1", "metadata": {"source_id": "7", "created_at_ts": old_ts}}
+    collection.add(
+        ids=["1", "2"],
+        documents=["a", "b"],
+        metadatas=[
+            {"source_id": "7", "created_at_ts": old_ts, "_node_content": json.dumps(node)},
+            {"source_id": "8", "created_at_ts": old_ts},
+        ],
+        embeddings=[[0.0, 1.0], [1.0, 0.0]],
+    )
+
+    moved = datetime(2026, 6, 1, 12)
+    assert chroma.restamp_created_at(7, moved) == 1
+
+    new_ts = chroma.to_created_at_ts(moved)
+    [mine, other] = collection.get(ids=["1", "2"], include=["metadatas"])["metadatas"]
+    assert mine["created_at_ts"] == new_ts
+    assert json.loads(mine["_node_content"])["metadata"]["created_at_ts"] == new_ts
+    assert other["created_at_ts"] == old_ts
+
+
+def test_restamp_without_chunks_is_a_noop(collection, monkeypatch):
+    monkeypatch.setattr(chroma, "_collection", collection)
+    assert chroma.restamp_created_at(99, datetime(2026, 1, 1)) == 0
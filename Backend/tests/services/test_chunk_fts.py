@@ -0,0 +1,111 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.repositories import chatRepository, sourceRepository
+from app.services import reranker
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:  # same DDL as migration d6a4e5f7b8c9
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE chunk_fts USING fts5("
+            "chunk_text, content='chunk', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        ))
+    with Session(engine) as session:
+        yield session
+
+
+def _source(session, text_, file_type="text", created_at=None):
+    source = sourceRepository.create_source(session, status="processed", text=text_)
+    source.file_type = file_type
+    source.created_at = created_at or source.created_at
+    session.add(source)
+    session.commit()
+    return source
+
+
+def test_created_chunks_are_searchable_by_keyword(session):
+    a = _source(session, "a", created_at=datetime(2025, 3, 14, 9, 30))
+    b = _source(session, "b")
+    [amsterdam] = sourceRepository.create_chunks(session, a.id, [{"text": "Took the train to Amsterdam with Marieke."}])
+    sourceRepository.create_chunks(session, b.id, [{"text": "A quiet day at home."}])
+
+    assert sourceRepository.search_chunks_fts(session, "When did I see Marieke?", limit=5) == [amsterdam.id]
+    march = {"start": datetime(2025, 3, 1), "end": datetime(2025, 4, 1)}
+    assert sourceRepository.search_chunks_fts(session, "amsterdam", limit=5, **march) == [amsterdam.id]
+    assert sourceRepository.search_chunks_fts(session, "amsterdam", limit=5, end=datetime(2025, 3, 14)) == []
+    assert sourceRepository.search_chunks_fts(session, "amsterdam", limit=5, modality="audio") == []
+
+
+def test_deleted_chunks_leave_the_index(session):
+    source = _source(session, "a")
+    sourceRepository.create_chunks(session, source.id, [{"text": "Café in Utrecht"}])
+    assert sourceRepository.search_chunks_fts(session, "cafe", limit=5)  # diacritics folded
+
+    chatRepository.delete_chunks_for_source(session, source.id)
+
+    assert sourceRepository.search_chunks_fts(session, "cafe", limit=5) == []
+
+
+def test_match_query_neutralizes_fts_syntax():
+    assert sourceRepository.fts_match_query('NEAR("x" y) OR -z*') == '"near" OR "or"'
+    assert sourceRepository.fts_match_query("?!") is None
+
+
+def test_search_without_fts_table_is_empty():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        assert sourceRepository.search_chunks_fts(session, "anything", limit=5) == []
+
+
+def test_sync_chunks_keeps_unchanged_rows_and_replaces_the_rest(session):
+    source = _source(session, "a")
+    first = sourceRepository.create_chunks(session, source.id, [
+        {"text": "Went to the market."}, {"text": "Bought tomatos."}, {"text": "Cooked soup."},
+    ])
+    ids = [c.id for c in first]
+
+    diff = sourceRepository.sync_chunks(session, source.id, [
+        {"text": "Slept in."}, {"text": "Went to the market."}, {"text": "Bought tomatoes."}, {"text": "Cooked soup."},
+    ])
+
+    assert [c.chunk_text for c in diff.chunks] == ["Slept in.", "Went to the market.", "Bought tomatoes.", "Cooked soup."]
+    assert [c.id for c in diff.chunks][1::2] == [ids[0], ids[2]]  # same rows, so same vectors
+    assert [c.chunk_index for c in diff.chunks] == [0, 1, 2, 3]
+    assert [c.chunk_text for c in diff.added] == ["Slept in.", "Bought tomatoes."]
+    assert diff.removed_ids == [ids[1]] and diff.kept == 2
+    assert sourceRepository.search_chunks_fts(session, "tomatos", limit=5) == []
+    assert sourceRepository.search_chunks_fts(session, "tomatoes", limit=5) == [diff.added[1].id]
+    assert len(sourceRepository.search_chunks_fts(session, "market soup", limit=5)) == 2
+
+
+def test_sync_chunks_rolls_back_when_nothing_is_left(session):
+    source = _source(session, "a")
+    [chunk] = sourceRepository.create_chunks(session, source.id, [{"text": "Café in Utrecht"}])
+
+    with pytest.raises(ValueError):
+        sourceRepository.sync_chunks(session, source.id, [{"text": "  "}])
+
+    assert sourceRepository.search_chunks_fts(session, "cafe", limit=5) == [chunk.id]
+
+
+def test_deleted_chunks_are_evicted_from_the_rerank_cache(session, monkeypatch):
+    evicted = []
+    monkeypatch.setattr(reranker, "evict_nodes", lambda ids: evicted.append(sorted(ids)))
+    source = _source(session, "a")
+    first = sourceRepository.create_chunks(session, source.id, [{"text": "Went to the market."}, {"text": "Cooked soup."}])
+
+    diff = sourceRepository.sync_chunks(session, source.id, [{"text": "Went to the market."}, {"text": "Baked bread."}])
+    chatRepository.delete_chunks_for_source(session, source.id)
+    other = _source(session, "b")
+    [kept] = sourceRepository.create_chunks(session, other.id, [{"text": "A quiet day at home."}])
+    sourceRepository.delete_source(session, other.id)
+
+    assert evicted == [[first[1].id], sorted([first[0].id, diff.added[0].id]), [kept.id]]
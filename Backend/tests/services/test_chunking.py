@@ -0,0 +1,151 @@
+import pytest
+
+from app.services import chunking
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    values = {"language": "en", "sentence_segmenter": "sentencizer"}
+    monkeypatch.setattr(chunking, "get_setting", values.get)
+    monkeypatch.setattr(chunking, "_nlp_cache", {})
+    return values
+
+
+def test_sentencizer_mode_needs_no_model_and_is_cached(settings, monkeypatch):
+    monkeypatch.setattr(chunking.spacy, "load", lambda *a, **k: pytest.fail("no model should load"))
+
+    nlp = chunking._get_nlp()
+
+    assert nlp.pipe_names == ["sentencizer"]
+    assert chunking._get_nlp() is nlp
+    assert list(chunking._nlp_cache) == ["en_core_web_sm:sentencizer"]
+    assert chunking.sentence_chunk("I slept well. Then I went to work! Was it fun?") == [
+        "I slept well. Then I went to work! Was it fun?"
+    ]
+
+
+def test_senter_mode_loads_only_sentence_boundaries(settings, monkeypatch):
+    loads = []
+
+    def fake_load(name, exclude=()):
+        loads.append((name, list(exclude)))
+        nlp = chunking.spacy.blank("en")
+        nlp.add_pipe("sentencizer", name="senter")
+        nlp.disable_pipe("senter")
+        return nlp
+
+    monkeypatch.setattr(chunking.spacy, "load", fake_load)
+    settings["sentence_segmenter"] = "senter"
+
+    nlp = chunking._get_nlp()
+
+    assert loads == [("en_core_web_sm", chunking._NON_SENTENCE_PIPES)]
+    assert nlp.pipe_names == ["senter"]  # re-enabled
+    assert len(chunking._doc_chunks(nlp("One. " * 200))) > 1
+
+
+def test_chunk_texts_streams_in_input_order_with_the_day_split_fast_path(settings, monkeypatch):
+    parsed = []
+    monkeypatch.setattr(chunking, "_doc_chunks", lambda doc, strategy=None: parsed.append(doc.text) or [doc.text])
+    pulled = []
+
+    def sources():
+        for text, source_id in [("Monday\ngym\nTuesday\nwork", 1), ("   ", 2), ("A plain note.", 3),
+                                ("Another note.", 4)]:
+            pulled.append(source_id)
+            yield text, source_id
+
+    chunks = chunking.chunk_texts(sources(), batch_size=2)
+    assert next(chunks) == {"text": "Monday gym", "source_id": 1}
+    assert 4 not in pulled  # consumed a batch at a time, not up front
+
+    assert list(chunks) == [
+        {"text": "Tuesday work", "source_id": 1},
+        {"text": "A plain note.", "source_id": 3},
+        {"text": "Another note.", "source_id": 4},
+    ]
+    assert parsed == ["A plain note.", "Another note."]  # day-split source never hit spaCy
+
+
+def test_similarity_segmenter_cuts_at_the_topic_shift():
+    units = [f"work sentence number {i} about the office and meetings" for i in range(5)]
+    units += [f"holiday sentence number {i} about the beach and sunshine" for i in range(5)]
+    embeddings = [[1.0, 0.1]] * 5 + [[0.1, 1.0]] * 5
+
+    segments = chunking.segment_by_similarity(units, embeddings, min_chars=100, max_chars=1000)
+
+    assert segments == [" ".join(units[:5]), " ".join(units[5:])]
+
+
+def test_similarity_segmenter_enforces_max_size_without_a_valley():
+    units = [f"sentence {i:02d} " + "x" * 50 for i in range(30)]
+
+    segments = chunking.segment_by_similarity(units, [[1.0, 0.0]] * 30, min_chars=200, max_chars=500)
+
+    assert " ".join(segments) == " ".join(units)
+    assert all(200 <= len(s) <= 500 for s in segments)
+
+
+def test_long_single_chunk_uses_the_semantic_split_unless_llm_is_opted_in(settings, monkeypatch):
+    calls = []
+    monkeypatch.setattr(chunking, "semantic_split_source", lambda text: calls.append("semantic") or ["a", "b"])
+    monkeypatch.setattr(chunking, "llm_split_source", lambda text: calls.append("llm") or ["c"])
+    settings["long_source_split"] = "semantic"
+    long_text = "word " * 300  # no sentence ends: one chunk over LONG_SOURCE_CHARS
+
+    assert [c["text"] for c in chunking.chunk_text(long_text, 1)] == ["a", "b"]
+    assert [c["text"] for c in chunking.chunk_text(long_text, 1, long_split="llm")] == ["c"]
+    assert [c["text"] for c in chunking.chunk_text(long_text, 1, long_split="none")] == [long_text.strip()]
+    assert calls == ["semantic", "llm"]
+
+
+def _words(texts):
+    return [len(t.split()) for t in texts]
+
+
+def test_pack_sentences_fills_the_target_with_sentence_overlap():
+    sentences = [f"s{i} a b c" for i in range(6)]  # 4 "tokens" each
+
+    chunks = chunking.pack_sentences(sentences, _words, target_tokens=12, max_tokens=16, overlap_sentences=1)
+
+    assert chunks == ["s0 a b c s1 a b c s2 a b c", "s2 a b c s3 a b c s4 a b c", "s4 a b c s5 a b c"]
+    assert chunking.pack_sentences(sentences, _words, 12, 16) == [
+        "s0 a b c s1 a b c s2 a b c", "s3 a b c s4 a b c s5 a b c"
+    ]
+
+
+def test_pack_sentences_never_exceeds_max_tokens():
+    sentences = ["short one", "x " * 25, "a b c d e f", "g h i j k l"]
+
+    chunks = chunking.pack_sentences(sentences, _words, target_tokens=8, max_tokens=10, overlap_sentences=1)
+
+    # The long sentence is cut into word runs; overlap is dropped when it won't fit.
+    assert _words(chunks) == [2, 10, 10, 5, 6, 6]
+    assert chunks[-2:] == ["a b c d e f", "g h i j k l"]
+
+
+def test_token_strategy_falls_back_to_estimates_and_caps_at_the_embed_window(settings, monkeypatch):
+    monkeypatch.setattr(chunking, "_load_tokenizer", lambda name: None)
+    settings.update(embed_model="mxbai-embed-large:latest", chunk_strategy="embed-tokens",
+                    chunk_target_tokens=4096, chunk_overlap_sentences=0)
+
+    count, window = chunking.token_counter("embed-tokens")
+    assert window == 512 - chunking.SPECIAL_TOKENS
+    assert count(["one two three"]) == [4]  # estimate_tokens
+
+    text = " ".join(f"Sentence number {i} is about something." for i in range(200))
+    chunks = chunking.chunk_text(text, 7)
+    assert len(chunks) > 1
+    assert all(max(count([c["text"]])) <= window for c in chunks)
+    chars = chunking.chunk_text(text, 7, strategy=chunking.ChunkStrategy())
+    assert all(len(c["text"]) < chunking.CHAR_LIMIT for c in chars)
+
+
+def test_strategy_labels_round_trip():
+    strategy = chunking.ChunkStrategy.from_label("reranker-tokens:128:2")
+
+    assert strategy == chunking.ChunkStrategy("reranker-tokens", 128, 2)
+    assert chunking.ChunkStrategy.from_label(strategy.label) == strategy
+    assert chunking.ChunkStrategy.from_label("chars").label == "chars"
+    with pytest.raises(ValueError):
+        chunking.ChunkStrategy.from_label("chars:100")
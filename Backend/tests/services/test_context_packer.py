@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+from app.services import context_packer
+from app.services.context_packer import estimate_tokens, pack_context, pack_history, trim_to_query
+
+
+def make_node(text, score):
+    return SimpleNamespace(node=SimpleNamespace(get_content=lambda: text), score=score)
+
+
+def words(n, word="filler"):
+    return " ".join(f"{word}{i}" for i in range(n))
+
+
+def test_estimate_tokens_counts_words_and_long_text():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("I was in Amsterdam.") == 5  # 4 words + period
+    assert estimate_tokens("x" * 400) == 100  # chars / 4 for long runs
+
+
+def test_packs_best_score_first_within_budget():
+    low, high, mid = make_node(words(40, "low"), 0.1), make_node(words(40, "high"), 0.9), make_node(words(40, "mid"), 0.5)
+
+    packed = pack_context([low, high, mid], "q", budget=160)
+
+    assert packed.nodes == [high, mid]  # the third no longer fits
+    assert packed.text.startswith("high0")
+    assert packed.dropped == 1
+    assert packed.tokens <= 160
+
+
+def test_near_duplicates_are_dropped():
+    text = "Today I walked along the canal and met Sam at the bakery on the corner."
+    packed = pack_context(
+        [make_node(text, 0.9), make_node(text.replace("Today", "today,"), 0.8), make_node("Something else entirely.", 0.7)],
+        "q", budget=1024,
+    )
+
+    assert packed.duplicates == 1
+    assert len(packed.nodes) == 2
+
+
+def test_oversized_chunk_is_trimmed_around_the_matching_sentence():
+    sentences = [f"{words(20, f's{i}_')}." for i in range(10)]
+    sentences[4] = "In March I moved to Utrecht for the new job."
+    packed = pack_context([make_node(" ".join(sentences), 1.0)], "when did I move to Utrecht", budget=256)
+
+    assert packed.trimmed == 1
+    assert "moved to Utrecht" in packed.text
+    assert packed.text.startswith(context_packer.ELLIPSIS) and packed.text.endswith(context_packer.ELLIPSIS)
+    assert packed.tokens <= 256 * context_packer.MAX_CHUNK_SHARE
+
+
+def test_trim_keeps_whole_text_order_and_marks_cut_sentences():
+    out = trim_to_query(f"Utrecht {words(200)}", "Utrecht", 50)
+    assert out.startswith("Utrecht filler0") and out.endswith(context_packer.ELLIPSIS)
+    assert estimate_tokens(out) <= 50
+
+
+def test_history_keeps_the_newest_messages_that_fit():
+    history = [{"role": "user", "content": words(100)}, {"role": "assistant", "content": "short"},
+               {"role": "user", "content": "latest"}]
+
+    kept, tokens = pack_history(history, budget=50)
+
+    assert kept == history[1:]
+    assert tokens == estimate_tokens("short") + estimate_tokens("latest") + 8  # + message framing
+
+
+def test_query_sources_cites_only_the_packed_chunks(monkeypatch):
+    from app.services import generation
+
+    def node(text, score, node_id):
+        return SimpleNamespace(node=SimpleNamespace(get_content=lambda: text, metadata={}, node_id=node_id),
+                               score=score)
+
+    monkeypatch.setattr(generation, "configure_llamaindex", lambda: None)
+    monkeypatch.setattr(context_packer, "get_setting", {"context_token_budget": 1024}.get)
+    text = words(30)
+    nodes = [node(text, 0.9, "a"), node(text + " again", 0.8, "b"), node("Other news.", 0.5, "c")]
+
+    result = generation.query_sources(
+        "q", retrieve_fn=lambda *a, **k: nodes,
+        llm=SimpleNamespace(complete=lambda prompt: SimpleNamespace(text="answer")),
+    )
+
+    assert [s["node_id"] for s in result["sources"]] == ["a", "c"]  # "b" was a near-duplicate
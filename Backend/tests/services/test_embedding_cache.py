@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import embedding_cache
+from app.services.embedding_cache import CachedOllamaEmbedding, EmbeddingCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = EmbeddingCache(tmp_path / "embeddings.db", max_entries=10)
+    monkeypatch.setattr(embedding_cache, "_cache", cache)
+    yield cache
+    cache.close()
+
+
+class _FakeClient:
+    """Stands in for ollama.Client.embed; records every batch that reaches Ollama."""
+
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, model, input, **kwargs):
+        texts = [input] if isinstance(input, str) else list(input)
+        self.calls.append(texts)
+        return SimpleNamespace(embeddings=[[float(len(t)), 1.0] for t in texts])
+
+
+def test_roundtrip_and_hit_rate(cache):
+    cache.put_many("m", ["a", "bb"], [[0.5, 1.0], [2.0, 3.0]])
+
+    assert cache.get_many("m", ["bb", "zzz", "a"]) == [[2.0, 3.0], None, [0.5, 1.0]]
+    assert cache.get_many("other-model", ["a"]) == [None]
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (2, 2, 2)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_keys_ignore_surrounding_whitespace_and_line_endings(cache):
+    cache.put_many("m", ["line one\r\nline two  "], [[1.0]])
+    assert cache.get_many("m", ["  line one\nline two"]) == [[1.0]]
+
+
+def test_lru_eviction_keeps_recently_used(cache):
+    cache.put_many("m", [f"t{i}" for i in range(10)], [[float(i)] for i in range(10)])
+    cache.get_many("m", ["t0"])  # touch the oldest so it survives
+
+    cache.put_many("m", ["new"], [[99.0]])
+
+    stats = cache.stats()
+    assert stats["entries"] == 9  # evicted down to 90% of max_entries
+    assert stats["evictions"] == 2
+    assert cache.get_many("m", ["t0", "new", "t1"]) == [[0.0], [99.0], None]
+
+
+def test_hits_do_not_write_until_the_next_insert(cache):
+    cache.put_many("m", ["a", "b"], [[1.0], [2.0]])
+    writes = cache._conn.total_changes
+
+    for _ in range(5):
+        assert cache.get_many("m", ["a", "b"]) == [[1.0], [2.0]]
+    assert cache._conn.total_changes == writes  # touches wait in memory
+
+    cache.put_many("m", ["c"], [[3.0]])
+    assert cache._conn.total_changes == writes + 3  # two touches flushed with the insert
+
+
+def test_unchanged_text_is_never_re_embedded(cache):
+    embed = CachedOllamaEmbedding(model_name="nomic-embed-text", base_url="http://ollama.test")
+    client = _FakeClient()
+    embed._client = client
+
+    first = embed.get_text_embedding_batch(["alpha", "beta"])
+    again = embed.get_text_embedding_batch(["beta", "alpha", "gamma"])
+    query = embed.get_query_embedding("alpha")
+
+    assert client.calls == [["alpha", "beta"], ["gamma"]]
+    assert again[:2] == [first[1], first[0]]
+    assert query == first[0]
+
+
+def test_uncached_embeddings_skip_the_cache_in_one_request(cache):
+    embed = CachedOllamaEmbedding(model_name="nomic-embed-text", base_url="http://ollama.test", embed_batch_size=2)
+    client = _FakeClient()
+    embed._client = client
+    embed.get_text_embedding_batch(["alpha"])
+
+    vectors = embed.get_uncached_text_embeddings(["alpha", "beta", "gamma"])
+
+    assert client.calls == [["alpha"], ["alpha", "beta", "gamma"]]
+    assert vectors[1] == [4.0, 1.0]
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,117 @@
+import asyncio
+import contextlib
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import generation_registry, ollama_gate, ollama_status
+from app.services.ollama_status import OllamaStatus
+
+
+class _EndlessStream:
+    """Stands in for Ollama's chat stream: keeps producing tokens until closed."""
+
+    def __init__(self):
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(0.001)
+        return {"message": {"content": "word "}}
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_run(monkeypatch):
+    stream = _EndlessStream()
+    saved = []
+
+    async def chat(**kwargs):
+        return stream
+
+    settings = {"ollama_host": "http://ollama.test", "chat_model": "m", "embed_model": "e", "thinking_enabled": False}
+    monkeypatch.setattr(generation_registry, "get_setting", settings.get)
+    monkeypatch.setattr(ollama_status, "_status", OllamaStatus(state="ok", host="http://ollama.test",
+                                                              models=({"name": "m"}, {"name": "e"}),
+                                                              checked_at=ollama_status.time.monotonic()))
+    monkeypatch.setattr(ollama_status, "_ollama_base_url", lambda: "http://ollama.test")
+    monkeypatch.setattr(generation_registry, "Session", lambda engine: contextlib.nullcontext())
+    monkeypatch.setattr(generation_registry.chatRepository, "get_messages", lambda session, chat_id: [])
+    monkeypatch.setattr(generation_registry, "condense_question", lambda history, question: question)
+    monkeypatch.setattr(generation_registry, "retrieve_nodes", lambda query, top_k, modality: [])
+    monkeypatch.setattr(generation_registry.ollama_client, "async_client", lambda host: SimpleNamespace(chat=chat))
+    monkeypatch.setattr(
+        generation_registry.chatService,
+        "append_message",
+        lambda session, chat_id, **kw: saved.append(kw) or {"id": 42},
+    )
+    monkeypatch.setattr(generation_registry, "_jobs", {})
+    monkeypatch.setattr(generation_registry, "_RETENTION_SECONDS", 0)
+    monkeypatch.setattr(ollama_gate, "scheduler", ollama_gate.GenerationScheduler(max_concurrent=1))
+    return stream, saved
+
+
+async def _until_writing(chat_id):
+    job = generation_registry.get(chat_id)
+    while job.status != "writing":
+        await asyncio.sleep(0.001)
+    return job
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_stream_and_frees_the_slot(fake_run):
+    stream, saved = fake_run
+    generation_registry.start(1, "question?")
+    job = await _until_writing(1)
+
+    assert await generation_registry.cancel(1) is job
+
+    assert job.status == "cancelled"
+    assert job.events[-1] == {"type": "cancelled", "message_id": None}
+    assert stream.closed
+    assert saved == []
+    assert ollama_gate.scheduler.snapshot()["running"] == 0
+    assert generation_registry.active() == []
+
+
+@pytest.mark.asyncio
+async def test_cancel_can_keep_the_partial_answer(fake_run):
+    _, saved = fake_run
+    generation_registry.start(1, "question?")
+    await _until_writing(1)
+
+    job = await generation_registry.cancel(1, persist_partial=True)
+
+    assert job.message_id == 42
+    assert saved[0]["text"].startswith("word")
+    assert job.events[-1] == {"type": "cancelled", "message_id": 42}
+
+
+@pytest.mark.asyncio
+async def test_cancel_without_a_generation_is_a_noop(fake_run):
+    assert await generation_registry.cancel(99) is None
+
+
+@pytest.mark.asyncio
+async def test_status_probe_runs_off_the_event_loop(fake_run, monkeypatch):
+    threads = []
+
+    def probe(host):
+        threads.append(threading.current_thread())
+        return OllamaStatus(state="ok", host=host, models=({"name": "e"},), checked_at=ollama_status.time.monotonic())
+
+    # No snapshot yet (startup, or right after an ollama_host change): the job has to probe.
+    monkeypatch.setattr(ollama_status, "_status", None)
+    monkeypatch.setattr(ollama_status, "_probe", probe)
+    generation_registry.start(1, "question?")
+    job = generation_registry.get(1)
+    while job.status != "error":
+        await asyncio.sleep(0.001)
+
+    assert threads and threads[0] is not threading.main_thread()
+    assert "ollama pull m" in job.error_detail
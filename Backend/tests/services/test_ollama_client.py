@@ -0,0 +1,87 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services import ollama_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so the pool can reuse connections
+
+    def do_GET(self):
+        body = json.dumps({"models": [{"name": "m:latest"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def fresh_pool(monkeypatch):
+    monkeypatch.setattr(ollama_client, "_sync_stats", ollama_client._PoolStats())
+    monkeypatch.setattr(ollama_client, "_async_stats", ollama_client._PoolStats())
+    monkeypatch.setattr(ollama_client, "_sync_transport", None)
+    monkeypatch.setattr(ollama_client, "_async_transport", None)
+    for cache in ("_sync_clients", "_async_clients", "_sync_http", "_async_http"):
+        monkeypatch.setattr(ollama_client, cache, {})
+
+
+def test_clients_are_cached_per_host_and_share_a_pool(fresh_pool):
+    a = ollama_client.sync_http("http://a:1")
+    assert ollama_client.sync_http("http://a:1") is a
+    b = ollama_client.sync_http("http://b:1")
+    assert b is not a
+    assert a._transport is b._transport
+    assert ollama_client.async_client("http://a:1") is ollama_client.async_client("http://a:1")
+
+
+def test_keepalive_reuses_one_connection_and_tracks_stats(fresh_pool, server):
+    client = ollama_client.sync_http(server)
+    for _ in range(3):
+        assert client.get("/api/tags").json()["models"][0]["name"] == "m:latest"
+
+    stats = ollama_client.pool_stats()["sync"]
+    assert stats["requests"] == 3
+    assert stats["in_use"] == 0
+    assert stats["connections"] == 1
+    assert stats["idle"] == 1
+    assert stats["wait_ms_max"] >= 0.0
+
+
+def test_streamed_response_counts_as_in_use_until_closed(fresh_pool, server):
+    client = ollama_client.sync_http(server)
+    with client.stream("GET", "/api/tags") as response:
+        assert ollama_client.pool_stats()["sync"]["in_use"] == 1
+        response.read()
+    assert ollama_client.pool_stats()["sync"]["in_use"] == 0
+
+
+@pytest.mark.asyncio
+async def test_client_kwargs_route_library_clients_onto_the_pools(fresh_pool, server):
+    import httpx
+
+    with httpx.Client(base_url=server, **ollama_client.client_kwargs()) as client:
+        client.get("/api/tags")
+    async with httpx.AsyncClient(base_url=server, **ollama_client.client_kwargs()) as client:
+        await client.get("/api/tags")
+
+    stats = ollama_client.pool_stats()
+    assert stats["sync"]["requests"] == 1 and stats["async"]["requests"] == 1
+    # Closing those clients left the shared pool usable.
+    assert ollama_client.sync_http(server).get("/api/tags").status_code == 200
@@ -0,0 +1,153 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services import ollama_gate
+from app.services.ollama_gate import CHAT, INGESTION, REFLECTION, TAGGING, GenerationScheduler
+
+
+async def _hold(scheduler, priority, order, release, on_position=None):
+    async with scheduler.slot(priority, on_position=on_position):
+        order.append(priority)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_chat_jumps_ahead_of_background_work():
+    scheduler = GenerationScheduler(max_concurrent=1)
+    order, release = [], asyncio.Event()
+
+    first = asyncio.create_task(_hold(scheduler, TAGGING, order, release))
+    await asyncio.sleep(0)
+    queued = [
+        asyncio.create_task(_hold(scheduler, p, order, release))
+        for p in (INGESTION, TAGGING, CHAT)
+    ]
+    await asyncio.sleep(0)
+    assert scheduler.snapshot()["queue_depth"] == 3
+
+    release.set()
+    await asyncio.gather(first, *queued)
+    assert order == [TAGGING, CHAT, TAGGING, INGESTION]
+
+
+@pytest.mark.asyncio
+async def test_aging_prevents_starvation():
+    # With instant aging, the long-waiting ingestion job outranks a fresh chat request.
+    scheduler = GenerationScheduler(max_concurrent=1, aging_seconds=1e-9)
+    order, release = [], asyncio.Event()
+
+    first = asyncio.create_task(_hold(scheduler, CHAT, order, release))
+    await asyncio.sleep(0)
+    old = asyncio.create_task(_hold(scheduler, INGESTION, order, release))
+    await asyncio.sleep(0.01)
+    new = asyncio.create_task(_hold(scheduler, CHAT, order, release))
+    await asyncio.sleep(0)
+
+    release.set()
+    await asyncio.gather(first, old, new)
+    assert order == [CHAT, INGESTION, CHAT]
+
+
+@pytest.mark.asyncio
+async def test_class_limit_keeps_background_off_the_last_slot():
+    scheduler = GenerationScheduler(max_concurrent=2, class_limits={TAGGING: 1})
+    order, release = [], asyncio.Event()
+
+    tasks = [asyncio.create_task(_hold(scheduler, TAGGING, order, release)) for _ in range(2)]
+    await asyncio.sleep(0)
+    chat = asyncio.create_task(_hold(scheduler, CHAT, order, release))
+    await asyncio.sleep(0.01)
+
+    assert order == [TAGGING, CHAT]
+    assert scheduler.snapshot()["classes"]["tagging"]["queued"] == 1
+    release.set()
+    await asyncio.gather(chat, *tasks)
+
+
+@pytest.mark.asyncio
+async def test_class_limits_come_from_settings(monkeypatch):
+    settings = {"ollama_class_limits": {"ingestion": 1}}
+    monkeypatch.setattr(ollama_gate, "get_setting", settings.get)
+    monkeypatch.setattr(ollama_gate, "scheduler", GenerationScheduler(max_concurrent=3))
+    ollama_gate.apply_settings()
+    settings["ollama_class_limits"] = {"tagging": 1, "ingestion": 1}
+    ollama_gate._on_settings_change({"ollama_class_limits": settings["ollama_class_limits"]})
+    scheduler = ollama_gate.scheduler
+    order, release = [], asyncio.Event()
+
+    tasks = [asyncio.create_task(_hold(scheduler, p, order, release)) for p in (TAGGING, TAGGING, INGESTION, INGESTION)]
+    await asyncio.sleep(0)
+    chat = asyncio.create_task(_hold(scheduler, CHAT, order, release))
+    await asyncio.sleep(0.01)
+
+    assert sorted(order) == [CHAT, TAGGING, INGESTION]
+    snapshot = scheduler.snapshot()["classes"]
+    assert (snapshot["tagging"]["limit"], snapshot["tagging"]["queued"]) == (1, 1)
+    assert (snapshot["ingestion"]["limit"], snapshot["ingestion"]["queued"]) == (1, 1)
+    release.set()
+    await asyncio.gather(chat, *tasks)
+
+
+@pytest.mark.asyncio
+async def test_queue_position_is_reported():
+    scheduler = GenerationScheduler(max_concurrent=1)
+    order, release = [], asyncio.Event()
+    positions = []
+
+    first = asyncio.create_task(_hold(scheduler, CHAT, order, release))
+    await asyncio.sleep(0)
+    background = asyncio.create_task(_hold(scheduler, TAGGING, order, release))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(_hold(scheduler, REFLECTION, order, release, on_position=positions.append))
+    await asyncio.sleep(0.01)
+
+    assert positions == [1]  # reflection outranks the queued tagging job
+    release.set()
+    await asyncio.gather(first, background, waiter)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    scheduler = GenerationScheduler(max_concurrent=1)
+    order, release = [], asyncio.Event()
+
+    first = asyncio.create_task(_hold(scheduler, CHAT, order, release))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(_hold(scheduler, TAGGING, order, release))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert scheduler.snapshot()["queue_depth"] == 0
+    release.set()
+    await first
+    assert scheduler.snapshot()["running"] == 0
+
+
+def test_sync_slots_share_the_same_queue():
+    scheduler = GenerationScheduler(max_concurrent=1)
+    entered, release = threading.Event(), threading.Event()
+    order = []
+
+    def worker(priority):
+        with scheduler.slot_sync(priority):
+            order.append(priority)
+            entered.set()
+            release.wait()
+
+    holder = threading.Thread(target=worker, args=(INGESTION,))
+    holder.start()
+    entered.wait()
+    waiter = threading.Thread(target=worker, args=(CHAT,))
+    waiter.start()
+    while scheduler.snapshot()["queue_depth"] == 0:
+        pass
+    release.set()
+    holder.join()
+    waiter.join()
+
+    assert order == [INGESTION, CHAT]
+    assert scheduler.snapshot()["classes"]["chat"]["granted"] == 1
@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+from app.services import ollama_status
+from app.services.ollama_status import OllamaStatus
+
+HOST = "http://ollama.test"
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    """Count probes and serve a scripted status instead of hitting Ollama."""
+    calls = []
+    script = {"state": "ok", "models": ({"name": "gemma4:e4b", "size": 1}, {"name": "nomic-embed-text:latest", "size": 2})}
+
+    def fake_probe(host):
+        calls.append(host)
+        return OllamaStatus(
+            state=script["state"],
+            host=host,
+            models=script["models"] if script["state"] == "ok" else (),
+            checked_at=ollama_status.time.monotonic(),
+        )
+
+    monkeypatch.setattr(ollama_status, "_probe", fake_probe)
+    monkeypatch.setattr(ollama_status, "_ollama_base_url", lambda: HOST)
+    monkeypatch.setattr(ollama_status, "_status", None)
+    monkeypatch.setattr(ollama_status, "_refresher", None)
+    return calls, script
+
+
+def test_repeated_checks_share_one_probe(probes):
+    calls, _ = probes
+    for _ in range(5):
+        assert ollama_status.state() == "ok"
+        assert ollama_status.model_installed("gemma4:e4b")
+    assert calls == [HOST]
+
+
+def test_model_matching_accepts_implicit_tag(probes):
+    assert ollama_status.model_installed("nomic-embed-text")
+    assert ollama_status.missing_models("nomic-embed-text", "llama3") == ["llama3"]
+
+
+def test_stale_snapshot_reprobes(probes, monkeypatch):
+    calls, _ = probes
+    ollama_status.state()
+    monkeypatch.setattr(ollama_status, "_TTL_SECONDS", 0.0)
+    ollama_status.state()
+    assert len(calls) == 2
+
+
+def test_connection_error_marks_down_without_probing(probes):
+    calls, _ = probes
+    ollama_status.state()
+
+    kind = ollama_status.note_error(Exception("All connection attempts failed"))
+
+    assert kind == "not_running"
+    assert ollama_status.state() in ("not_running", "not_installed")
+    assert calls == [HOST]
+
+
+def test_model_missing_error_forces_reprobe(probes):
+    calls, _ = probes
+    ollama_status.state()
+
+    assert ollama_status.note_error(Exception("model 'x' not found, try pulling it first")) == "model_missing"
+    ollama_status.state()
+
+    assert len(calls) == 2
+
+
+def test_unknown_model_state_when_down(probes):
+    _, script = probes
+    script["state"] = "not_running"
+    # Mirrors the old probe: when Ollama can't be asked, don't claim the model is missing.
+    assert ollama_status.model_installed("anything")
+
+
+@pytest.mark.asyncio
+async def test_async_status_probes_off_the_event_loop(probes, monkeypatch):
+    calls, _ = probes
+    threads = []
+    probe = ollama_status._probe
+    monkeypatch.setattr(ollama_status, "_probe", lambda host: threads.append(threading.current_thread()) or probe(host))
+
+    assert (await ollama_status.astatus()).state == "ok"
+    assert (await ollama_status.astatus()).state == "ok"  # fresh snapshot: served from memory
+
+    assert len(calls) == 1
+    assert threads[0] is not threading.main_thread()
@@ -1,8 +1,10 @@
+from datetime import datetime
 from types import SimpleNamespace
 
 import pytest
 
 from app.services import retrieval, generation
+from llama_index.core import MockEmbedding
 from llama_index.core.vector_stores import FilterOperator, MetadataFilters
 
 
@@ -28,10 +30,13 @@ class FakeRetriever:
 class FakeIndex:
     def __init__(self, nodes):
         self._nodes = nodes
+        self.filtered_nodes = None  # what a filtered query returns, when set
         self.calls = []  # list of (similarity_top_k, filters)
 
     def as_retriever(self, similarity_top_k, filters=None):
         self.calls.append((similarity_top_k, filters))
+        if filters is not None and self.filtered_nodes is not None:
+            return FakeRetriever(self.filtered_nodes)
         return FakeRetriever(self._nodes)
 
 
@@ -49,48 +54,59 @@ def patched(monkeypatch):
     nodes = [make_node(i, 1.0 - i * 0.1, f"n{i}") for i in range(6)]
     index = FakeIndex(nodes)
     monkeypatch.setattr(retrieval, "_get_index", lambda: index)
+    monkeypatch.setattr(retrieval, "_embed_query", lambda question: ([0.0], False))
+    monkeypatch.setattr(retrieval, "search_chunks_fts", lambda *a, **k: [])
+    monkeypatch.setattr(retrieval, "_result_cache", retrieval.OrderedDict())
+    monkeypatch.setattr(retrieval, "_result_cache_stats", {"hits": 0, "misses": 0, "invalidations": 0})
     return SimpleNamespace(monkeypatch=monkeypatch, index=index, nodes=nodes)
 
 
-def test_temporal_query_builds_in_filter(patched):
-    patched.monkeypatch.setattr(retrieval, "get_source_ids_in_range", lambda *a, **k: [1, 2, 3])
+def test_temporal_query_builds_timestamp_range_filter(patched):
+    from app.services.chroma import to_created_at_ts
+    from app.services.temporal import parse_temporal_range
 
-    retrieval.ranked_retrieve("what did I do last week", top_k=5, session=object())
+    lexical_ranges = []
+    retrieval.ranked_retrieve(
+        "what did I do in 2025", top_k=5, session=object(),
+        lexical_fn=lambda s, q, limit, date_range, modality: lexical_ranges.append(date_range) or [],
+    )
 
     top_k_arg, filters = patched.index.calls[0]
     assert top_k_arg == 20  # max(5*OVERSAMPLE, MIN_POOL)
     assert isinstance(filters, MetadataFilters)
-    f = filters.filters[0]
-    assert f.key == "source_id"
-    assert f.operator == FilterOperator.IN
-    assert f.value == ["1", "2", "3"]  # ints converted to strings for Chroma
+    expected = parse_temporal_range("what did I do in 2025", datetime.utcnow())
+    assert [(f.key, f.operator, f.value) for f in filters.filters] == [
+        ("created_at_ts", FilterOperator.GTE, to_created_at_ts(expected.start)),
+        ("created_at_ts", FilterOperator.LT, to_created_at_ts(expected.end)),
+    ]
+    assert lexical_ranges == [expected]  # BM25 gets the same window
 
 
-def test_empty_range_falls_back_to_no_filter(patched):
-    patched.monkeypatch.setattr(retrieval, "get_source_ids_in_range", lambda *a, **k: [])
+def test_empty_range_backfills_unfiltered(patched):
+    patched.index.filtered_nodes = []
 
-    retrieval.ranked_retrieve("what did I do last week", top_k=5, session=object())
+    result = retrieval.ranked_retrieve("what did I do last week", top_k=5, session=object())
 
-    _, filters = patched.index.calls[0]
-    assert filters is None  # lenient fallback: no hard filter
+    assert [filters is None for _, filters in patched.index.calls] == [False, True]
+    assert len(result) == 5  # lenient fallback: global search
 
 
-def test_non_temporal_query_skips_sql(patched):
-    called = []
-    patched.monkeypatch.setattr(
-        retrieval, "get_source_ids_in_range", lambda *a, **k: called.append(1) or []
-    )
+def test_empty_range_in_strict_mode_returns_nothing(patched):
+    patched.monkeypatch.setattr(retrieval, "HARD_FILTER_STRICT", True)
+    patched.index.filtered_nodes = []
+
+    assert retrieval.ranked_retrieve("what did I do last week", top_k=5, session=object()) == []
+    assert len(patched.index.calls) == 1
 
+
+def test_non_temporal_query_is_unfiltered(patched):
     retrieval.ranked_retrieve("what makes me happy", top_k=5, session=object())
 
-    assert called == []
     _, filters = patched.index.calls[0]
     assert filters is None
 
 
 def test_result_sliced_to_top_k(patched):
-    patched.monkeypatch.setattr(retrieval, "get_source_ids_in_range", lambda *a, **k: [1])
-
     result = retrieval.ranked_retrieve("recent stuff", top_k=3, session=object())
 
     assert len(result) == 3
@@ -99,7 +115,6 @@ def test_result_sliced_to_top_k(patched):
 def test_injected_identity_reranker_disables_rerank(patched):
     """The reranker_fn seam replaces the model without monkeypatching."""
     called = []
-    patched.monkeypatch.setattr(retrieval, "get_source_ids_in_range", lambda *a, **k: [])
     patched.monkeypatch.setattr(
         retrieval.reranker, "rerank",
         lambda q, ns: called.append("model") or [(n, n.score) for n in ns],
@@ -136,3 +151,282 @@ def test_query_sources_uses_injected_retriever_and_llm(monkeypatch):
     assert calls == [("my question", 4)]
     assert result["answer"] == "the answer"
     assert result["sources"] == []
+    assert result["prompt_tokens"] > 0
+
+
+@pytest.fixture
+def index_cache(monkeypatch):
+    """Fresh index cache over a fake collection; counts real builds."""
+    builds = []
+    collection = object()
+    monkeypatch.setattr(retrieval, "_index", None)
+    monkeypatch.setattr(retrieval, "_index_signature", None)
+    monkeypatch.setattr(retrieval, "_index_stats", {"builds": 0, "hits": 0, "build_ms_total": 0.0})
+    monkeypatch.setattr(retrieval, "get_chroma_collection", lambda: collection)
+    monkeypatch.setattr(retrieval, "_build_index", lambda c: builds.append(c) or object())
+    monkeypatch.setattr(retrieval.Settings, "_embed_model", MockEmbedding(embed_dim=2))
+    return builds
+
+
+def test_index_is_built_once_and_reused(index_cache):
+    first = retrieval._get_index()
+    assert retrieval._get_index() is first
+    assert len(index_cache) == 1
+    assert retrieval.index_stats()["hits"] == 1
+
+
+def test_index_rebuilds_when_embed_model_changes(index_cache, monkeypatch):
+    first = retrieval._get_index()
+    monkeypatch.setattr(retrieval.Settings, "_embed_model", MockEmbedding(embed_dim=2))
+    assert retrieval._get_index() is not first
+    assert len(index_cache) == 2
+
+
+_real_embed_query = retrieval._embed_query
+
+
+class CountingEmbedding(MockEmbedding):
+    calls: int = 0
+
+    def _get_query_embedding(self, query):
+        self.calls += 1
+        return super()._get_query_embedding(query)
+
+
+@pytest.fixture
+def query_cache(monkeypatch):
+    embed = CountingEmbedding(embed_dim=2, model_name="m")
+    monkeypatch.setattr(retrieval.Settings, "_embed_model", embed)
+    monkeypatch.setattr(retrieval, "_query_cache", retrieval.OrderedDict())
+    monkeypatch.setattr(retrieval, "_query_cache_stats", {"hits": 0, "misses": 0})
+    monkeypatch.setattr(retrieval, "QUERY_CACHE_SIZE", 2)
+    return embed
+
+
+def test_query_embedding_is_cached_per_question(query_cache):
+    assert retrieval._embed_query("q1")[1] is False
+    assert retrieval._embed_query("q1")[1] is True
+    assert query_cache.calls == 1
+    assert retrieval.query_cache_stats()["hits"] == 1
+
+
+def test_query_embedding_cache_evicts_least_recent(query_cache):
+    for q in ("a", "b", "a", "c"):
+        retrieval._embed_query(q)
+    assert retrieval._embed_query("a")[1] is True
+    assert retrieval._embed_query("b")[1] is False  # evicted when "c" came in
+
+
+def test_backfill_reuses_the_query_embedding(patched, query_cache, monkeypatch):
+    monkeypatch.setattr(retrieval, "_embed_query", _real_embed_query)  # undo the fixture stub
+    patched.index._nodes = patched.nodes[:2]  # sparse filtered pool -> backfill runs
+
+    retrieval.ranked_retrieve("what did I do last week", top_k=5, session=object())
+
+    assert len(patched.index.calls) == 2
+    assert query_cache.calls == 1
+
+
+class RecordingEmbedding(MockEmbedding):
+    batches: list = []
+
+    def _get_text_embeddings(self, texts):
+        self.batches.append(len(texts))
+        return super()._get_text_embeddings(texts)
+
+
+class RecordingIndex:
+    def __init__(self):
+        self.inserted = []
+
+    def insert_nodes(self, nodes):
+        assert all(n.embedding is not None for n in nodes)  # embedded before the upsert
+        self.inserted.append([n.node_id for n in nodes])
+
+
+def test_index_chunks_embeds_in_batches_and_upserts_in_order(monkeypatch):
+    embed = RecordingEmbedding(embed_dim=2, batches=[])
+    index = RecordingIndex()
+    monkeypatch.setattr(retrieval, "configure_llamaindex", lambda: None)
+    monkeypatch.setattr(retrieval.Settings, "_embed_model", embed)
+    monkeypatch.setattr(retrieval, "_get_index", lambda: index)
+    chunks = [{"id": i, "text": f"chunk {i}", "source_id": 1} for i in range(7)]
+
+    retrieval.index_chunks(chunks, batch_size=3, concurrency=2)
+
+    assert embed.batches == [3, 3, 1]
+    assert index.inserted == [["0", "1", "2"], ["3", "4", "5"], ["6"]]
+
+
+def test_index_chunks_stops_submitting_after_a_failed_batch(monkeypatch):
+    calls = []
+
+    def failing_batch(embed_model, nodes):
+        calls.append(len(nodes))
+        raise ConnectionError("ollama is down")
+
+    monkeypatch.setattr(retrieval, "configure_llamaindex", lambda: None)
+    monkeypatch.setattr(retrieval, "_embed_batch", failing_batch)
+    monkeypatch.setattr(retrieval, "_get_index", lambda: RecordingIndex())
+    chunks = [{"id": i, "text": f"chunk {i}", "source_id": 1} for i in range(20)]
+
+    with pytest.raises(ConnectionError):
+        retrieval.index_chunks(chunks, batch_size=1, concurrency=2)
+
+    assert len(calls) <= 2  # only what was in flight, not all 20 batches
+
+
+def test_repeated_question_reuses_the_reranked_pool(patched):
+    from app.services.ranking import SourceMeta
+
+    rerank_calls, meta_calls = [], []
+    patched.monkeypatch.setattr(
+        retrieval.reranker, "rerank", lambda q, ns: rerank_calls.append(q) or [(n, n.score) for n in ns]
+    )
+    old = datetime(2000, 1, 1)
+    patched.monkeypatch.setattr(
+        retrieval, "get_sources_meta",
+        lambda session, ids: meta_calls.append(ids) or {sid: SourceMeta(created_at=old) for sid in ids},
+    )
+
+    first = retrieval.ranked_retrieve("What makes me happy?", top_k=3, session=object())
+    second = retrieval.ranked_retrieve("  what makes me   HAPPY? ", top_k=3, session=object())
+
+    assert len(rerank_calls) == 1
+    assert len(patched.index.calls) == 1
+    assert len(meta_calls) == 2  # recency is re-scored on every hit
+    assert [n.node.node_id for n in first] == [n.node.node_id for n in second]
+    assert all(a is not b for a, b in zip(first, second))  # callers never share node wrappers
+    assert retrieval.result_cache_stats()["hits"] == 1
+
+
+def test_index_mutation_invalidates_cached_results(patched):
+    rerank_calls = []
+    patched.monkeypatch.setattr(
+        retrieval.reranker, "rerank", lambda q, ns: rerank_calls.append(q) or [(n, n.score) for n in ns]
+    )
+
+    retrieval.ranked_retrieve("q", top_k=3, session=object())
+    retrieval.bump_index_version("test")
+    retrieval.ranked_retrieve("q", top_k=3, session=object())
+    retrieval.ranked_retrieve("q", top_k=4, session=object())  # different key
+
+    assert len(rerank_calls) == 3
+    assert retrieval.result_cache_stats()["entries"] == 2
+
+
+def test_index_chunks_and_embed_model_setting_bump_the_version(monkeypatch):
+    monkeypatch.setattr(retrieval, "configure_llamaindex", lambda: None)
+    monkeypatch.setattr(retrieval.Settings, "_embed_model", MockEmbedding(embed_dim=2))
+    monkeypatch.setattr(retrieval, "_get_index", lambda: RecordingIndex())
+    start = retrieval.result_cache_stats()["index_version"]
+
+    retrieval.index_chunks([{"id": 1, "text": "chunk", "source_id": 1}], batch_size=1, concurrency=1)
+    retrieval._on_settings_change({"theme": "dark"})
+    retrieval._on_settings_change({"embed_model": "other"})
+
+    assert retrieval.result_cache_stats()["index_version"] == start + 2
+
+
+def test_hybrid_fusion_pulls_in_lexical_only_hits(patched):
+    from llama_index.core.schema import TextNode
+
+    patched.index.vector_store = SimpleNamespace(
+        get_nodes=lambda node_ids: [TextNode(id_=i, text="Amsterdam", metadata={"source_id": "9"}) for i in node_ids]
+    )
+    lexical_calls = []
+
+    def lexical_fn(session, question, limit, date_range, modality):
+        lexical_calls.append(limit)
+        return ["n5", "lex-only"]
+
+    result = retrieval.ranked_retrieve(
+        "when was I in Amsterdam", top_k=2, session=object(), lexical_fn=lexical_fn,
+        reranker_fn=lambda q, ns: [(n, 1.0 if n.node.node_id in ("n5", "lex-only") else 0.0) for n in ns],
+    )
+
+    assert lexical_calls == [20]
+    assert {n.node.node_id for n in result} == {"n5", "lex-only"}
+
+
+def test_zero_lexical_weight_is_dense_only(patched):
+    from app.services.ranking import FusionWeights
+
+    seen = []
+    retrieval.ranked_retrieve(
+        "q", top_k=5, session=object(),
+        lexical_fn=lambda *a: pytest.fail("lexical search should be skipped"),
+        reranker_fn=lambda q, ns: seen.extend(ns) or [(n, n.score) for n in ns],
+        fusion=FusionWeights(lexical=0.0),
+    )
+    assert len(seen) == 6  # full dense pool, untouched
+
+
+@pytest.fixture
+def adaptive(patched):
+    patched.monkeypatch.setattr(retrieval, "_rerank_cost", {})
+    patched.monkeypatch.setattr(retrieval, "_chunk_count", lambda: 100)
+    return patched
+
+
+def staged_reranker(calls, promote=()):
+    """Dense score as relevance, except `promote`d node ids jump to the top."""
+    def rerank(question, nodes):
+        calls.append([n.node.node_id for n in nodes])
+        return [(n, 2.0 if n.node.node_id in promote else n.score) for n in nodes]
+    return rerank
+
+
+def test_adaptive_pool_stops_when_reranker_agrees_with_dense_order(adaptive):
+    from app.services.ranking import AdaptivePool
+
+    calls = []
+    retrieval.ranked_retrieve(
+        "q", top_k=2, session=object(), reranker_fn=staged_reranker(calls),
+        pool=AdaptivePool(budget_ms=1000, ms_per_pair=1, dense_margin=1.0),
+    )
+
+    assert calls == [["n0", "n1", "n2", "n3"]]  # first stage only: top_k * 2
+
+
+def test_adaptive_pool_expands_when_reranker_promotes_from_the_back(adaptive):
+    from app.services.ranking import AdaptivePool
+
+    calls = []
+    result = retrieval.ranked_retrieve(
+        "q", top_k=2, session=object(), reranker_fn=staged_reranker(calls, promote={"n3"}),
+        pool=AdaptivePool(budget_ms=1000, ms_per_pair=1, dense_margin=1.0),
+    )
+
+    assert calls == [["n0", "n1", "n2", "n3"], ["n4", "n5"]]  # only the new slice is scored
+    assert result[0].node.node_id == "n3"
+
+
+def test_adaptive_pool_respects_budget_and_dense_cut(adaptive):
+    from app.services.ranking import AdaptivePool
+
+    calls = []
+    retrieval.ranked_retrieve(
+        "q", top_k=2, session=object(), reranker_fn=staged_reranker(calls, promote={"n2"}),
+        pool=AdaptivePool(budget_ms=30, ms_per_pair=10, dense_margin=1.0),
+    )
+    assert calls == [["n0", "n1", "n2"]]  # 30 ms / 10 ms per pair
+
+    calls.clear()
+    retrieval.ranked_retrieve(
+        "other", top_k=2, session=object(), reranker_fn=staged_reranker(calls, promote={"n2"}),
+        pool=AdaptivePool(budget_ms=1000, ms_per_pair=1, dense_margin=0.25),
+    )
+    assert calls == [["n0", "n1", "n2"]]  # n3+ score > 0.25 below n0
+
+
+def test_tiny_collection_skips_the_reranker(adaptive):
+    from app.services.ranking import AdaptivePool
+
+    adaptive.monkeypatch.setattr(retrieval, "_chunk_count", lambda: 4)
+    result = retrieval.ranked_retrieve(
+        "q", top_k=5, session=object(),
+        reranker_fn=lambda q, ns: pytest.fail("cross-encoder should be skipped"),
+        pool=AdaptivePool(budget_ms=1000),
+    )
+    assert len(result) == 5
@@ -5,10 +5,14 @@ import pytest
 
 from app.services.ranking import (
     HALF_LIFE_DAYS,
+    RankWeights,
     SourceMeta,
     combined_score,
+    reciprocal_rank_fusion,
     recency_decay,
+    score_batch,
     score_candidates,
+    to_seconds,
 )
 
 NOW = datetime(2026, 6, 3, 12, 0, 0)
@@ -79,3 +83,45 @@ def test_handles_unknown_source():
 
 def test_empty():
     assert score_candidates([], {}, NOW) == []
+
+
+def test_candidates_carry_breakdown_and_blended_score():
+    created = NOW - timedelta(days=HALF_LIFE_DAYS)
+    node = make_node(1)
+    [scored] = score_candidates([(node, 0.8)], {1: SourceMeta(created_at=created)}, NOW)
+    assert scored.breakdown.relevance == pytest.approx(0.8)
+    assert scored.breakdown.temporal == pytest.approx(0.5)
+    assert node.score == pytest.approx(scored.breakdown.total) == pytest.approx(0.95)
+
+
+# --- score_batch ----------------------------------------------------------
+
+def test_score_batch_matches_scalar_scoring():
+    ages = [None, NOW + timedelta(days=3), NOW, NOW - timedelta(days=7), NOW - timedelta(days=900)]
+    relevance = [0.2, 0.9, 0.4, 0.4, 0.7]
+    weights = RankWeights(relevance=0.8, temporal=0.5)
+
+    scores = score_batch(relevance, [to_seconds(a) for a in ages], to_seconds(NOW), weights)
+
+    for i, (created_at, rel) in enumerate(zip(ages, relevance)):
+        temporal = recency_decay(created_at, NOW)
+        assert scores.temporal[i] == pytest.approx(temporal)
+        assert scores.total[i] == pytest.approx(combined_score(rel, temporal, weights))
+    assert scores.order.tolist() == sorted(range(5), key=lambda i: -scores.total[i])
+
+
+def test_score_batch_ties_keep_input_order():
+    scores = score_batch([0.5, 0.5, 0.5], [to_seconds(NOW)] * 3, to_seconds(NOW))
+    assert scores.order.tolist() == [0, 1, 2]
+
+
+# --- reciprocal_rank_fusion -----------------------------------------------
+
+def test_rrf_rewards_agreement_between_lists():
+    fused = reciprocal_rank_fusion([(["a", "b", "c"], 1.0), (["c", "d"], 1.0)], k=60)
+    assert [item for item, _ in fused] == ["c", "a", "b", "d"]
+
+
+def test_rrf_zero_weight_list_is_ignored():
+    fused = reciprocal_rank_fusion([(["a", "b"], 1.0), (["z"], 0.0)], k=60)
+    assert [item for item, _ in fused] == ["a", "b"]
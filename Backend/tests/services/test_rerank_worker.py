@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from app.services.rerank_worker import RerankWorker
+
+
+class GatedScorer:
+    """Scores each pair by passage length; the first call blocks until released."""
+
+    def __init__(self):
+        self.calls = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, pairs):
+        self.calls.append([text for _, text in pairs])
+        self.entered.set()
+        self.release.wait(5)
+        return [float(len(text)) for _, text in pairs]
+
+
+@pytest.fixture
+def worker():
+    scorer = GatedScorer()
+    w = RerankWorker(scorer)
+    w.scorer = scorer
+    yield w
+    scorer.release.set()
+    w.stop()
+
+
+def test_queued_requests_share_one_forward_pass(worker):
+    first = worker.submit([("q1", "a")])
+    assert worker.scorer.entered.wait(5)
+    # Both arrive while the first batch is on the model, so they go out together.
+    second = worker.submit([("q2", "bb"), ("q2", "ccc")])
+    third = worker.submit([("q3", "dddd")])
+    assert worker.stats()["queue_depth"] == 2
+    worker.scorer.release.set()
+
+    assert first.result(5) == [1.0]
+    assert second.result(5) == [2.0, 3.0]
+    assert third.result(5) == [4.0]
+    assert worker.scorer.calls == [["a"], ["bb", "ccc", "dddd"]]
+    stats = worker.stats()
+    assert (stats["requests"], stats["batches"], stats["pairs"]) == (3, 2, 4)
+    assert (stats["max_batch_requests"], stats["max_batch_pairs"], stats["queue_depth"]) == (2, 3, 0)
+
+
+def test_batches_stop_at_max_pairs(worker):
+    worker.max_pairs = 2
+    worker.submit([("q", "a")])
+    assert worker.scorer.entered.wait(5)
+    futures = [worker.submit([("q", text)]) for text in ("b", "c", "d")]
+    worker.scorer.release.set()
+
+    assert [f.result(5) for f in futures] == [[1.0], [1.0], [1.0]]
+    assert worker.scorer.calls == [["a"], ["b", "c"], ["d"]]
+
+
+def test_failed_batch_fails_every_request_and_worker_survives():
+    calls = []
+
+    def flaky(pairs):
+        calls.append(len(pairs))
+        if len(calls) == 1:
+            raise RuntimeError("model exploded")
+        return [0.5] * len(pairs)
+
+    worker = RerankWorker(flaky)
+    try:
+        with pytest.raises(RuntimeError, match="exploded"):
+            worker.score([("q", "a")])
+        assert worker.score([("q", "b")]) == [0.5]
+        assert worker.stats()["errors"] == 1
+    finally:
+        worker.stop()
+
+
+def test_empty_request_skips_the_worker():
+    worker = RerankWorker(lambda pairs: pytest.fail("scored an empty request"))
+    assert worker.score([]) == []
+    assert worker.stats()["running"] is False
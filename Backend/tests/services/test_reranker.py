@@ -1,10 +1,20 @@
+import sys
 from types import SimpleNamespace
 
+import numpy as np
+import pytest
+
 from app.services import reranker
 
 
-def make_node(text):
-    return SimpleNamespace(node=SimpleNamespace(get_content=lambda: text))
+def make_node(text, node_id=None):
+    return SimpleNamespace(node=SimpleNamespace(get_content=lambda: text, node_id=node_id or text))
+
+
+@pytest.fixture(autouse=True)
+def empty_score_cache(monkeypatch):
+    monkeypatch.setattr(reranker, "_score_cache", reranker.OrderedDict())
+    monkeypatch.setattr(reranker, "_score_cache_stats", {"hits": 0, "misses": 0, "invalidations": 0})
 
 
 def test_rerank_empty():
@@ -13,9 +23,151 @@ def test_rerank_empty():
 
 def test_rerank_passes_through_scores(monkeypatch):
     # Stub the cross-encoder so no weights are downloaded. predict already returns [0,1].
-    monkeypatch.setattr(reranker, "_model", lambda: SimpleNamespace(predict=lambda pairs: [0.9, 0.05]))
+    monkeypatch.setattr(reranker, "_model", lambda: SimpleNamespace(predict=lambda pairs, batch_size: [0.9, 0.05]))
     nodes = [make_node("relevant"), make_node("irrelevant")]
     out = reranker.rerank("q", nodes)
 
     assert [n for n, _ in out] == nodes  # input order preserved
     assert out[0][1] == 0.9 and out[1][1] == 0.05  # scores used as-is
+
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size):
+        self.calls.append([text for _, text in pairs])
+        return [len(text) / 100 for _, text in pairs]
+
+
+def test_cached_pairs_skip_the_model(monkeypatch):
+    model = CountingModel()
+    monkeypatch.setattr(reranker, "_model", lambda: model)
+    first = [make_node("alpha"), make_node("beta")]
+
+    reranker.rerank("Where do I work?", first)
+    out = reranker.rerank("where do  I work?", [make_node("gamma"), *first])  # normalized re-ask
+
+    assert model.calls == [["alpha", "beta"], ["gamma"]]  # only the miss, in one batch
+    assert [score for _, score in out] == [0.05, 0.05, 0.04]
+    stats = reranker.score_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 3, 3)
+
+
+def test_changed_content_or_invalidation_rescores(monkeypatch):
+    model = CountingModel()
+    monkeypatch.setattr(reranker, "_model", lambda: model)
+
+    reranker.rerank("q", [make_node("old text", node_id="7")])
+    reranker.rerank("q", [make_node("new text", node_id="7")])  # same chunk, edited
+    reranker.invalidate_score_cache()
+    reranker.rerank("q", [make_node("new text", node_id="7")])
+
+    assert len(model.calls) == 3
+
+
+def test_cache_keys_follow_the_loaded_model(monkeypatch):
+    # The configured backend stays "onnx-int8" while torch stands in until the export exists.
+    class CrossEncoder(CountingModel):
+        pass
+
+    class OnnxCrossEncoder(CountingModel):
+        pass
+
+    loaded = CrossEncoder()
+    monkeypatch.setattr(reranker, "_model", lambda: loaded)
+    reranker.rerank("q", [make_node("text", node_id="7")])
+    loaded = OnnxCrossEncoder()
+    reranker.rerank("q", [make_node("text", node_id="7")])
+
+    assert loaded.calls == [["text"]]
+
+
+class FakeSession:
+    """Stands in for an ORT session: the logit is the (unpadded) token count of each pair."""
+
+    def __init__(self):
+        self.batches = []
+
+    def run(self, outputs, feed):
+        self.batches.append(feed["input_ids"].shape)
+        return [feed["attention_mask"].sum(axis=1, keepdims=True).astype(np.float32) - 4.0]
+
+
+def fake_tokenizer(questions, passages, **kwargs):
+    lengths = [len(q.split()) + len(p.split()) for q, p in zip(questions, passages)]
+    width = min(max(lengths), kwargs["max_length"])
+    mask = np.array([[1] * min(n, width) + [0] * (width - min(n, width)) for n in lengths])
+    return {"input_ids": mask.copy(), "attention_mask": mask, "token_type_ids": mask}
+
+
+def test_onnx_backend_scores_in_input_order_as_probabilities():
+    encoder = object.__new__(reranker.OnnxCrossEncoder)
+    encoder.session = FakeSession()
+    encoder.tokenizer = fake_tokenizer
+    encoder.max_length = 6
+    encoder._input_names = {"input_ids", "attention_mask"}
+
+    pairs = [("q", "a b c d e f g h"), ("q", "a"), ("q", "a b c")]
+    scores = encoder.predict(pairs, batch_size=2)
+
+    expected = 1 / (1 + np.exp(-(np.array([6, 2, 4]) - 4.0)))  # 6 = truncated to max_length
+    assert np.allclose(scores, expected)
+    assert encoder.session.batches == [(2, 4), (1, 6)]  # short pairs batched together first
+
+
+def test_onnx_backend_falls_back_to_torch_when_it_cannot_load(monkeypatch):
+    def missing_export(**kwargs):
+        raise FileNotFoundError("no export")
+
+    monkeypatch.setattr(reranker, "OnnxCrossEncoder", missing_export)
+    fake = SimpleNamespace(CrossEncoder=lambda name, max_length: ("torch", name, max_length))
+    monkeypatch.setitem(sys.modules, "sentence_transformers", fake)
+    reranker._load.cache_clear()
+    try:
+        assert reranker._load("onnx-int8", 256) == ("torch", reranker.MODEL_NAME, 256)
+    finally:
+        reranker._load.cache_clear()
+
+
+def test_onnx_export_runs_from_warmup_only_when_selected_and_missing(monkeypatch, tmp_path):
+    exports = []
+    settings = {"reranker_backend": "torch"}
+    monkeypatch.setattr(reranker, "get_setting", settings.get)
+    monkeypatch.setattr(reranker, "ONNX_DIR", tmp_path)
+    monkeypatch.setattr(reranker, "export_onnx", lambda: exports.append(1))
+
+    reranker.ensure_onnx_export()
+    settings["reranker_backend"] = "onnx-int8"
+    reranker.ensure_onnx_export()
+    (tmp_path / reranker.ONNX_FILE).write_bytes(b"")
+    reranker.ensure_onnx_export()
+
+    assert exports == [1]
+
+
+def test_index_changes_keep_cached_scores(monkeypatch):
+    from app.services import retrieval
+
+    model = CountingModel()
+    monkeypatch.setattr(reranker, "_model", lambda: model)
+
+    reranker.rerank("q", [make_node("text", node_id="7")])
+    retrieval.bump_index_version("test")
+    reranker.rerank("q", [make_node("text", node_id="7")])
+
+    assert len(model.calls) == 1
+
+
+def test_evicting_nodes_drops_only_their_scores(monkeypatch):
+    model = CountingModel()
+    monkeypatch.setattr(reranker, "_model", lambda: model)
+    nodes = [make_node("kept", node_id="1"), make_node("deleted", node_id="2")]
+    reranker.rerank("q", nodes)
+    reranker.rerank("other q", nodes[1:])
+
+    assert reranker.evict_nodes([2]) == 2
+    reranker.rerank("q", nodes)
+
+    assert model.calls == [["kept", "deleted"], ["deleted"], ["deleted"]]
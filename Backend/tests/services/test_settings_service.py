@@ -0,0 +1,84 @@
+import json
+import os
+
+import pytest
+
+from app.services import settings_service
+
+
+@pytest.fixture
+def settings_file(tmp_path, monkeypatch):
+    """Point settings_service at a temp file with a fresh, unloaded snapshot."""
+    path = tmp_path / "settings.json"
+    monkeypatch.setattr(settings_service, "_SETTINGS_PATH", path)
+    monkeypatch.setattr(settings_service, "_snapshot", dict(settings_service.DEFAULTS))
+    monkeypatch.setattr(settings_service, "_snapshot_stamp", None)
+    monkeypatch.setattr(settings_service, "_loaded", False)
+    monkeypatch.setattr(settings_service, "_next_poll", 0.0)
+    monkeypatch.setattr(settings_service, "_observer", None)
+    monkeypatch.setattr(settings_service, "_listeners", [])
+    return path
+
+
+def _write(path, data, mtime_ns):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_defaults_when_file_missing(settings_file):
+    assert settings_service.get_setting("chat_model") == settings_service.DEFAULTS["chat_model"]
+
+
+def test_lookups_do_not_reread_the_file(settings_file, monkeypatch):
+    _write(settings_file, {"chat_model": "a"}, 1_000_000_000)
+    assert settings_service.get_setting("chat_model") == "a"
+
+    reads = []
+    real_read = settings_service._read_file
+    monkeypatch.setattr(settings_service, "_read_file", lambda: reads.append(1) or real_read())
+    for _ in range(50):
+        settings_service.get_setting("chat_model")
+    assert reads == []
+
+
+def test_update_settings_invalidates_and_bumps_version(settings_file):
+    settings_service.get_setting("chat_model")
+    before = settings_service.version()
+    seen = []
+    settings_service.on_change(seen.append)
+
+    settings_service.update_settings({"chat_model": "b"})
+
+    assert settings_service.get_setting("chat_model") == "b"
+    assert settings_service.version() > before
+    assert seen == [{"chat_model": "b"}]
+
+
+def test_external_edit_is_picked_up_on_reload(settings_file):
+    _write(settings_file, {"embed_model": "x"}, 1_000_000_000)
+    assert settings_service.get_setting("embed_model") == "x"
+    before = settings_service.version()
+    seen = []
+    settings_service.on_change(seen.append)
+
+    _write(settings_file, {"embed_model": "y"}, 2_000_000_000)
+    assert settings_service.reload() is True
+
+    assert settings_service.get_setting("embed_model") == "y"
+    assert settings_service.version() == before + 1
+    assert seen == [{"embed_model": "y"}]
+
+
+def test_reload_is_noop_when_file_unchanged(settings_file):
+    _write(settings_file, {"embed_model": "x"}, 1_000_000_000)
+    settings_service.get_setting("embed_model")
+    before = settings_service.version()
+
+    assert settings_service.reload() is False
+    assert settings_service.version() == before
+
+
+def test_get_settings_returns_a_copy(settings_file):
+    snapshot = settings_service.get_settings()
+    snapshot["chat_model"] = "mutated"
+    assert settings_service.get_setting("chat_model") != "mutated"
@@ -0,0 +1,74 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.repositories import sourceRepository
+from app.services import source_meta
+from app.services.ranking import SourceMeta
+from app.services.source_meta import SourceMetaTable
+
+MAY = datetime(2026, 5, 1)
+
+
+def test_table_lookup_and_slot_reuse():
+    table = SourceMetaTable()
+    table.load([(1, MAY, "processed", "text"), (2, None, "queued", "audio")])
+
+    assert table.meta([1, 2, 99]) == {1: SourceMeta(MAY), 2: SourceMeta(None)}
+
+    table.remove(1)
+    table.upsert(3, MAY, "processed", "markdown")
+    assert len(table) == 2
+    assert table._slot[3] == 0  # the freed slot is reused
+    assert table.row(3) == {"created_at": MAY, "status": "processed", "file_type": "markdown"}
+    assert table.meta([1]) == {}
+
+
+def test_upserts_before_load_are_ignored():
+    table = SourceMetaTable()
+    table.upsert(1, MAY, "processed", "text")
+    assert len(table) == 0  # load() will read it from SQLite anyway
+
+
+def test_module_upsert_before_load_needs_only_an_id(monkeypatch):
+    monkeypatch.setattr(source_meta, "_table", SourceMetaTable())
+
+    source_meta.upsert(SimpleNamespace(id=7))  # e.g. a partially populated stand-in
+
+    assert len(source_meta._table) == 0
+
+
+@pytest.fixture
+def session(monkeypatch):
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    table = SourceMetaTable()
+    monkeypatch.setattr(source_meta, "_table", table)
+    with Session(engine) as session:
+        source_meta.load(session)
+        yield session
+
+
+def test_repository_writes_keep_the_table_current(session):
+    source = sourceRepository.create_source(session, status="queued", text="a", created_at=MAY)
+    assert source_meta._table.row(source.id)["status"] == "queued"
+
+    sourceRepository.update_source_status(session, source, "processed")
+    sourceRepository.update_source_fields(session, source, created_at_str="2025-01-02T03:04:05Z")
+    assert source_meta._table.row(source.id) == {
+        "created_at": datetime(2025, 1, 2, 3, 4, 5), "status": "processed", "file_type": None,
+    }
+    assert source_meta.get_sources_meta(None, [source.id])[source.id].created_at == datetime(2025, 1, 2, 3, 4, 5)
+
+    sourceRepository.delete_source(session, source.id)
+    assert source_meta.get_sources_meta(None, [source.id]) == {}
+
+
+def test_load_reads_existing_sources(session):
+    source = sourceRepository.create_source(session, status="processed", text="a", created_at=MAY)
+    source_meta._table = SourceMetaTable()  # monkeypatched per test, so safe to replace
+
+    assert source_meta.load(session) == 1
+    assert source_meta._table.row(source.id)["created_at"] == MAY
@@ -0,0 +1,103 @@
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.repositories import sourceRepository
+from app.services import sourceService
+
+
+class FakeCollection:
+    def __init__(self):
+        self.ids: dict[str, dict] = {}  # vector id -> metadata
+        self.deleted: list[list[str]] = []
+
+    def get(self, where, include):
+        records = [(i, m) for i, m in self.ids.items() if m["source_id"] == where["source_id"]]
+        return {"ids": [i for i, _ in records], "metadatas": [m for _, m in records]}
+
+    def delete(self, ids):
+        self.deleted.append(ids)
+        for i in ids:
+            self.ids.pop(i, None)
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    collection = FakeCollection()
+    embedded: list[list[str]] = []
+    settings = {"embed_model": "nomic-embed-text"}
+
+    def index_chunks(chunks):
+        embedded.append([c["text"] for c in chunks])
+        collection.ids.update({c["id"]: {"source_id": c["source_id"], "embed_model": settings["embed_model"]}
+                               for c in chunks})
+
+    monkeypatch.setattr(sourceService, "engine", engine)
+    monkeypatch.setattr(sourceService, "get_setting", settings.get)
+    monkeypatch.setattr(sourceService, "get_chroma_collection", lambda: collection)
+    monkeypatch.setattr(sourceService, "index_chunks", index_chunks)
+    monkeypatch.setattr(sourceService, "_check_ollama", lambda: "ok")
+    monkeypatch.setattr(sourceService, "check_model_installed", lambda model: True)
+    monkeypatch.setattr(sourceService, "bump_index_version", lambda reason: None)
+    monkeypatch.setattr(sourceService, "chunk_text", lambda text, source_id: [{"text": t} for t in text.split("|")])
+    with Session(engine) as session:
+        source = sourceRepository.create_source(session, status="queued", text="one|two|three")
+        source_id = source.id
+
+    def process(text=None):
+        if text is not None:
+            with Session(engine) as session:
+                sourceRepository.update_source_text(session, sourceRepository.get_source_by_id(session, source_id), text)
+        sourceService._process_source_sync(source_id)
+        with Session(engine) as session:
+            return sourceRepository.get_source_by_id(session, source_id).status
+
+    process.settings = settings
+    return process, collection, embedded
+
+
+def test_reprocessing_an_edit_embeds_only_the_changed_chunks(pipeline):
+    process, collection, embedded = pipeline
+    assert process() == "processed"
+    first_ids = set(collection.ids)
+
+    assert process("one|2|three|four") == "processed"
+
+    assert embedded == [["one", "two", "three"], ["2", "four"]]
+    assert len(collection.deleted) == 1 and len(collection.deleted[0]) == 1  # the vector of "two"
+    assert len(first_ids & set(collection.ids)) == 2 and len(collection.ids) == 4
+
+
+def test_reprocessing_restores_vectors_a_failed_run_never_wrote(pipeline):
+    process, collection, embedded = pipeline
+    process()
+    lost = sorted(collection.ids)[0]
+    collection.ids.pop(lost)
+
+    assert process() == "processed"
+
+    assert embedded[-1] == ["one"] and lost in collection.ids
+    assert process() == "processed" and len(embedded) == 2  # nothing changed: no embed call
+
+
+def test_removed_text_leaves_the_index_even_when_embedding_fails(pipeline, monkeypatch):
+    process, collection, embedded = pipeline
+    process()
+    monkeypatch.setattr(sourceService, "_check_ollama", lambda: "not_running")
+
+    assert process("one|three|new") == "failed_ollama_not_running"
+
+    assert len(collection.deleted) == 1 and len(collection.ids) == 2  # "two" is gone, "new" waits for a retry
+
+
+def test_vectors_from_another_embed_model_are_rebuilt(pipeline):
+    process, collection, embedded = pipeline
+    process()
+    process.settings["embed_model"] = "bge-m3"
+
+    assert process() == "processed"
+
+    assert embedded[-1] == ["one", "two", "three"]
+    assert {m["embed_model"] for m in collection.ids.values()} == {"bge-m3"} and len(collection.ids) == 3
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from app.services import warmup
+from app.services.warmup import COMPONENTS, ComponentState
+
+
+@pytest.fixture
+def warmers(monkeypatch):
+    """Replace the real loaders with counters; `fail` names components that should raise."""
+    calls: list[str] = []
+    fail: set[str] = set()
+
+    def make(name):
+        def load():
+            calls.append(name)
+            if name in fail:
+                raise RuntimeError(f"{name} unavailable")
+            return f"{name}-target"
+        return load
+
+    monkeypatch.setattr(warmup, "_WARMERS", {name: make(name) for name in COMPONENTS})
+    monkeypatch.setattr(warmup, "_state", {name: ComponentState() for name in COMPONENTS})
+    monkeypatch.setattr(warmup, "_tasks", set())
+    monkeypatch.setattr(warmup, "_loop", None)
+    return calls, fail
+
+
+@pytest.mark.asyncio
+async def test_startup_warms_every_component(warmers):
+    calls, _ = warmers
+    assert warmup.readiness()["ready"] is False
+
+    await warmup.start()
+
+    readiness = warmup.readiness()
+    assert readiness["ready"] is True
+    assert sorted(calls) == sorted(COMPONENTS)
+    chat = readiness["components"]["chat_model"]
+    assert chat["status"] == "ready"
+    assert chat["target"] == "chat_model-target"
+    assert chat["load_ms"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_failure_is_reported_not_raised(warmers):
+    _, fail = warmers
+    fail.add("reranker")
+
+    await warmup.start()
+
+    readiness = warmup.readiness()
+    assert readiness["ready"] is False
+    reranker = readiness["components"]["reranker"]
+    assert (reranker["status"], reranker["error"]) == ("error", "reranker unavailable")
+    assert readiness["components"]["spacy"]["status"] == "ready"
+
+
+@pytest.mark.asyncio
+async def test_model_setting_change_rewarms_only_that_model(warmers):
+    calls, _ = warmers
+    await warmup.start()
+    calls.clear()
+
+    warmup._on_settings_change({"chat_model": "other:latest", "theme": "dark"})
+    await asyncio.sleep(0)  # let the scheduled start() run
+    await asyncio.gather(*warmup._tasks)
+
+    assert calls == ["chat_model"]
+    assert warmup.readiness()["ready"] is True
+
+
+def test_settings_change_before_startup_is_ignored(warmers):
+    calls, _ = warmers
+    warmup._on_settings_change({"chat_model": "other:latest"})
+    assert calls == []
@@ -13,7 +13,8 @@ interface ChatMessagesProps {
 }
 
 const STAGE_LABELS: Record<ChatStreamStageName, (count?: number) => string> = {
-  queued: () => "Waiting for the model",
+  queued: (position) =>
+    position && position > 1 ? `Waiting for the model (${position - 1} ahead)` : "Waiting for the model",
   searching: () => "Searching your sources",
   retrieved: (count) => `Read ${count ?? 0} relevant chunk${count === 1 ? "" : "s"}`,
   thinking: () => "Thinking",
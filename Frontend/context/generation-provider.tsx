@@ -19,15 +19,18 @@ export type StreamingAssistant = {
   answer: string
 }
 
-type GenerationStatus = "active" | "done" | "error"
+type GenerationStatus = "active" | "done" | "error" | "cancelled"
 
 type GenerationEntry = StreamingAssistant & { status: GenerationStatus }
 
 export type GenerationDoneInfo = { model: string | null; message_id: number }
 
-// Fired when a generation finishes (done or error). Consumers use it to refetch the
-// chat's persisted messages (when it's the chat on screen) and to clear the entry.
-type CompleteListener = (chatId: number, outcome: "done" | "error", info: GenerationDoneInfo | null) => void
+type GenerationOutcome = "done" | "error" | "cancelled"
+
+// Fired when a generation finishes (done, error or cancelled). Consumers use it to
+// refetch the chat's persisted messages (when it's the chat on screen) and to clear the
+// entry. A cancelled generation carries info only if its partial answer was saved.
+type CompleteListener = (chatId: number, outcome: GenerationOutcome, info: GenerationDoneInfo | null) => void
 
 interface GenerationContextValue {
   /** Begin a text-answer generation for a chat (the user already persisted their turn). */
@@ -36,6 +39,8 @@ interface GenerationContextValue {
   generationFor: (chatId: number | null) => StreamingAssistant | null
   /** Chats with a generation still in progress — drives the sidebar spinner. */
   generatingChatIds: Set<number>
+  /** Stop a chat's generation server-side, optionally keeping the partial answer. */
+  cancelGeneration: (chatId: number, persistPartial?: boolean) => Promise<void>
   /** Drop a chat's streaming entry (after the persisted message has replaced it). */
   clearGeneration: (chatId: number) => void
   /** Subscribe to completion events; returns an unsubscribe fn. */
@@ -70,7 +75,7 @@ export function GenerationProvider({ children }: { children: React.ReactNode })
   }, [])
 
   const finish = useCallback(
-    (chatId: number, outcome: "done" | "error", info: GenerationDoneInfo | null) => {
+    (chatId: number, outcome: GenerationOutcome, info: GenerationDoneInfo | null) => {
       updateEntry(chatId, (entry) => ({ ...entry, status: outcome }))
       cancelers.current.delete(chatId)
       completeListeners.current.forEach((listener) => listener(chatId, outcome, info))
@@ -87,6 +92,11 @@ export function GenerationProvider({ children }: { children: React.ReactNode })
     (chatId: number) => ({
       onStage: ({ name, count }: { name: ChatStreamStageName; count?: number }) => {
         updateEntry(chatId, (entry) => {
+          const last = entry.stages[entry.stages.length - 1]
+          // A moving queue position updates the existing "queued" row in place.
+          if (name === "queued" && last?.name === "queued" && !last.done) {
+            return { ...entry, stages: [...entry.stages.slice(0, -1), { ...last, count }] }
+          }
           const stages = entry.stages.map((s) => ({ ...s, done: true }))
           stages.push({ name, count, done: false })
           return { ...entry, stages, status: "active" as GenerationStatus }
@@ -103,6 +113,8 @@ export function GenerationProvider({ children }: { children: React.ReactNode })
         toast.error(error.message.replace(/^API\s+\d+:\s*/, ""))
         finish(chatId, "error", null)
       },
+      onCancelled: ({ message_id }: { message_id: number | null }) =>
+        finish(chatId, "cancelled", message_id === null ? null : { model: null, message_id }),
       onIdle: () => {
         // Reconnected but nothing is generating anymore — drop any seeded entry.
         clearGeneration(chatId)
@@ -122,6 +134,15 @@ export function GenerationProvider({ children }: { children: React.ReactNode })
     [handlersFor]
   )
 
+  // The open stream receives the terminal `cancelled` event and runs `finish`.
+  const cancelGeneration = useCallback(async (chatId: number, persistPartial = false) => {
+    try {
+      await api.cancelGeneration(chatId, persistPartial)
+    } catch (error) {
+      toast.error(error instanceof Error ? error.message.replace(/^API\s+\d+:\s*/, "") : "Could not stop the answer")
+    }
+  }, [])
+
   // On mount, reconnect to any generation already running on the backend (e.g. it was
   // kicked off in another tab, or this is a refresh mid-answer). subscribeGeneration
   // replays buffered events so the partial answer reappears, then streams live.
@@ -170,8 +191,8 @@ export function GenerationProvider({ children }: { children: React.ReactNode })
   }, [])
 
   const value = useMemo<GenerationContextValue>(
-    () => ({ startTextGeneration, generationFor, generatingChatIds, clearGeneration, onComplete }),
-    [startTextGeneration, generationFor, generatingChatIds, clearGeneration, onComplete]
+    () => ({ startTextGeneration, generationFor, generatingChatIds, cancelGeneration, clearGeneration, onComplete }),
+    [startTextGeneration, generationFor, generatingChatIds, cancelGeneration, clearGeneration, onComplete]
   )
 
   return <GenerationContext.Provider value={value}>{children}</GenerationContext.Provider>
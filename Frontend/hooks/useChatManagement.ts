@@ -178,7 +178,7 @@ export function useChatManagement({ rawSources, setRawSources, setProcessingSour
   // resumed after a refresh. The provider also auto-clears as a safety net.
   useEffect(() => {
     return generation.onComplete((chatId, outcome, info) => {
-      if (outcome === "done" && info && activeChatIdRef.current === chatId) {
+      if (outcome !== "error" && info && activeChatIdRef.current === chatId) {
         void (async () => {
           try {
             const detail = await api.getChat(chatId)
@@ -151,6 +151,9 @@ export interface ChatStreamHandlers {
   onSources?: (sources: QuerySource[]) => void
   onDone: (info: { model: string | null; message_id: number }) => void
   onError: (error: Error) => void
+  // The generation was stopped via `cancelGeneration`; `message_id` is set when the
+  // partial answer was saved.
+  onCancelled?: (info: { message_id: number | null }) => void
   // Emitted by a resume stream when no generation is active for the chat, so the
   // caller can fall back to a normal chat load instead of waiting on tokens.
   onIdle?: () => void
@@ -381,7 +384,13 @@ async function consumeChatStream(response: Response, handlers: ChatStreamHandler
       case "stage":
         handlers.onStage({
           name: parsed.name as ChatStreamStageName,
-          count: typeof parsed.count === "number" ? parsed.count : undefined,
+          // "queued" reports its place in the generation queue as `position`.
+          count:
+            typeof parsed.count === "number"
+              ? parsed.count
+              : typeof parsed.position === "number"
+                ? parsed.position
+                : undefined,
         })
         break
       case "thinking":
@@ -402,6 +411,9 @@ async function consumeChatStream(response: Response, handlers: ChatStreamHandler
       case "error":
         handlers.onError(new Error((parsed.detail as string) || "Stream error"))
         break
+      case "cancelled":
+        handlers.onCancelled?.({ message_id: (parsed.message_id as number | null) ?? null })
+        break
       case "idle":
         handlers.onIdle?.()
         break
@@ -664,6 +676,12 @@ export const api = {
   listActiveGenerations() {
     return request<ActiveGeneration[]>("/generations")
   },
+  cancelGeneration(chatId: number, persistPartial = false) {
+    return request<{ chat_id: number; status: string; message_id: number | null }>(
+      `/chats/${chatId}/generation?persist_partial=${persistPartial}`,
+      { method: "DELETE" }
+    )
+  },
   streamQuery(
     payload: { chatId: number; question: string; top_k?: number },
     handlers: ChatStreamHandlers
@@ -4,6 +4,7 @@
 - Points the Chroma module at an isolated, PER-DATASET DB inside eval/chroma/<dataset>/
   so eval embeddings never touch Backend/database/chroma/ AND the datasets
   (baseline / stateful) never share a collection.
+- Points the embedding cache at eval/chroma/embedding_cache.db (shared by datasets).
 
 Call use_dataset(name) before indexing or querying so the right collection is active.
 """
@@ -31,6 +32,11 @@ except ImportError:
     pass
 
 from app.services import chroma as _chroma  # noqa: E402
+from app.services import embedding_cache as _embedding_cache  # noqa: E402
+
+# Embeddings are content-keyed, so one cache serves every dataset and survives the
+# collection resets between ingest runs; it just stays out of Backend/database/.
+_embedding_cache.CACHE_PATH = CHROMA_BASE / "embedding_cache.db"
 
 _active_dataset: str | None = None
 
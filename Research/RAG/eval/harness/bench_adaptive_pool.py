@@ -0,0 +1,103 @@
+"""Recall/latency tradeoff of the adaptive rerank pool on a dataset's questions (default: stateful).
+
+Runs retrieval only (no LLM) for every question under each `--budgets` value. Budget 0
+is the static pool, which reranks every fused candidate. Any other value is an
+`AdaptivePool` with that per-query budget in ms. Each budget starts with cold result and
+score caches and no learned cost per pair, so the budgets are measured alike. It reports:
+
+  - quality — hit@k, MRR and recall@k of the returned top_k against the gold notes
+  - latency — per-query `ranked_retrieve` time (median / p95)
+  - work    — pairs sent to the cross-encoder and rerank stages per query
+
+Ingest the dataset first (`harness/ingest.py --dataset stateful`). Ollama must be
+running for the query embeddings.
+
+Run:  python harness/bench_adaptive_pool.py
+      python harness/bench_adaptive_pool.py --budgets 0 100 250 500 --dense-margin 0.15
+"""
+import _bootstrap
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from app.services import reranker, retrieval
+from app.services.rag import configure_llamaindex
+from app.services.ranking import AdaptivePool
+
+from metrics import per_question_metrics
+from run_experiment import build_lexical_fn
+
+
+def _bench(budget_ms: float, questions: list[dict], source_to_note: dict[int, str], lexical_fn, args) -> dict:
+    retrieval.bump_index_version("bench_adaptive_pool")  # cold result + score caches
+    retrieval._rerank_cost.clear()
+    pool = AdaptivePool(budget_ms=budget_ms, dense_margin=args.dense_margin, first_stage=args.first_stage)
+    work = {"pairs": 0, "stages": 0}
+
+    def counting_rerank(question, nodes):
+        work["pairs"] += len(nodes)
+        work["stages"] += 1
+        return reranker.rerank(question, nodes)
+
+    latencies, per_question = [], []
+    for q in questions:
+        started = time.perf_counter()
+        nodes = retrieval.ranked_retrieve(
+            q["question"], top_k=args.top_k, source_meta_provider=lambda *a, **k: {},
+            lexical_fn=lexical_fn, reranker_fn=counting_rerank, pool=pool,
+        )
+        latencies.append(1000 * (time.perf_counter() - started))
+        notes = [source_to_note.get(int(n.node.metadata.get("source_id", 0))) for n in nodes]
+        per_question.append(per_question_metrics(q["gold_supporting_notes"], [n for n in notes if n], args.top_k))
+
+    answerable = [m for m in per_question if m["recall_at_k"] is not None]
+    latencies.sort()
+    return {
+        "budget": "static" if budget_ms <= 0 else f"{budget_ms:g} ms",
+        "hit": statistics.mean(m["hit"] for m in answerable),
+        "mrr": statistics.mean(m["mrr"] for m in answerable),
+        "recall": statistics.mean(m["recall_at_k"] for m in answerable),
+        "median_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+        "pairs": work["pairs"] / len(questions),
+        "stages": work["stages"] / len(questions),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default="stateful",
+                        help=f"dataset name under datasets/ (have: {', '.join(_bootstrap.list_datasets()) or 'none'})")
+    parser.add_argument("--budgets", nargs="+", type=float, default=[0, 100, 200, 400, 800])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--dense-margin", type=float, default=AdaptivePool.dense_margin)
+    parser.add_argument("--first-stage", type=int, default=AdaptivePool.first_stage)
+    args = parser.parse_args()
+
+    paths = _bootstrap.use_dataset(args.dataset)
+    if not paths["index"].exists():
+        print(f"{paths['index']} not found. Run harness/ingest.py --dataset {args.dataset} first.", file=sys.stderr)
+        return 1
+    source_to_note = {int(k): v for k, v in json.loads(paths["index"].read_text(encoding="utf-8")).items()}
+    questions = json.loads(paths["questions"].read_text(encoding="utf-8"))["questions"]
+
+    configure_llamaindex()
+    lexical_fn = build_lexical_fn()
+    reranker._model()  # load weights before timing anything
+    print(f"[{args.dataset}] {len(questions)} questions, top_k={args.top_k}, "
+          f"dense_margin={args.dense_margin} first_stage={args.first_stage}")
+
+    results = [_bench(budget, questions, source_to_note, lexical_fn, args) for budget in args.budgets]
+    print(f"\n{'budget':<10} {'hit@k':>6} {'MRR':>6} {'R@k':>6} {'med ms':>8} {'p95 ms':>8} "
+          f"{'pairs/q':>8} {'stages/q':>9}")
+    for r in results:
+        print(f"{r['budget']:<10} {r['hit']:>6.3f} {r['mrr']:>6.3f} {r['recall']:>6.3f} {r['median_ms']:>8.1f} "
+              f"{r['p95_ms']:>8.1f} {r['pairs']:>8.1f} {r['stages']:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
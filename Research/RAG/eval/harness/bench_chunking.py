@@ -0,0 +1,114 @@
+"""Chunking strategy sweep: index size, ingestion time and retrieval quality per `ChunkStrategy`.
+
+Strategies are given as labels: "chars" (the original packing, under 500 characters)
+or "<kind>:<target_tokens>:<overlap_sentences>", where kind is "embed-tokens" (counted
+with the embed model's tokenizer) or "reranker-tokens". When a tokenizer can't be
+loaded, tokens are estimated, and the "tokenizer" column says so.
+
+For each strategy this chunks the dataset's notes and indexes them into a separate
+collection, `<dataset>_chunks_<n>`, where n is the strategy's position in the sweep.
+It then runs retrieval only (no answer generation) for every question and reports:
+
+  - ingest  — chunking and embedding/indexing wall time
+  - index   — chunk count, mean tokens per chunk and total tokens embedded (overlap
+              makes this exceed the corpus)
+  - quality — P@k, MRR, hit@k and recall@k of the top_k against the gold notes
+
+Ollama must be running for the embeddings.
+
+Run:  python harness/bench_chunking.py
+      python harness/bench_chunking.py --strategies chars embed-tokens:128:0 embed-tokens:128:1 --reranker
+"""
+import _bootstrap
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from app.services import chroma, chunking, retrieval
+from app.services.rag import configure_llamaindex, index_chunks
+
+from metrics import per_question_metrics
+from run_experiment import build_lexical_fn
+
+DEFAULT_STRATEGIES = ["chars", "embed-tokens:128:0", "embed-tokens:128:1", "embed-tokens:256:1",
+                      "embed-tokens:512:2", "reranker-tokens:256:1"]
+
+
+def _bench(n: int, strategy: chunking.ChunkStrategy, dataset: str, notes: list[dict], questions: list[dict],
+           args) -> dict:
+    sources = [(note["text"], source_id) for source_id, note in enumerate(notes, start=1)]
+    started = time.perf_counter()
+    chunks = list(chunking.chunk_texts(sources, strategy=strategy))
+    chunk_s = time.perf_counter() - started
+
+    # Measured with the embed tokenizer for every strategy, so sizes compare.
+    count, _ = chunking.token_counter("embed-tokens")
+    tokens = count([c["text"] for c in chunks])
+    exact = strategy.kind == "chars" or chunking.token_counter(strategy.kind)[0] is not chunking._estimate_counts
+
+    _bootstrap.use_dataset(dataset)
+    chroma.COLLECTION_NAME = f"{dataset}_chunks_{n}"
+    _bootstrap.reset_chroma_collection()
+    started = time.perf_counter()
+    index_chunks([{**c, "id": chunk_id} for chunk_id, c in enumerate(chunks, start=1)])
+    index_s = time.perf_counter() - started
+
+    lexical_fn = build_lexical_fn()
+    reranker_fn = None if args.reranker else retrieval._identity_rerank
+    per_question = []
+    for q in questions:
+        nodes = retrieval.ranked_retrieve(
+            q["question"], top_k=args.top_k, source_meta_provider=lambda *a, **k: {},
+            lexical_fn=lexical_fn, reranker_fn=reranker_fn,
+        )
+        retrieved = [notes[int(n.node.metadata["source_id"]) - 1]["note_id"] for n in nodes]
+        per_question.append(per_question_metrics(q["gold_supporting_notes"], retrieved, args.top_k))
+
+    answerable = [m for m in per_question if m["recall_at_k"] is not None]
+    return {
+        "strategy": strategy.label,
+        "tokenizer": "exact" if exact else "estimate",
+        "chunk_s": chunk_s,
+        "index_s": index_s,
+        "chunks": len(chunks),
+        "avg_tokens": statistics.mean(tokens),
+        "total_tokens": sum(tokens),
+        "precision": statistics.mean(m["precision_at_k"] for m in answerable),
+        "mrr": statistics.mean(m["mrr"] for m in answerable),
+        "hit": statistics.mean(m["hit"] for m in answerable),
+        "recall": statistics.mean(m["recall_at_k"] for m in answerable),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default="stateful",
+                        help=f"dataset name under datasets/ (have: {', '.join(_bootstrap.list_datasets()) or 'none'})")
+    parser.add_argument("--strategies", nargs="+", type=chunking.ChunkStrategy.from_label,
+                        default=[chunking.ChunkStrategy.from_label(s) for s in DEFAULT_STRATEGIES])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--reranker", action="store_true", help="rerank with the cross-encoder (default: off)")
+    args = parser.parse_args()
+
+    paths = _bootstrap.use_dataset(args.dataset)
+    notes = json.loads(paths["notes"].read_text(encoding="utf-8"))
+    questions = json.loads(paths["questions"].read_text(encoding="utf-8"))["questions"]
+    configure_llamaindex()
+    print(f"[{args.dataset}] {len(notes)} notes, {len(questions)} questions, top_k={args.top_k}")
+
+    results = [_bench(n, strategy, args.dataset, notes, questions, args)
+               for n, strategy in enumerate(args.strategies)]
+    print(f"\n{'strategy':<22} {'tokenizer':>9} {'chunk s':>8} {'index s':>8} {'chunks':>7} {'avg tok':>8} "
+          f"{'total tok':>10} {'P@k':>6} {'MRR':>6} {'hit@k':>6} {'R@k':>6}")
+    for r in results:
+        print(f"{r['strategy']:<22} {r['tokenizer']:>9} {r['chunk_s']:>8.2f} {r['index_s']:>8.2f} {r['chunks']:>7} "
+              f"{r['avg_tokens']:>8.0f} {r['total_tokens']:>10} {r['precision']:>6.3f} {r['mrr']:>6.3f} "
+              f"{r['hit']:>6.3f} {r['recall']:>6.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
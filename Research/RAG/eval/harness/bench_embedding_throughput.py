@@ -0,0 +1,107 @@
+"""Embedding/indexing throughput (chunks/sec) on a dataset corpus, before vs after batching.
+
+Chunks the dataset's notes exactly like ingest.py. It then indexes them into a
+scratch collection (`<dataset>_bench`, dropped afterwards) with:
+
+  - legacy    — `VectorStoreIndex(nodes, ...)`: LlamaIndex's default batches of 10, one
+                request at a time, upserts only after everything is embedded
+  - batch/conc grid — `index_chunks(batch_size=B, concurrency=C)`
+
+Every run gets an empty embedding cache, so every chunk really goes to Ollama.
+Ollama must be running with the embed model pulled. Server-side parallelism follows
+OLLAMA_NUM_PARALLEL, so concurrency above it only overlaps request latency.
+
+Run:  python harness/bench_embedding_throughput.py --dataset baseline
+      python harness/bench_embedding_throughput.py --dataset stateful --batch 16 64 --concurrency 1 4
+"""
+import _bootstrap
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from llama_index.core import StorageContext, VectorStoreIndex
+from llama_index.core.schema import TextNode
+from llama_index.vector_stores.chroma import ChromaVectorStore
+
+from app.services import chroma, embedding_cache, retrieval
+from app.services.chunking import chunk_text
+from app.services.rag import configure_llamaindex
+
+
+def _chunks(notes: list[dict]) -> list[dict]:
+    chunks, chunk_id = [], 1
+    for source_id, note in enumerate(notes, start=1):
+        for c in chunk_text(note["text"], source_id):
+            chunks.append({"id": chunk_id, "text": c["text"], "source_id": source_id})
+            chunk_id += 1
+    return chunks
+
+
+def _legacy_index(chunks: list[dict]) -> None:
+    nodes = [TextNode(text=c["text"], id_=str(c["id"]), metadata=retrieval._chunk_metadata(c)) for c in chunks]
+    vector_store = ChromaVectorStore(chroma_collection=chroma.get_chroma_collection())
+    VectorStoreIndex(nodes, storage_context=StorageContext.from_defaults(vector_store=vector_store))
+
+
+def _timed(label: str, index_fn, chunks: list[dict], cache_dir: Path) -> float:
+    _bootstrap.reset_chroma_collection()
+    embedding_cache._cache = embedding_cache.EmbeddingCache(cache_dir / f"{label.replace('/', '_')}.db")
+    start = time.perf_counter()
+    index_fn(chunks)
+    elapsed = time.perf_counter() - start
+    rate = len(chunks) / elapsed
+    print(f"  {label:<16} {elapsed:8.2f} s   {rate:8.1f} chunks/s", flush=True)
+    return rate
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default="baseline",
+                        help=f"dataset name under datasets/ (have: {', '.join(_bootstrap.list_datasets()) or 'none'})")
+    parser.add_argument("--batch", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--no-legacy", action="store_true", help="skip the pre-batching baseline")
+    args = parser.parse_args()
+
+    paths = _bootstrap.use_dataset(args.dataset)
+    if not paths["notes"].exists():
+        print(f"{paths['notes']} not found. Run datasets/{args.dataset}/generate.py first.", file=sys.stderr)
+        return 1
+    chroma.COLLECTION_NAME = f"{args.dataset}_bench"
+
+    notes = json.loads(paths["notes"].read_text(encoding="utf-8"))
+    chunks = _chunks(notes)
+    configure_llamaindex()
+    print(f"[{args.dataset}] {len(chunks)} chunks from {len(notes)} notes")
+
+    results: dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = Path(tmp)
+        if not args.no_legacy:
+            results["legacy"] = _timed("legacy", _legacy_index, chunks, cache_dir)
+        for batch in args.batch:
+            for conc in args.concurrency:
+                label = f"b={batch}/c={conc}"
+                results[label] = _timed(
+                    label,
+                    lambda cs, b=batch, c=conc: retrieval.index_chunks(cs, batch_size=b, concurrency=c),
+                    chunks,
+                    cache_dir,
+                )
+        embedding_cache._cache = None
+    _bootstrap.reset_chroma_collection()
+
+    best = max((k for k in results if k != "legacy"), key=results.get)
+    print(f"\nBest: {best} at {results[best]:.1f} chunks/s", end="")
+    if "legacy" in results:
+        print(f" ({results[best] / results['legacy']:.1f}x legacy)", end="")
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Long-source split fallback: wall time and retrieval quality per `long_source_split` mode.
+
+A source that chunking still leaves as one chunk over `LONG_SOURCE_CHARS` (typically
+an unpunctuated transcript) gets split further. The modes are "llm" (the old
+default: a chat generation that returns the text as JSON), "semantic" (sentence
+embeddings, cut at similarity valleys) and "none".
+
+For each mode this chunks the dataset's notes and indexes them into a separate
+collection, `<dataset>_split_<mode>`. It then runs retrieval only (no answer
+generation) for every question and reports:
+
+  - chunking — wall time for the whole corpus; the gap to "none" is the fallback's cost
+  - index    — chunk count and mean chunk length
+  - quality  — hit@k, MRR and recall@k of the top_k against the gold notes
+
+`--journals` adds the files in test_journals/ to the chunking timing. They have no
+questions, so they only count toward time. Ollama must be running for the embeddings
+(and for the chat model in "llm" mode).
+
+Run:  python harness/bench_long_split.py
+      python harness/bench_long_split.py --modes none semantic --journals --reranker
+"""
+import _bootstrap
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from app.services import chroma, chunking, retrieval
+from app.services.rag import configure_llamaindex, index_chunks
+
+from metrics import per_question_metrics
+from run_experiment import build_lexical_fn
+
+
+def _journals() -> list[str]:
+    return [p.read_text(encoding="utf-8") for p in sorted((_bootstrap.REPO_ROOT / "test_journals").glob("*"))
+            if p.suffix in (".txt", ".md")]
+
+
+def _bench(mode: str, dataset: str, notes: list[dict], questions: list[dict], extra: list[str], args) -> dict:
+    sources = [(note["text"], source_id) for source_id, note in enumerate(notes, start=1)]
+    started = time.perf_counter()
+    chunks = list(chunking.chunk_texts(sources, long_split=mode))
+    for text in extra:
+        chunking.chunk_text(text, 0, long_split=mode)
+    chunk_s = time.perf_counter() - started
+    per_source: dict[int, int] = {}
+    for c in chunks:
+        per_source[c["source_id"]] = per_source.get(c["source_id"], 0) + 1
+
+    _bootstrap.use_dataset(dataset)
+    chroma.COLLECTION_NAME = f"{dataset}_split_{mode}"
+    _bootstrap.reset_chroma_collection()
+    index_chunks([{**c, "id": chunk_id} for chunk_id, c in enumerate(chunks, start=1)])
+
+    lexical_fn = build_lexical_fn()
+    reranker_fn = None if args.reranker else retrieval._identity_rerank
+    per_question = []
+    for q in questions:
+        nodes = retrieval.ranked_retrieve(
+            q["question"], top_k=args.top_k, source_meta_provider=lambda *a, **k: {},
+            lexical_fn=lexical_fn, reranker_fn=reranker_fn,
+        )
+        retrieved = [notes[int(n.node.metadata["source_id"]) - 1]["note_id"] for n in nodes]
+        per_question.append(per_question_metrics(q["gold_supporting_notes"], retrieved, args.top_k))
+
+    answerable = [m for m in per_question if m["recall_at_k"] is not None]
+    return {
+        "mode": mode,
+        "chunk_s": chunk_s,
+        "chunks": len(chunks),
+        "avg_chars": statistics.mean(len(c["text"]) for c in chunks),
+        "split_sources": sum(1 for n in per_source.values() if n > 1),
+        "hit": statistics.mean(m["hit"] for m in answerable),
+        "mrr": statistics.mean(m["mrr"] for m in answerable),
+        "recall": statistics.mean(m["recall_at_k"] for m in answerable),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default="stateful",
+                        help=f"dataset name under datasets/ (have: {', '.join(_bootstrap.list_datasets()) or 'none'})")
+    parser.add_argument("--modes", nargs="+", default=["none", "llm", "semantic"],
+                        choices=["none", "llm", "semantic"])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--journals", action="store_true", help="also time chunking test_journals/")
+    parser.add_argument("--reranker", action="store_true", help="rerank with the cross-encoder (default: off)")
+    args = parser.parse_args()
+
+    paths = _bootstrap.use_dataset(args.dataset)
+    notes = json.loads(paths["notes"].read_text(encoding="utf-8"))
+    questions = json.loads(paths["questions"].read_text(encoding="utf-8"))["questions"]
+    extra = _journals() if args.journals else []
+    configure_llamaindex()
+
+    long_notes = sum(1 for note in notes if len(note["text"]) > chunking.LONG_SOURCE_CHARS)
+    print(f"[{args.dataset}] {len(notes)} notes ({long_notes} over {chunking.LONG_SOURCE_CHARS} chars), "
+          f"{len(questions)} questions, {len(extra)} extra journals, top_k={args.top_k}")
+
+    results = [_bench(mode, args.dataset, notes, questions, extra, args) for mode in args.modes]
+    print(f"\n{'mode':<9} {'chunk s':>8} {'chunks':>7} {'avg chars':>10} {'split srcs':>11} "
+          f"{'hit@k':>6} {'MRR':>6} {'R@k':>6}")
+    for r in results:
+        print(f"{r['mode']:<9} {r['chunk_s']:>8.2f} {r['chunks']:>7} {r['avg_chars']:>10.0f} "
+              f"{r['split_sources']:>11} {r['hit']:>6.3f} {r['mrr']:>6.3f} {r['recall']:>6.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
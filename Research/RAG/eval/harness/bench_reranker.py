@@ -0,0 +1,122 @@
+"""Reranker latency and quality per backend on a dataset's questions (default: stateful).
+
+For every question this collects the candidate pool `ranked_retrieve` would send to the
+cross-encoder: dense + BM25 fused, recency off. Each backend then scores the same
+pools. It reports:
+
+  - latency   — per-query rerank time (median / p95 / max) and one-time load time
+  - quality   — hit@k, MRR and recall@k of the reranked top_k against the gold notes
+  - agreement — top_k overlap with the first backend and the largest score difference
+
+Ingest the dataset first (`harness/ingest.py --dataset stateful`). Ollama must be
+running for the query embeddings. The torch backend needs sentence-transformers; the
+first onnx-int8 run exports the model, which needs torch.
+
+Run:  python harness/bench_reranker.py
+      python harness/bench_reranker.py --backends torch onnx-int8 --max-length 256 --batch-size 8
+"""
+import _bootstrap
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from app.services import reranker, retrieval
+from app.services.rag import configure_llamaindex
+
+from metrics import per_question_metrics
+from run_experiment import build_lexical_fn
+
+
+def _pools(questions: list[dict], top_k: int) -> list[tuple[dict, list]]:
+    """The exact candidate pool per question, captured at the reranker seam."""
+    lexical_fn = build_lexical_fn()
+    pools = []
+    for q in questions:
+        captured: list = []
+        retrieval.ranked_retrieve(
+            q["question"], top_k=top_k, source_meta_provider=lambda *a, **k: {}, lexical_fn=lexical_fn,
+            reranker_fn=lambda question, nodes: captured.extend(nodes) or retrieval._identity_rerank(question, nodes),
+        )
+        pools.append((q, captured))
+    return pools
+
+
+def _bench(backend: str, pools, source_to_note: dict[int, str], args) -> dict:
+    reranker._load.cache_clear()
+    started = time.perf_counter()
+    model = reranker._load(backend, args.max_length)
+    load_s = time.perf_counter() - started
+
+    latencies, per_question, rankings = [], [], []
+    for q, nodes in pools:
+        pairs = [(q["question"], n.node.get_content() or "") for n in nodes]
+        started = time.perf_counter()
+        scores = [float(s) for s in model.predict(pairs, batch_size=args.batch_size)]
+        latencies.append(1000 * (time.perf_counter() - started))
+        ranked = sorted(range(len(nodes)), key=lambda i: scores[i], reverse=True)
+        notes = [source_to_note.get(int(nodes[i].node.metadata.get("source_id", 0))) for i in ranked]
+        per_question.append(per_question_metrics(q["gold_supporting_notes"], [n for n in notes if n], args.top_k))
+        rankings.append((ranked, scores))
+
+    answerable = [m for m in per_question if m["recall_at_k"] is not None]
+    latencies.sort()
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "median_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+        "max_ms": latencies[-1],
+        "hit": statistics.mean(m["hit"] for m in answerable),
+        "mrr": statistics.mean(m["mrr"] for m in answerable),
+        "recall": statistics.mean(m["recall_at_k"] for m in answerable),
+        "rankings": rankings,
+    }
+
+
+def _agreement(reference: list, other: list, top_k: int) -> tuple[float, float]:
+    overlaps, max_delta = [], 0.0
+    for (ref_rank, ref_scores), (rank, scores) in zip(reference, other):
+        overlaps.append(len(set(ref_rank[:top_k]) & set(rank[:top_k])) / max(min(top_k, len(rank)), 1))
+        max_delta = max([max_delta, *(abs(a - b) for a, b in zip(ref_scores, scores))])
+    return statistics.mean(overlaps), max_delta
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default="stateful",
+                        help=f"dataset name under datasets/ (have: {', '.join(_bootstrap.list_datasets()) or 'none'})")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx-int8"])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--max-length", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    paths = _bootstrap.use_dataset(args.dataset)
+    if not paths["index"].exists():
+        print(f"{paths['index']} not found. Run harness/ingest.py --dataset {args.dataset} first.", file=sys.stderr)
+        return 1
+    source_to_note = {int(k): v for k, v in json.loads(paths["index"].read_text(encoding="utf-8")).items()}
+    questions = json.loads(paths["questions"].read_text(encoding="utf-8"))["questions"]
+
+    configure_llamaindex()
+    pools = _pools(questions, args.top_k)
+    sizes = [len(nodes) for _, nodes in pools]
+    print(f"[{args.dataset}] {len(pools)} questions, pool size {min(sizes)}-{max(sizes)}, "
+          f"max_length={args.max_length} batch_size={args.batch_size} threads={reranker.physical_cores()}")
+
+    results = [_bench(backend, pools, source_to_note, args) for backend in args.backends]
+    print(f"\n{'backend':<10} {'load s':>7} {'med ms':>8} {'p95 ms':>8} {'max ms':>8} "
+          f"{'hit@k':>6} {'MRR':>6} {'R@k':>6} {'top-k agree':>12} {'max |Δ|':>8}")
+    for r in results:
+        agree, delta = _agreement(results[0]["rankings"], r["rankings"], args.top_k)
+        print(f"{r['backend']:<10} {r['load_s']:>7.1f} {r['median_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['max_ms']:>8.1f} {r['hit']:>6.3f} {r['mrr']:>6.3f} {r['recall']:>6.3f} "
+              f"{agree:>12.3f} {delta:>8.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
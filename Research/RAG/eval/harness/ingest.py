@@ -2,14 +2,17 @@
 
 Run:  python harness/ingest.py --dataset baseline
       python harness/ingest.py --dataset stateful
+      python harness/ingest.py --dataset stateful --chunk-strategy embed-tokens:256:1
 """
 import _bootstrap
 
 import argparse
 import json
 import sys
+from datetime import datetime
 
-from app.services.chunking import chunk_text
+from app.services.chroma import to_created_at_ts
+from app.services.chunking import ChunkStrategy, chunk_texts, strategy_from_settings
 from app.services.rag import index_chunks, configure_llamaindex
 
 
@@ -17,7 +20,11 @@ def main() -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--dataset", default="baseline",
                         help=f"dataset name under datasets/ (have: {', '.join(_bootstrap.list_datasets()) or 'none'})")
+    parser.add_argument("--chunk-strategy", type=ChunkStrategy.from_label, default=None,
+                        help="chars | embed-tokens[:target[:overlap]] | reranker-tokens[:target[:overlap]] "
+                             "(default: the chunk_* settings)")
     args = parser.parse_args()
+    strategy = args.chunk_strategy or strategy_from_settings()
 
     paths = _bootstrap.use_dataset(args.dataset)
     notes_path, index_path = paths["notes"], paths["index"]
@@ -38,13 +45,21 @@ def main() -> int:
     chunk_id_counter = 1
     source_to_note: dict[int, str] = {}
 
+    created_at_ts: dict[int, int | None] = {}
     for source_id, note in enumerate(notes, start=1):
         source_to_note[source_id] = note["note_id"]
-        for c in chunk_text(note["text"], source_id):
-            chunks.append({"id": chunk_id_counter, "text": c["text"], "source_id": source_id})
-            chunk_id_counter += 1
-
-    print(f"Produced {len(chunks)} chunks from {len(notes)} notes")
+        # Stamped like the app does, so hard date ranges filter the eval corpus too.
+        created_at_ts[source_id] = (
+            to_created_at_ts(datetime.fromisoformat(note["timestamp"])) if note.get("timestamp") else None
+        )
+    # One nlp.pipe stream over every note instead of a spaCy call per note.
+    sources = ((note["text"], source_id) for source_id, note in enumerate(notes, start=1))
+    for c in chunk_texts(sources, strategy=strategy):
+        chunks.append({"id": chunk_id_counter, "text": c["text"], "source_id": c["source_id"],
+                       "created_at_ts": created_at_ts[c["source_id"]]})
+        chunk_id_counter += 1
+
+    print(f"Produced {len(chunks)} chunks from {len(notes)} notes ({strategy.label})")
     print("Indexing into isolated Chroma...")
     index_chunks(chunks)
 
@@ -18,6 +18,7 @@ import _bootstrap
 import argparse
 import csv
 import json
+import sqlite3
 import subprocess
 import sys
 from dataclasses import dataclass, asdict, field
@@ -25,12 +26,14 @@ from datetime import datetime, timezone
 from pathlib import Path
 
 import evaluation
-from app.services import retrieval, generation, llm_runtime
+from app.repositories.sourceRepository import fts_match_query
+from app.services import chroma, reranker, retrieval, generation, llm_runtime
+from app.services.chroma import to_created_at_ts
+from app.services.embedding_cache import CachedOllamaEmbedding
 from app.services.prompt import get_prompt
-from app.services.ranking import DEFAULT_WEIGHTS, RankWeights
+from app.services.ranking import DEFAULT_FUSION, DEFAULT_WEIGHTS, AdaptivePool, FusionWeights, RankWeights
 from app.services.settings_service import get_setting
 from llama_index.core import Settings
-from llama_index.embeddings.ollama import OllamaEmbedding
 from llama_index.llms.ollama import Ollama
 
 
@@ -46,16 +49,54 @@ class ExperimentConfig:
     thinking: bool = False
     questions: str = "questions.json"
     weights: RankWeights = field(default_factory=lambda: DEFAULT_WEIGHTS)
+    fusion: FusionWeights = field(default_factory=lambda: DEFAULT_FUSION)  # lexical=0 -> dense-only
+    rerank_budget_ms: float = 0.0      # adaptive rerank pool budget; 0 -> static pool
 
 
 # --------------------------------------------------------------------------- component wiring
 
+def build_lexical_fn():
+    """BM25 over the active dataset's collection, in an in-memory FTS5 table.
+
+    The app's lexical search reads the production chunk table, whose ids don't match the
+    eval collection, so the harness indexes the collection's own documents instead."""
+    records = chroma.get_chroma_collection().get(include=["documents", "metadatas"])
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE VIRTUAL TABLE chunk_fts USING fts5(node_id UNINDEXED, created_at_ts UNINDEXED, "
+               "modality UNINDEXED, chunk_text, tokenize='unicode61 remove_diacritics 2')")
+    db.executemany(
+        "INSERT INTO chunk_fts VALUES (?, ?, ?, ?)",
+        [(i, (m or {}).get("created_at_ts"), (m or {}).get("modality"), d or "")
+         for i, d, m in zip(records["ids"], records["documents"], records["metadatas"])],
+    )
+
+    def lexical_fn(session, question, limit, date_range=None, modality=None):
+        match = fts_match_query(question)
+        if match is None:
+            return []
+        sql, params = "SELECT node_id FROM chunk_fts WHERE chunk_fts MATCH ?", [match]
+        if date_range:
+            sql += " AND created_at_ts >= ? AND created_at_ts < ?"
+            params += [to_created_at_ts(date_range.start), to_created_at_ts(date_range.end)]
+        if modality:
+            sql += " AND modality = ?"
+            params.append(modality)
+        sql += " ORDER BY bm25(chunk_fts) LIMIT ?"
+        return [row[0] for row in db.execute(sql, [*params, limit])]
+
+    return lexical_fn
+
+
 def build_retriever(cfg: ExperimentConfig):
     """A retrieve_fn(question, top_k, modality) with cfg's reranker/recency/weights injected.
 
     Eval isolation: synthetic source_ids collide with real SQLite rows, so we neutralize
-    recency (source_meta_provider -> {}). Reranker OFF = identity rerank (embedding score)."""
+    recency (source_meta_provider -> {}) and search the collection's own text for the
+    lexical half. Reranker OFF = identity rerank (embedding score)."""
     reranker_fn = None if cfg.reranker else retrieval._identity_rerank
+    lexical_fn = build_lexical_fn() if cfg.fusion.lexical > 0 else None
+    # Always explicit, so the app's rerank_budget_ms setting never leaks into a run.
+    pool = AdaptivePool(budget_ms=cfg.rerank_budget_ms)
 
     def retrieve_fn(question, top_k=cfg.top_k, modality=None):
         return retrieval.ranked_retrieve(
@@ -65,6 +106,9 @@ def build_retriever(cfg: ExperimentConfig):
             reranker_fn=reranker_fn,
             source_meta_provider=lambda *a, **k: {},
             weights=cfg.weights,
+            lexical_fn=lexical_fn,
+            fusion=cfg.fusion,
+            pool=pool,
         )
 
     return retrieve_fn
@@ -89,7 +133,7 @@ def apply_embed_override(cfg: ExperimentConfig) -> str:
     """If cfg overrides the embed model, set it on Settings (must match the ingested collection)."""
     embed_model = cfg.embed_model or get_setting("embed_model")
     if cfg.embed_model and cfg.embed_model != get_setting("embed_model"):
-        Settings.embed_model = OllamaEmbedding(model_name=cfg.embed_model, base_url=get_setting("ollama_host"))
+        Settings.embed_model = CachedOllamaEmbedding(model_name=cfg.embed_model, base_url=get_setting("ollama_host"))
     return embed_model
 
 
@@ -127,6 +171,9 @@ def _make_run_dir(cfg: ExperimentConfig, chat_model: str, embed_model: str, effe
         "embed_model": embed_model,
         "chat_model": chat_model,
         "weights": {"relevance": cfg.weights.relevance, "temporal": cfg.weights.temporal},
+        "fusion": {"dense": cfg.fusion.dense, "lexical": cfg.fusion.lexical, "k": cfg.fusion.k},
+        "rerank_budget_ms": cfg.rerank_budget_ms,
+        "context_token_budget": get_setting("context_token_budget"),
     }
     return run_dir, config
 
@@ -154,10 +201,11 @@ def run(cfg: ExperimentConfig) -> int:
     retrieve_fn = build_retriever(cfg)
 
     run_dir, config = _make_run_dir(cfg, chat_model, embed_model, effective_thinking)
-    print(f"Experiment: dataset={cfg.dataset} prompt={cfg.prompt} reranker={cfg.reranker} "
+    print(f"Experiment: dataset={cfg.dataset} prompt={cfg.prompt} reranker={cfg.reranker} hybrid={cfg.fusion.lexical > 0} "
           f"chat_model={chat_model} thinking={effective_thinking} top_k={cfg.top_k}")
 
     rows: list[dict] = []
+    prompt_tokens: list[int] = []
     for i, q in enumerate(questions, start=1):
         print(f"[{i:2d}/{len(questions)}] {q['id']}: {q['question'][:70]}...", flush=True)
         try:
@@ -166,6 +214,8 @@ def run(cfg: ExperimentConfig) -> int:
         except Exception as exc:
             print(f"    FAILED: {exc}", file=sys.stderr)
             result = {"answer": f"<ERROR: {exc}>", "sources": []}
+        if result.get("prompt_tokens"):
+            prompt_tokens.append(result["prompt_tokens"])
 
         retrieved_note_ids, retrieved_scores, retrieved_texts = [], [], []
         for src in result.get("sources", []):
@@ -201,7 +251,16 @@ def run(cfg: ExperimentConfig) -> int:
     # Consistent evaluation output: retrieval + state-aware answer metrics.
     summary, counts, buckets = evaluation.evaluate(run_dir, questions_path, paths["world"], cfg.top_k)
     evaluation.print_summary(summary, counts, buckets, cfg.top_k)
-    print(f"\nRun folder: {run_dir}")
+    qstats = retrieval.query_cache_stats()
+    rstats = retrieval.result_cache_stats()
+    print(f"\nQuery embeddings: {qstats['hits']} cached, {qstats['misses']} embedded")
+    print(f"Ranked results: {rstats['hits']} cached, {rstats['misses']} computed")
+    if prompt_tokens:
+        print(f"Prompt tokens (estimated): mean {sum(prompt_tokens) / len(prompt_tokens):.0f}, max {max(prompt_tokens)}")
+    if cfg.reranker:
+        sstats = reranker.score_cache_stats()
+        print(f"Reranker pairs: {sstats['hits']} cached, {sstats['misses']} scored")
+    print(f"Run folder: {run_dir}")
     return 0
 
 
@@ -209,9 +268,12 @@ def _cfg_from_args(args) -> ExperimentConfig:
     if args.config:
         data = json.loads(Path(args.config).read_text(encoding="utf-8"))
         w = data.pop("weights", None)
+        f = data.pop("fusion", None)
         cfg = ExperimentConfig(**data)
         if w:
             cfg.weights = RankWeights(relevance=w.get("relevance", 1.0), temporal=w.get("temporal", 0.3))
+        if f:
+            cfg.fusion = FusionWeights(dense=f.get("dense", 1.0), lexical=f.get("lexical", 1.0), k=f.get("k", 60))
         return cfg
     return ExperimentConfig(
         dataset=args.dataset,
@@ -222,6 +284,8 @@ def _cfg_from_args(args) -> ExperimentConfig:
         embed_model=args.embed_model,
         thinking=args.thinking,
         questions=args.questions,
+        fusion=FusionWeights() if args.hybrid else FusionWeights(lexical=0.0),
+        rerank_budget_ms=args.rerank_budget_ms,
     )
 
 
@@ -238,6 +302,12 @@ def main() -> int:
     rerank = parser.add_mutually_exclusive_group()
     rerank.add_argument("--reranker", dest="reranker", action="store_true", default=True)
     rerank.add_argument("--no-reranker", dest="reranker", action="store_false")
+    hybrid = parser.add_mutually_exclusive_group()
+    hybrid.add_argument("--hybrid", dest="hybrid", action="store_true", default=True,
+                        help="fuse BM25 with dense retrieval (default)")
+    hybrid.add_argument("--dense-only", dest="hybrid", action="store_false")
+    parser.add_argument("--rerank-budget-ms", dest="rerank_budget_ms", type=float, default=0.0,
+                        help="adaptive rerank pool with this per-query budget (default 0: static pool)")
     think = parser.add_mutually_exclusive_group()
     think.add_argument("--thinking", dest="thinking", action="store_true", default=False)
     think.add_argument("--no-thinking", dest="thinking", action="store_false")
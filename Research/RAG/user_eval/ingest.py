@@ -14,12 +14,13 @@ import _bootstrap
 
 import json
 import sys
+from collections import Counter
 from pathlib import Path
 
 import strip_markdown
 
 from app.schemas.journalSchemas import SimpleRecording
-from app.services.chunking import chunk_text
+from app.services.chunking import chunk_texts
 from app.services.rag import configure_llamaindex, index_chunks
 
 HERE = Path(__file__).resolve().parent
@@ -71,33 +72,37 @@ def main() -> int:
         from app.services.transcription import TranscriptionManager
         transcriber = TranscriptionManager()
 
-    chunks: list[dict] = []
-    chunk_id_counter = 1
     source_to_filename: dict[int, str] = {}
 
-    for source_id, path in enumerate(files, start=1):
-        ext = path.suffix.lower()
-        try:
-            if ext in AUDIO_EXTS:
-                print(f"[{source_id}/{len(files)}] Transcribing {path.name}...", flush=True)
-                text = _transcribe_audio(path, source_id, transcriber)
-            else:
-                print(f"[{source_id}/{len(files)}] Reading {path.name}...", flush=True)
-                text = _read_text_file(path)
-        except Exception as exc:
-            print(f"    FAILED: {exc}", file=sys.stderr)
-            continue
-
-        if not text or not text.strip():
-            print(f"    Skipping {path.name}: empty after read/transcription", file=sys.stderr)
-            continue
-
-        source_to_filename[source_id] = path.name
-        file_chunks = chunk_text(text, source_id)
-        for c in file_chunks:
-            chunks.append({"id": chunk_id_counter, "text": c["text"], "source_id": source_id})
-            chunk_id_counter += 1
-        print(f"    -> {len(file_chunks)} chunk(s)")
+    def read_sources():
+        for source_id, path in enumerate(files, start=1):
+            ext = path.suffix.lower()
+            try:
+                if ext in AUDIO_EXTS:
+                    print(f"[{source_id}/{len(files)}] Transcribing {path.name}...", flush=True)
+                    text = _transcribe_audio(path, source_id, transcriber)
+                else:
+                    print(f"[{source_id}/{len(files)}] Reading {path.name}...", flush=True)
+                    text = _read_text_file(path)
+            except Exception as exc:
+                print(f"    FAILED: {exc}", file=sys.stderr)
+                continue
+
+            if not text or not text.strip():
+                print(f"    Skipping {path.name}: empty after read/transcription", file=sys.stderr)
+                continue
+
+            source_to_filename[source_id] = path.name
+            yield text, source_id
+
+    # Files are read as the chunker asks for them; spaCy parses them in nlp.pipe batches.
+    chunks = [
+        {"id": chunk_id, "text": c["text"], "source_id": c["source_id"]}
+        for chunk_id, c in enumerate(chunk_texts(read_sources()), start=1)
+    ]
+    per_source = Counter(c["source_id"] for c in chunks)
+    for source_id, name in source_to_filename.items():
+        print(f"    {name} -> {per_source[source_id]} chunk(s)")
 
     if not chunks:
         print("No chunks produced from any journal — nothing to index.", file=sys.stderr)